@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark CLI startup time
+
+Compares a bare interpreter, the imports behind `nfs-mount-visualizer export`
+and the full app import the CLI used to pay for on every invocation.
+
+Usage: python benchmarks/bench_cli_startup.py [runs]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+# The cases import the package from this checkout
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ("python -c pass", ["-c", "pass"]),
+    ("cli --help", ["-m", "nfs_mount_visualizer.cli", "--help"]),
+    ("export imports", ["-c", "import nfs_mount_visualizer.cli, nfs_mount_visualizer.config, nfs_mount_visualizer.export"]),
+    # An export that reaches Prometheus also loads requests when it builds the session
+    ("export session", ["-c", "import nfs_mount_visualizer.export; nfs_mount_visualizer.export.prometheus.get_session()"]),
+    ("app import", ["-c", "import nfs_mount_visualizer.app"]),
+]
+
+
+def best_of(args, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, check=True, stdout=subprocess.DEVNULL, cwd=ROOT)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(runs):
+    baseline = None
+    for label, args in CASES:
+        elapsed = best_of(args, runs)
+        baseline = elapsed if baseline is None else baseline
+        print(f"{label:<16}  {elapsed * 1000:8.1f} ms  (+{(elapsed - baseline) * 1000:6.1f} ms over the interpreter)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark create_pyvis_network build time on synthetic clusters
+
+Usage: python benchmarks/bench_network.py [rows ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Run from a checkout without installing the package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from nfs_mount_visualizer.app import load_config, create_pyvis_network
+from nfs_mount_visualizer.snapshot import MountSnapshot
+
+
+def make_mounts(rows, nodes=3000, servers=60, paths=50, seed=0):
+    """Build a synthetic mount table with roughly `rows` unique mounts"""
+    rng = np.random.default_rng(seed)
+    node_names = np.array([f"node{i:05d}" for i in range(nodes)], dtype=object)
+    return pd.DataFrame({
+        "nfs_server": node_names[rng.integers(0, servers, rows)],
+        "nfs_client": node_names[rng.integers(servers, nodes, rows)],
+        "mount_path": np.array([f"path{i}" for i in range(paths)], dtype=object)[rng.integers(0, paths, rows)],
+        "accessible": rng.random(rows) > 0.05,
+    })
+
+
+def main(sizes):
+    config = load_config()
+    for rows in sizes:
+        df = make_mounts(rows)
+        config["cluster_nodes"] = sorted(set(df["nfs_server"]) | set(df["nfs_client"]))
+        focus = [df["nfs_server"].iloc[0]]
+        # The app looks the focus neighbors up in the snapshot indexes built once per refresh
+        neighbors = MountSnapshot(df).neighbors(focus)
+        for label, kwargs in [("all nodes", {"show_all_nodes": True}),
+                              ("focus", {"show_all_nodes": False, "focus_nodes": focus, "neighbor_nodes": neighbors}),
+                              ("merged", {"show_all_nodes": True, "merge_edges": True})]:
+            start = time.perf_counter()
+            net = create_pyvis_network(df, config, **kwargs)
+            elapsed = time.perf_counter() - start
+            print(f"{rows:>7} rows  {label:<9}  nodes={len(net.nodes):>5}  edges={len(net.edges):>6}  {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
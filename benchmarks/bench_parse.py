@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory and time of parsing large Prometheus responses
+
+Compares loading the whole body with json.loads (plus a list of dicts for the
+mount table) against streaming it through iter_result_series into the compact
+table and the heatmap matrix. Each case runs twice in a fresh interpreter: once
+timed, recording the process' peak RSS (including native allocations), and once
+under tracemalloc for the peak Python memory allocated while parsing. The peak
+RSS after the imports is printed next to it: when importing the app stack peaks
+higher than parsing, the two are equal.
+
+Usage: python benchmarks/bench_parse.py [rows ...]
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Run from a checkout without installing the package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_snapshot_memory import MAPPING, make_result, records_frame
+
+RANGE_SERIES = 2_000
+RANGE_POINTS = 288
+RANGE_STEP = 300
+RANGE_START = 1_700_000_000
+
+
+def make_range_body(series, points):
+    """Synthetic range query response with `series` mounts x `points` samples"""
+    result = []
+    for i in range(series):
+        values = [[RANGE_START + j * RANGE_STEP, "0" if (i + j) % 97 == 0 else "1"] for j in range(points)]
+        result.append({"metric": {"nfs_server": f"storage{i % 20:02d}", "nfs_client": f"node{i // 20:04d}",
+                                  "mount_path": "data"}, "values": values})
+    return {"status": "success", "data": {"resultType": "matrix", "result": result}}
+
+
+def read_chunks(path, size):
+    with open(path, encoding="utf-8") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(case, path, traced):
+    """Run one case in this process and print rows, seconds, peak traced memory and peak RSS"""
+    from nfs_mount_visualizer.heatmap import build_heatmap_from_result, build_heatmap_from_series
+    from nfs_mount_visualizer.prometheus import STREAM_CHUNK_SIZE, iter_result_series
+    from nfs_mount_visualizer.snapshot import mounts_from_series
+
+    buckets = RANGE_POINTS
+    imports_rss = peak_rss()
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if case == "instant-loads":
+        with open(path, encoding="utf-8") as f:
+            rows = len(records_frame(json.loads(f.read()), MAPPING))
+    elif case == "instant-stream":
+        rows = len(mounts_from_series(iter_result_series(read_chunks(path, STREAM_CHUNK_SIZE)), MAPPING))
+    elif case == "range-loads":
+        with open(path, encoding="utf-8") as f:
+            heatmap = build_heatmap_from_result(json.loads(f.read()), MAPPING, RANGE_START, RANGE_STEP, buckets)
+        rows = len(heatmap["matrix"])
+    else:
+        series = iter_result_series(read_chunks(path, STREAM_CHUNK_SIZE))
+        heatmap = build_heatmap_from_series(series, MAPPING, RANGE_START, RANGE_STEP, buckets)
+        rows = len(heatmap["matrix"])
+    elapsed = time.perf_counter() - start
+    print(rows, elapsed, tracemalloc.get_traced_memory()[1] if traced else 0, peak_rss(), imports_rss)
+
+
+def measure(case, path, traced):
+    out = subprocess.run([sys.executable, __file__, "--case", case, path] + ["--traced"] * traced,
+                         check=True, capture_output=True, text=True).stdout.split()
+    return int(out[0]), float(out[1]), int(out[2]), int(out[3]), int(out[4])
+
+
+def report(label, path, cases):
+    size = os.path.getsize(path)
+    for case in cases:
+        rows, elapsed, _, rss, imports_rss = measure(case, path, False)
+        peak = measure(case, path, True)[2]
+        print(f"{label:<22} body={size / 2**20:7.1f} MiB  {case:<15} rows={rows:>7}  "
+              f"traced peak={peak / 2**20:7.1f} MiB  peak RSS={rss / 2**20:7.1f} MiB "
+              f"(imports {imports_rss / 2**20:7.1f} MiB)  {elapsed * 1000:8.1f} ms")
+
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"instant-{rows}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(make_result(rows), f)
+            report(f"{rows} mounts", path, ["instant-loads", "instant-stream"])
+
+        path = os.path.join(tmp, "range.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(make_range_body(RANGE_SERIES, RANGE_POINTS), f)
+        report(f"{RANGE_SERIES}x{RANGE_POINTS} range", path, ["range-loads", "range-stream"])
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--case"]:
+        run_case(sys.argv[2], sys.argv[3], "--traced" in sys.argv[4:])
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory and build time of the mount table layouts
+
+Compares the old list-of-dicts DataFrame (string columns, and object columns as
+on pandas < 3) with the compact categorical table from mounts_from_result.
+
+Usage: python benchmarks/bench_snapshot_memory.py [rows ...]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+# Run from a checkout without installing the package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_network import make_mounts
+from nfs_mount_visualizer.snapshot import mounts_from_result
+
+MAPPING = {"server_label": "nfs_server", "client_label": "nfs_client", "path_label": "mount_path"}
+
+
+def make_result(rows):
+    """Synthetic instant query response with one series per mount"""
+    df = make_mounts(rows).drop_duplicates(["nfs_server", "nfs_client", "mount_path"])
+    return {"status": "success", "data": {"resultType": "vector", "result": [
+        {"metric": {"__name__": "node_nfs_mount_accessible", "nfs_server": server,
+                    "nfs_client": client, "mount_path": path},
+         "value": [1700000000.0, "1" if accessible else "0"]}
+        for server, client, path, accessible in df.itertuples(index=False)
+    ]}}
+
+
+def records_frame(result, mapping):
+    """The previous layout: a list of dicts turned into a DataFrame"""
+    records = []
+    for metric in result["data"]["result"]:
+        records.append({
+            "nfs_server": metric["metric"][mapping["server_label"]],
+            "nfs_client": metric["metric"][mapping["client_label"]],
+            "mount_path": metric["metric"][mapping["path_label"]],
+            "accessible": int(metric["value"][1]) == 1
+        })
+    return pd.DataFrame(records)
+
+
+def object_frame(result, mapping):
+    """The previous layout with plain object columns, as built on pandas < 3"""
+    return records_frame(result, mapping).astype({"nfs_server": object, "nfs_client": object, "mount_path": object})
+
+
+def measure(build, result):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = build(result, MAPPING)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return df.memory_usage(deep=True).sum(), peak, elapsed
+
+
+def main(sizes):
+    for rows in sizes:
+        result = make_result(rows)
+        for label, build in [("records", records_frame), ("object", object_frame), ("compact", mounts_from_result)]:
+            size, peak, elapsed = measure(build, result)
+            print(f"{rows:>7} rows  {label:<8}  table={size / 2**20:7.2f} MiB  "
+                  f"peak={peak / 2**20:7.2f} MiB  {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
@@ -5,18 +5,49 @@ Creates an interactive visualization of NFS mounts between cluster nodes using P
 """
 
 import streamlit as st
-import requests
+import altair as alt
 import pandas as pd
 from pyvis.network import Network
 import time
 from datetime import datetime, timedelta
 import os
 import json
-import yaml
+import hashlib
 import argparse
 import random
 import numpy as np
 
+from nfs_mount_visualizer import prometheus, collector, instrumentation, transitions
+from nfs_mount_visualizer import config as config_module
+from nfs_mount_visualizer.utils import ResultCache
+from nfs_mount_visualizer.history import HistoryStore
+from nfs_mount_visualizer.archive import mount_archive
+from nfs_mount_visualizer.intervals import to_intervals, interval_stats
+from nfs_mount_visualizer.layout import compute_layout, layout_settings
+from nfs_mount_visualizer.snapshot import MountSnapshot, compact_mounts
+from nfs_mount_visualizer.heatmap import (
+    build_heatmap, build_heatmap_from_series, merge_heatmaps, sort_rows, failure_counts, heatmap_image, hex_to_rgb
+)
+
+# Rendered network graph HTML shared by all sessions, keyed by a hash of the view
+graph_html_cache = ResultCache(max_entries=32)
+
+# One shared mount snapshot per data source for every session in the process
+snapshot_cache = ResultCache(max_entries=4)
+
+# Latest snapshot per data source; the next refresh is diffed against it
+latest_snapshots = {}
+
+# {data source key: (failed_at, message)} of the last refresh that failed, cleared by the next good one
+snapshot_errors = {}
+
+# Snapshots of narrowed views fetched with label matchers, kept apart so they never evict the full ones
+view_snapshot_cache = ResultCache(max_entries=16)
+
+for name, cache in [("graph_html", graph_html_cache), ("snapshot", snapshot_cache),
+                    ("view_snapshot", view_snapshot_cache)]:
+    instrumentation.register_cache(name, cache)
+
 # Streamlit app setup
 def setup_page(title="NFS Mount Visualizer"):
     """Set up the Streamlit page configuration"""
@@ -26,73 +57,16 @@ def setup_page(title="NFS Mount Visualizer"):
         layout="wide",
     )
 
+def _report_config_problem(level, message):
+    """Show config loading problems in the page"""
+    if level == "warning":
+        st.warning(message)
+    else:
+        st.error(message)
+
 def load_config(config_path=None):
     """Load configuration from file or use defaults"""
-    default_config = {
-        "prometheus_url": "http://localhost:9090",
-        "cluster_nodes": ["node1", "node2", "node3"],
-        "refresh_interval": 300,  # seconds
-        "cache_dir": ".cache",
-        "node_types": {
-            "default": {"color": "#607D8B", "title": "Cluster Node"}
-        },
-        "app_title": "NFS Mount Visualizer",
-        "metric_name": "nfs_mount_accessible",
-        "metric_mapping": {
-            "server_label": "source_node",
-            "client_label": "target_node", 
-            "path_label": "mount_path",
-            "mount_path_prefix": "/mnt/"
-        },
-        "visualization": {
-            "network": {
-                "height": "700px",
-                "width": "100%",
-                "bgcolor": "#222222",
-                "font_color": "white"
-            },
-            "edge_colors": {
-                "accessible": "#4CAF50",
-                "inaccessible": "#F44336"
-            },
-            "node_sizing": {
-                "base_size": 25,
-                "export_multiplier": 3
-            },
-            "physics": {
-                "gravity": -8000,
-                "central_gravity": 0.3,
-                "spring_length": 200
-            },
-            "charts": {
-                "line_chart_height": 400
-            }
-        }
-    }
-    
-    config = default_config.copy()
-    
-    if config_path:
-        try:
-            if config_path.endswith('.json'):
-                with open(config_path, 'r') as f:
-                    user_config = json.load(f)
-            elif config_path.endswith(('.yaml', '.yml')):
-                with open(config_path, 'r') as f:
-                    user_config = yaml.safe_load(f)
-            else:
-                st.warning(f"Unsupported config file format: {config_path}")
-                return config
-                
-            # Update config with user values
-            config.update(user_config)
-        except Exception as e:
-            st.error(f"Error loading config file: {str(e)}")
-    
-    # Ensure cache directory exists
-    os.makedirs(config["cache_dir"], exist_ok=True)
-    
-    return config
+    return config_module.load_config(config_path, report=_report_config_problem)
 
 def generate_sample_data(config):
     """Generate sample/fake data for demo purposes"""
@@ -190,69 +164,473 @@ def generate_sample_historical_data(config, server, client, mount_path, hours=6)
     
     return list(zip(timestamps, values))
 
-def query_prometheus(prometheus_url, query, time_range=None):
-    """Query Prometheus for data"""
+def warn_unavailable_sources(source_errors):
+    """Tell the user which Prometheus instances are missing from what is shown"""
+    for label, error in source_errors.items():
+        st.warning(f"Prometheus {label} is unavailable, its mounts are not shown: {error}")
+
+def query_sources(prometheus_url, run, client_config=None):
+    """Run run(url, client_config) against the Prometheus instance, or every listed one concurrently
+
+    Responses from several instances are merged with each series tagged by the
+    instance label; instances that fail or miss their deadline are skipped and
+    listed in the response's `source_errors`.
+    """
+    if not prometheus.is_federated(prometheus_url):
+        return run(prometheus_url, client_config)
+    results, errors = prometheus.fan_out(prometheus_url, run, client_config)
+    warn_unavailable_sources(errors)
+    merged = prometheus.merge_source_results(results)
+    if errors:
+        merged["source_errors"] = errors
+    return merged
+
+def query_prometheus(prometheus_url, query, client_config=None, cache_ttl=None):
+    """Run an instant query against Prometheus, optionally through the shared result cache
+
+    Range data goes through query_prometheus_window and the history store,
+    which fetch at the scrape resolution.
+    """
+    def run(url, settings):
+        if cache_ttl is None:
+            return prometheus.instant_query(url, query, settings)
+        return prometheus.cached_instant_query(url, query, cache_ttl, settings)
+
     try:
-        if time_range:
-            # Query range for historical data
-            end_time = int(time.time())
-            start_time = end_time - time_range
-            step = max(10, time_range // 100)  # Dynamically adjust step based on range
-
-            response = requests.get(
-                f"{prometheus_url}/api/v1/query_range",
-                params={
-                    "query": query,
-                    "start": start_time,
-                    "end": end_time,
-                    "step": step
-                },
-                timeout=10
-            )
-        else:
-            # Instant query for current state
-            response = requests.get(
-                f"{prometheus_url}/api/v1/query",
-                params={"query": query},
-                timeout=5
-            )
+        with instrumentation.span("query_prometheus") as span:
+            result = query_sources(prometheus_url, run, client_config)
+            span.set(series=len(result.get("data", {}).get("result", [])))
+            return result
+    except prometheus.PrometheusError as e:
+        st.error(str(e))
+        return None
 
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Failed to query Prometheus: {response.text}")
-            return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error connecting to Prometheus: {str(e)}")
+def query_prometheus_window(config, query, start, end, step, cache_ttl=None):
+    """Fetch an explicit [start, end] range window from Prometheus"""
+    def run(url, settings):
+        if cache_ttl is None:
+            return prometheus.sharded_range_query(url, query, start, end, step, settings)
+        return prometheus.cached_range_query(url, query, start, end, step, cache_ttl, settings)
+
+    try:
+        return query_sources(config["prometheus_url"], run, config.get("prometheus_client"))
+    except prometheus.PrometheusError as e:
+        st.error(str(e))
+        return None
+
+def to_local_datetimes(timestamps):
+    """Convert unix timestamps to naive local datetimes for charting"""
+    local_tz = datetime.now().astimezone().tzinfo
+    return pd.to_datetime(timestamps, unit="s", utc=True).tz_convert(local_tz).tz_localize(None)
+
+def get_snapshot(config, demo_mode=False, force_refresh=False):
+    """Process-wide mount snapshot, rebuilt at most once per refresh_interval
+
+    Every session reads the same immutable MountSnapshot; concurrent sessions
+    asking while it is being rebuilt wait for the one fetch in flight.
+    """
+    collector_settings = config.get("collector", {})
+    if not demo_mode and collector_settings.get("enabled"):
+        snapshot = collected_snapshot(config, force_refresh)
+        if snapshot is not None:
+            return snapshot
+        # Nothing collected yet: fall back to querying Prometheus directly
+
+    key = snapshot_key(config, demo_mode)
+    failed = snapshot_errors.get(key)
+    # Don't retry a failing Prometheus on every rerun of every session
+    if failed and not force_refresh and time.time() - failed[0] < config["refresh_interval"]:
+        return latest_snapshots.get(key) or MountSnapshot(None)
+
+    ttl = 0 if force_refresh else config["refresh_interval"]
+    try:
+        # A failed query raises out of the loader, so the cache keeps nothing for it
+        snapshot = snapshot_cache.get_or_fetch(
+            key, ttl, lambda: next_snapshot(config, key, get_mount_accessibility(config, demo_mode), demo_mode)
+        )
+    except prometheus.PrometheusError as e:
+        snapshot_errors[key] = (time.time(), str(e))
+        # Keep showing the last good snapshot; render_status flags it in every session
+        return latest_snapshots.get(key) or MountSnapshot(None)
+    snapshot_errors.pop(key, None)
+    return snapshot
+
+def snapshot_key(config, demo_mode=False):
+    """Key of the shared snapshot for the configured data source"""
+    if demo_mode:
+        return ("demo",)
+    return (prometheus.source_key(config["prometheus_url"]), config["metric_name"],
+            json.dumps(config["metric_mapping"], sort_keys=True))
+
+def next_snapshot(config, key, df, demo_mode=False):
+    """Snapshot for a freshly fetched mount table, logging the transitions since the previous one
+    and adding it to the long-retention archive
+
+    When nothing changed the previous snapshot is re-stamped rather than
+    re-indexed, so it keeps its version and every view built from it is reused.
+    An empty table (a failed query) is not diffed.
+    """
+    created_at = time.time()
+    if df.empty:
+        return MountSnapshot(df, created_at)
+    source_errors = df.attrs.get("source_errors", {})
+    changes = collector.record_history(config, df, created_at, demo_mode)
+    previous = latest_snapshots.get(key)
+    if (previous is not None and changes.empty and len(previous) == len(df)
+            and previous.source_errors == source_errors):
+        snapshot = previous.refreshed(created_at)
+    else:
+        with instrumentation.span("snapshot.index", rows=len(df)):
+            snapshot = MountSnapshot(df, created_at)
+    latest_snapshots[key] = snapshot
+    return snapshot
+
+def collected_snapshot(config, force_refresh=False):
+    """Latest snapshot written by the background collector, or None if there is none yet
+
+    The file is only re-read when its modification time changes.
+    """
+    if config.get("collector", {}).get("run_in_app", True):
+        background = collector.ensure_collector(config)
+        if force_refresh:
+            background.run_once()
+
+    path = collector.snapshot_path(config["cache_dir"])
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    def load():
+        loaded = collector.read_snapshot(path)
+        return None if loaded is None else MountSnapshot(*loaded)
+
+    return snapshot_cache.get_or_fetch((path, mtime), float("inf"), load)
+
+def pushdown_query(config, servers=None, clients=None, paths=None, touching=None):
+    """PromQL selecting only the series a narrowed view needs, or None to filter locally
+
+    Server, client and path filters are combined into one selector; `touching`
+    nodes may be either end of a mount, so it becomes the union of a server and
+    a client selector.
+    """
+    settings = config.get("query_pushdown", {})
+    if not settings.get("enabled", True):
+        return None
+    mapping = config["metric_mapping"]
+    metric_name = config["metric_name"]
+    max_values = settings.get("max_values", 100)
+    if any(len(values) > max_values for values in (servers, clients, paths, touching) if values):
         return None
 
+    if touching:
+        return " or ".join(
+            prometheus.label_selector(metric_name, {label: touching})
+            for label in (mapping["server_label"], mapping["client_label"])
+        )
+    if not servers and not clients:
+        return None
+    matchers = {}
+    if servers:
+        matchers[mapping["server_label"]] = servers
+        # Paths only narrow the view together with servers, as in the table tab
+        if paths:
+            matchers[mapping["path_label"]] = paths
+    if clients:
+        matchers[mapping["client_label"]] = clients
+    return prometheus.label_selector(metric_name, matchers)
+
+def get_view_snapshot(config, snapshot, demo_mode=False, **filters):
+    """Snapshot to filter for a narrowed view
+
+    When the filters translate to label matchers, Prometheus is asked for just
+    those series (shared by sessions for refresh_interval). The full snapshot
+    is used instead when it is fresher, for example right after a refresh, or
+    when the filtered query fails.
+    """
+    query = None if demo_mode else pushdown_query(config, **filters)
+    if query is None:
+        return snapshot
+
+    def fetch():
+        return MountSnapshot(collector.query_mounts(config, query))
+
+    key = (prometheus.source_key(config["prometheus_url"]), query,
+           json.dumps(config["metric_mapping"], sort_keys=True))
+    try:
+        view = view_snapshot_cache.get_or_fetch(key, config["refresh_interval"], fetch)
+    except prometheus.PrometheusError as e:
+        st.warning(f"Filtered query failed, showing the cached snapshot: {e}")
+        return snapshot
+    if view.created_at <= snapshot.created_at:
+        return snapshot
+    # Instances missing only from the filtered query; the page already warns about the rest
+    warn_unavailable_sources({label: error for label, error in view.source_errors.items()
+                              if label not in snapshot.source_errors})
+    return view
+
+def demo_mounts(config):
+    """Mount table backing the demo mode history views"""
+    snapshot = get_snapshot(config, demo_mode=True)
+    return generate_sample_data(config) if snapshot.empty else snapshot.df
+
+def configure_caches(config):
+    """Apply the cache size settings to the process-wide caches"""
+    prometheus.query_cache.set_max_entries(config.get("query_cache", {}).get("max_entries", 256))
+    graph_html_cache.set_max_entries(config.get("graph_cache", {}).get("max_entries", 32))
+
+def query_cache_ttl(config, force_refresh=False):
+    """Seconds a shared query result stays fresh (0 forces a new fetch)"""
+    if force_refresh:
+        return 0
+    return config.get("query_cache", {}).get("ttl") or config["refresh_interval"]
+
 def get_mount_accessibility(config, demo_mode=False):
-    """Get the current mount accessibility data from Prometheus or generate sample data"""
+    """Get the current mount accessibility data from Prometheus or generate sample data
+
+    The response is streamed: series are decoded one at a time straight into the
+    compact mount table. Several Prometheus instances are queried concurrently
+    and merged with a `source` column. Freshness is handled by the shared
+    snapshot in get_snapshot.
+    """
     if demo_mode:
-        return generate_sample_data(config)
-    
-    result = query_prometheus(config["prometheus_url"], config["metric_name"])
+        return compact_mounts(generate_sample_data(config))
 
-    if not result or result["status"] != "success" or not result["data"]["result"]:
+    # Feel free to add more fields in snapshot.mounts_from_series if you want to visualize more information.
+    # A PrometheusError propagates so get_snapshot keeps the previous snapshot instead of caching an empty one
+    with instrumentation.span("get_mount_accessibility") as span:
+        df = collector.query_mounts(config)
+        span.set(rows=len(df))
+
+    if df.empty:
         st.warning("No mount accessibility data found in Prometheus")
-        return pd.DataFrame()
+    return df
+
+def _node_mount_counts(df):
+    """Count exports (unique mount paths served) and mounts per node in a single pass"""
+    exports = df.groupby('nfs_server', sort=False, observed=True)['mount_path'].nunique()
+    imports = df['nfs_client'].value_counts(sort=False)
+    return exports, imports
+
+def _add_nodes_bulk(net, node_ids, colors, titles, sizes, border_widths, positions=None, labels=None):
+    """Append nodes to a PyVis network without its per-node linear membership scan"""
+    if labels is None:
+        labels = node_ids
+    for node, label, color, title, size, border_width in zip(node_ids, labels, colors, titles, sizes, border_widths):
+        # Mirror the options pyvis' Node() would produce for add_node(...)
+        options = {
+            "color": color,
+            "title": title,
+            "size": size,
+            "borderWidth": border_width,
+            "id": node,
+            "label": label,
+            "shape": "dot",
+            "font": {"color": net.font_color},
+        }
+        if positions is not None:
+            options["x"], options["y"] = positions[node]
+        net.nodes.append(options)
+        net.node_ids.append(node)
+        net.node_map[node] = options
+
+def _add_edges_bulk(net, sources, targets, titles, colors, labels, widths=None):
+    """Append directed edges to a PyVis network without its per-edge node lookups"""
+    if widths is None:
+        widths = [2] * len(sources)
+    net.edges.extend(
+        {
+            "title": title,
+            "color": color,
+            "label": label,
+            "arrows": "to",
+            "width": width,
+            "from": source,
+            "to": target,
+        }
+        for source, target, title, color, label, width in zip(sources, targets, titles, colors, labels, widths)
+    )
 
-    # Process the prometheus gauge data into a DataFrame
-    mapping = config["metric_mapping"]
-    records = []
-    for metric in result["data"]["result"]:
-        records.append({
-            "nfs_server": metric["metric"][mapping["server_label"]],
-            "nfs_client": metric["metric"][mapping["client_label"]],
-            "mount_path": metric["metric"][mapping["path_label"]],
-            "accessible": int(metric["value"][1]) == 1
-            # Feel free to add more fields to the dataframe if you want to visualize more information.
+def build_uptime_query(config, hours):
+    """Build one PromQL instant query returning uptime, state changes and sample counts per mount
+
+    The three aggregations are tagged with a `stat` label and unioned with `or`
+    so Prometheus evaluates everything at scrape resolution in a single request.
+    """
+    selector = f'{config["metric_name"]}[{hours}h]'
+    parts = [
+        f'label_replace({func}({selector}), "stat", "{stat}", "", "")'
+        for func, stat in [("avg_over_time", "uptime"), ("changes", "state_changes"), ("count_over_time", "samples")]
+    ]
+    return " or ".join(parts)
+
+def get_cluster_uptime(config, hours, demo_mode=False):
+    """Get one uptime row per (server, client, mount_path), worst mounts first"""
+    columns = ["nfs_server", "nfs_client", "mount_path", "uptime", "state_changes", "samples"]
+
+    if demo_mode:
+        mounts = demo_mounts(config)
+        records = []
+        for row in mounts.itertuples(index=False):
+            values = [value for _, value in generate_sample_historical_data(
+                config, row.nfs_server, row.nfs_client, row.mount_path, hours)]
+            records.append((row.nfs_server, row.nfs_client, row.mount_path,
+                            sum(values) / len(values), int(np.count_nonzero(np.diff(values))), len(values)))
+        uptime_df = pd.DataFrame(records, columns=columns)
+    else:
+        result = query_prometheus(
+            config["prometheus_url"],
+            build_uptime_query(config, hours),
+            client_config=config.get("prometheus_client"),
+            cache_ttl=query_cache_ttl(config)
+        )
+        if not result or result["status"] != "success" or not result["data"]["result"]:
+            return pd.DataFrame(columns=columns)
+
+        # One row per (mount, stat), pivoted to one row per mount
+        mapping = config["metric_mapping"]
+        series = result["data"]["result"]
+        long_df = pd.DataFrame({
+            "nfs_server": [metric["metric"].get(mapping["server_label"]) for metric in series],
+            "nfs_client": [metric["metric"].get(mapping["client_label"]) for metric in series],
+            "mount_path": [metric["metric"].get(mapping["path_label"]) for metric in series],
+            "stat": [metric["metric"].get("stat") for metric in series],
+            "value": [float(metric["value"][1]) for metric in series],
         })
+        index = columns[:3]
+        if prometheus.is_federated(config["prometheus_url"]):
+            # The same mount names may exist at several sites
+            long_df["source"] = [metric["metric"].get(prometheus.SOURCE_LABEL) for metric in series]
+            index = ["source"] + index
+        uptime_df = (
+            long_df.pivot_table(index=index, columns="stat", values="value", aggfunc="first")
+            .reindex(columns=columns[3:])
+            .reset_index()
+        )
+        uptime_df.columns.name = None
+
+    uptime_df["uptime"] = uptime_df["uptime"] * 100
+    return uptime_df.sort_values(["uptime", "state_changes"], ascending=[True, False], ignore_index=True)
+
+def render_uptime_table(config, hours):
+    """Render the cluster-wide worst mounts table"""
+    demo_mode = st.session_state.get('demo_mode', False)
+    uptime_df = get_cluster_uptime(config, hours, demo_mode)
+
+    if uptime_df.empty:
+        st.info("No historical data available")
+        return
+
+    st.caption(f"{len(uptime_df)} mounts over the past {hours}h. Click a column header to sort.")
+    st.dataframe(
+        uptime_df.rename(columns={
+            'source': 'Source',
+            'nfs_server': 'NFS Server',
+            'nfs_client': 'NFS Client',
+            'mount_path': 'Mount Path',
+            'uptime': 'Uptime %',
+            'state_changes': 'State Changes',
+            'samples': 'Samples'
+        }),
+        column_config={"Uptime %": st.column_config.NumberColumn(format="%.2f")},
+        use_container_width=True,
+        hide_index=True
+    )
 
-    return pd.DataFrame(records)
+def get_cluster_heatmap(config, hours, demo_mode=False):
+    """Get the mounts x time accessibility matrix for the whole cluster"""
+    buckets = config.get("heatmap", {}).get("buckets", 288)
+    end_time = int(time.time())
 
-def create_pyvis_network(df, config, show_all_nodes=False, focus_nodes=None):
-    """Create a PyVis network visualization from the mount accessibility data"""
+    if demo_mode:
+        # Sample history is spaced 10 minutes apart
+        step = 600
+        buckets = hours * 3600 // step
+        start_time = (end_time - hours * 3600) // step * step
+        mounts = demo_mounts(config)
+        labels, timestamps, values = [], [], []
+        for row in mounts.itertuples(index=False):
+            hist_data = generate_sample_historical_data(config, row.nfs_server, row.nfs_client, row.mount_path, hours)
+            labels.append((row.nfs_server, row.nfs_client, row.mount_path))
+            timestamps.append(np.array([timestamp.timestamp() for timestamp, _ in hist_data]))
+            values.append(np.array([value for _, value in hist_data]))
+        return build_heatmap(labels, timestamps, values, start_time, step, buckets)
+
+    # Each bucket holds the worst value seen in it, so short outages are not skipped over
+    step = max(1, hours * 3600 // buckets)
+    end_time = end_time // step * step
+    start_time = end_time - (buckets - 1) * step
+    query = f'min_over_time({config["metric_name"]}[{step}s])'
+
+    def run(url, settings):
+        # Stream the series straight into the matrix instead of caching the parsed response
+        series = prometheus.stream_range_query(url, query, start_time, end_time, step, settings)
+        return build_heatmap_from_series(series, config["metric_mapping"], start_time, step, buckets)
+
+    def fetch():
+        if not prometheus.is_federated(config["prometheus_url"]):
+            return run(config["prometheus_url"], config.get("prometheus_client"))
+        heatmaps, errors = prometheus.fan_out(config["prometheus_url"], run, config.get("prometheus_client"))
+        return dict(merge_heatmaps(heatmaps), source_errors=errors)
+
+    key = (prometheus.source_key(config["prometheus_url"]), query, start_time, end_time, step, "heatmap")
+    try:
+        heatmap = prometheus.query_cache.get_or_fetch(key, query_cache_ttl(config), fetch)
+        warn_unavailable_sources(heatmap.get("source_errors", {}))
+        return heatmap
+    except prometheus.PrometheusError as e:
+        st.error(str(e))
+        return build_heatmap([], [], [], start_time, step, buckets)
+
+def render_heatmap(config, hours):
+    """Render the cluster-wide mounts x time heatmap"""
+    demo_mode = st.session_state.get('demo_mode', False)
+    heatmap = get_cluster_heatmap(config, hours, demo_mode)
+    total_rows = len(heatmap["server"])
+
+    if not total_rows:
+        st.info("No historical data available")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        sort_by = st.selectbox("Sort rows by", options=["failures", "server", "client"],
+                               format_func=lambda key: {"failures": "Most failures", "server": "NFS Server",
+                                                        "client": "NFS Client"}[key])
+    with col2:
+        max_rows = st.number_input("Rows to show", min_value=1, max_value=total_rows,
+                                   value=min(200, total_rows), step=50)
+
+    order = sort_rows(heatmap, sort_by)[:int(max_rows)]
+    edge_colors = config["visualization"]["edge_colors"]
+    image = heatmap_image(
+        heatmap["matrix"][order],
+        edge_colors["accessible"],
+        edge_colors["inaccessible"],
+        row_height=max(1, 400 // len(order))
+    )
+
+    bucket_times = to_local_datetimes(heatmap["bucket_start"][[0, -1]])
+    st.caption(
+        f"{len(order)} of {total_rows} mounts, {heatmap['matrix'].shape[1]} buckets of "
+        f"{format_duration(heatmap['step'])} from {bucket_times[0]:%Y-%m-%d %H:%M} to {bucket_times[1]:%Y-%m-%d %H:%M}. "
+        "Red: inaccessible, green: accessible, gray: no data."
+    )
+    st.image(image, use_container_width=True)
+
+    # Row labels for the rows shown above, in the same order
+    labels = pd.DataFrame({
+        'NFS Server': heatmap["server"][order],
+        'NFS Client': heatmap["client"][order],
+        'Mount Path': heatmap["mount_path"][order],
+        'Failed Buckets': failure_counts(heatmap)[order],
+    })
+    if "source" in heatmap:
+        labels.insert(0, 'Source', heatmap["source"][order])
+    st.dataframe(labels, use_container_width=True)
+
+def _new_network(config):
+    """Create an empty PyVis network with the configured look and physics"""
     # Get visualization settings
     viz_config = config["visualization"]
     network_config = viz_config["network"]
@@ -273,88 +651,335 @@ def create_pyvis_network(df, config, show_all_nodes=False, focus_nodes=None):
         central_gravity=physics_config["central_gravity"], 
         spring_length=physics_config["spring_length"]
     )
+    return net
 
+def _node_styles(df, nodes, config, focus_nodes=None):
+    """Colors, tooltips, sizes and border widths for individual nodes, built column-wise"""
     # Get node types with colors and titles
     node_types = config["node_types"]
     default_node = node_types.get("default", {"color": "#607D8B", "title": "Cluster Node"})
 
+    # Get node sizing config
+    node_sizing = config["visualization"]["node_sizing"]
+
+    # Count exports (server) and mounts (client) for every node at once
+    exports, imports = _node_mount_counts(df)
+    node_index = pd.Index(nodes, dtype=object)
+    exports_count = exports.reindex(node_index, fill_value=0).astype(int)
+    imports_count = imports.reindex(node_index, fill_value=0).astype(int)
+
+    # Resolve styling per node, then build tooltips and sizes column-wise
+    node_info = [node_types.get(node, default_node) for node in nodes]
+    node_colors = [info["color"] for info in node_info]
+    node_kinds = pd.Series([info.get('title', 'Cluster Node') for info in node_info], index=node_index).astype(str)
+    node_titles = (
+        pd.Series(node_index, index=node_index).astype(str) + " \n " + node_kinds
+        + "  \n Exports: " + exports_count.astype(str)
+        + " \n Mounts: " + imports_count.astype(str)
+    )
+    node_sizes = node_sizing["base_size"] + exports_count * node_sizing["export_multiplier"]
+
+    # Highlight focused nodes
+    highlighted = node_index.isin(list(focus_nodes or []))
+    border_widths = np.where(highlighted, 3, 1)
+
+    return node_colors, node_titles.tolist(), node_sizes.tolist(), border_widths.tolist()
+
+def _fixed_positions(net, config, nodes, edge_pairs):
+    """Use precomputed fixed positions instead of in-browser physics when configured"""
+    layout_config = layout_settings(config["visualization"].get("layout"))
+    if layout_config["engine"] == "physics":
+        return None
+    net.toggle_physics(False)
+    return compute_layout(config["cache_dir"], nodes, edge_pairs, layout_config)
+
+def blend_colors(start_color, end_color, share):
+    """Linearly blend two '#RRGGBB' colors by `share` (array of 0..1), returning hex strings"""
+    start_rgb = np.array(hex_to_rgb(start_color), dtype=float)
+    end_rgb = np.array(hex_to_rgb(end_color), dtype=float)
+    # Shares repeat a lot (mostly 0), so only format each distinct share once
+    unique, inverse = np.unique(np.asarray(share, dtype=float), return_inverse=True)
+    rgb = np.rint(start_rgb + (end_rgb - start_rgb) * unique[:, None]).astype(int)
+    palette = np.array([f"#{r:02X}{g:02X}{b:02X}" for r, g, b in rgb], dtype=object)
+    return palette[inverse.reshape(-1)].tolist()
+
+def _add_merged_edges(net, edges, config, max_paths=20):
+    """Add one edge per (client, server) pair, weighted by mount count and failing share"""
+    edge_colors = config["visualization"]["edge_colors"]
+    mount_prefix = config["metric_mapping"]["mount_path_prefix"]
+
+    # Per-path tooltip lines, built column-wise and joined per pair
+    accessible = edges['accessible'].astype(bool)
+    detail = (
+        mount_prefix + edges['mount_path'].astype(str)
+        + pd.Series(np.where(accessible, " ✅", " ❌"), index=edges.index).astype(str)
+    )
+    pairs = pd.DataFrame({
+        "client": edges['nfs_client'].to_numpy(),
+        "server": edges['nfs_server'].to_numpy(),
+        "path": edges['mount_path'].astype(str).to_numpy(),
+        "failing": (~accessible).to_numpy(),
+        "detail": detail.to_numpy(),
+    })
+    # Failing paths first so they survive the tooltip cap
+    pairs = pairs.sort_values(["failing", "path"], ascending=[False, True], kind="stable")
+    grouped = pairs.groupby(["client", "server"], sort=False)
+    merged = grouped.agg(
+        total=("failing", "size"),
+        failing=("failing", "sum"),
+        first_path=("path", "first"),
+    )
+    # Keep the first `max_paths` lines per pair and concatenate them with a grouped sum
+    shown = pairs[grouped.cumcount().to_numpy() < max_paths]
+    merged["detail"] = ("<br>" + shown["detail"].astype(object)).groupby(
+        [shown["client"], shown["server"]], sort=False).sum()
+    merged = merged.reset_index()
+
+    total = merged["total"].to_numpy()
+    failing = merged["failing"].to_numpy()
+    more = np.where(total > max_paths, "<br>… and " + (total - max_paths).astype(str) + " more", "")
+    titles = (
+        "Mounts: " + merged["client"].astype(str) + " mounts " + merged["server"].astype(str)
+        + "<br>Inaccessible: " + merged["failing"].astype(str) + " of " + merged["total"].astype(str)
+        + merged["detail"].astype(str) + pd.Series(more, index=merged.index).astype(str)
+    )
+    labels = np.where(total == 1, merged["first_path"].astype(str), pd.Series(total).astype(str) + " mounts")
+
+    _add_edges_bulk(
+        net,
+        merged["client"].to_numpy(dtype=object).tolist(),
+        merged["server"].to_numpy(dtype=object).tolist(),
+        titles.to_numpy(dtype=object).tolist(),
+        blend_colors(edge_colors["accessible"], edge_colors["inaccessible"], failing / total),
+        labels.tolist(),
+        (2 + np.log2(total)).tolist()
+    )
+
+def create_pyvis_network(df, config, show_all_nodes=False, focus_nodes=None, merge_edges=False,
+                         neighbor_nodes=None):
+    """Create a PyVis network visualization from the mount accessibility data
+
+    With `merge_edges`, all mounts between a client and a server are drawn as one
+    weighted edge instead of one edge per mount path. `neighbor_nodes` are the
+    focus nodes plus their neighbors, as looked up in the snapshot adjacency
+    indexes; without it they are looked up in an index of `df`.
+    """
+    net = _new_network(config)
+    viz_config = config["visualization"]
+
     # Determine which nodes to include
     if show_all_nodes:
         # Include all nodes in the visualization
-        nodes_to_include = config["cluster_nodes"]
-    else:
+        nodes_to_include = list(dict.fromkeys(config["cluster_nodes"]))
+    elif focus_nodes:
         # Include only focused nodes and their connected nodes
-        nodes_to_include = set()
+        if neighbor_nodes is None:
+            neighbor_nodes = MountSnapshot(df).neighbors(list(focus_nodes))
+        nodes_to_include = list(neighbor_nodes)
+    else:
+        nodes_to_include = []
+    node_index = pd.Index(nodes_to_include, dtype=object)
 
-        if focus_nodes:
-            # Always include the focused nodes
-            nodes_to_include.update(focus_nodes)
+    # Only add edges for nodes we're including
+    edges = df.drop_duplicates(['nfs_server', 'nfs_client', 'mount_path'])
+    edges = edges[edges['nfs_server'].isin(node_index) & edges['nfs_client'].isin(node_index)]
 
-            # Include nodes that have connections to/from focused nodes
-            for _, row in df.iterrows():
-                if row['nfs_server'] in focus_nodes:
-                    nodes_to_include.add(row['nfs_client'])
-                if row['nfs_client'] in focus_nodes:
-                    nodes_to_include.add(row['nfs_server'])
+    positions = _fixed_positions(net, config, nodes_to_include, list(zip(edges['nfs_client'], edges['nfs_server'])))
+    _add_nodes_bulk(net, nodes_to_include, *_node_styles(df, nodes_to_include, config, focus_nodes), positions)
 
-    # Get node sizing config
-    node_sizing = viz_config["node_sizing"]
-    
-    # Add the nodes
-    for node in nodes_to_include:
-        # Count exports (server) and mounts (client) for this node
-        exports_count = len(df[df['nfs_server'] == node].drop_duplicates(['mount_path']))
-        imports_count = len(df[df['nfs_client'] == node])
-
-        # Add the node with appropriate styling
-        node_info = node_types.get(node, default_node)
-
-        # Highlight focused nodes
-        highlight = focus_nodes and node in focus_nodes
-        border_width = 3 if highlight else 1
-
-        net.add_node(
-            node,
-            label=node,
-            color=node_info["color"],
-            title=f"{node} \n {node_info.get('title', 'Cluster Node')}  \n Exports: {exports_count} \n Mounts: {imports_count}",
-            size=node_sizing["base_size"] + (exports_count * node_sizing["export_multiplier"]),
-            borderWidth=border_width
-        )
+    if merge_edges:
+        _add_merged_edges(net, edges, config)
+        net.show_buttons(filter_=['physics', 'nodes', 'edges'])
+        return net
 
     # Get edge colors and mount path prefix
     edge_colors = viz_config["edge_colors"]
     mount_prefix = config["metric_mapping"]["mount_path_prefix"]
-    
-    # Add edges based on mount accessibility
-    for _, row in df.drop_duplicates(['nfs_server', 'nfs_client', 'mount_path']).iterrows():
-        # Only add edges for nodes we're including
-        if row['nfs_server'] in nodes_to_include and row['nfs_client'] in nodes_to_include:
-            edge_color = edge_colors["accessible"] if row['accessible'] else edge_colors["inaccessible"]
-
-            # Create a title with detailed information
-            title = f"Mount: {row['nfs_client']} mounts {row['nfs_server']}:{mount_prefix}{row['mount_path']}"
-            title += "<br>Status: " + ("✅ Accessible" if row['accessible'] else "❌ Inaccessible")
-
-            # Add the edge - Note: reversed source and target to show client->server relationship
-            net.add_edge(
-                row['nfs_client'],
-                row['nfs_server'],
-                title=title,
-                color=edge_color,
-                label=row['mount_path'],
-                arrows="to",
-                width=2
-            )
+    accessible = edges['accessible'].astype(bool).to_numpy()
+    servers = edges['nfs_server'].astype(str)
+    clients = edges['nfs_client'].astype(str)
+    paths = edges['mount_path'].astype(str)
+
+    # Create titles with detailed information and colors for all edges at once
+    statuses = pd.Series(
+        np.where(accessible, "<br>Status: ✅ Accessible", "<br>Status: ❌ Inaccessible"),
+        index=edges.index
+    ).astype(str)
+    edge_titles = "Mount: " + clients + " mounts " + servers + ":" + mount_prefix + paths + statuses
+    edge_color_values = np.where(accessible, edge_colors["accessible"], edge_colors["inaccessible"])
+
+    # Add the edges - Note: reversed source and target to show client->server relationship
+    _add_edges_bulk(
+        net,
+        edges['nfs_client'].tolist(),
+        edges['nfs_server'].tolist(),
+        edge_titles.tolist(),
+        edge_color_values.tolist(),
+        edges['mount_path'].tolist()
+    )
 
     # Enable physics simulation button and other controls
     net.show_buttons(filter_=['physics', 'nodes', 'edges'])
 
     return net
 
-def render_network_tab(config):
+def node_groups(nodes, config):
+    """Map each node to its group for the level-of-detail view
+
+    Groups come from the node's `node_types` title (`grouping.by: node_type`)
+    or from a regex over the node name (`grouping.by: regex`), using the named
+    group `group` or the first capture group. Unmatched nodes go to `other`.
+    """
+    grouping = {"by": "node_type", "pattern": r"^(.*?)\d*$"}
+    grouping.update(config["visualization"].get("grouping", {}))
+    nodes = pd.Series(pd.unique(pd.Series(list(nodes), dtype=object)), dtype=object)
+
+    if grouping["by"] == "regex":
+        extracted = nodes.astype(str).str.extract(grouping["pattern"], expand=True)
+        column = "group" if "group" in extracted.columns else extracted.columns[0]
+        groups = extracted[column].replace("", np.nan).fillna("other")
+    else:
+        node_types = config["node_types"]
+        default_title = node_types.get("default", {}).get("title", "Cluster Node")
+        groups = nodes.map(lambda node: node_types.get(node, {}).get("title", default_title))
+
+    return pd.Series(groups.astype(object).to_numpy(), index=pd.Index(nodes, dtype=object))
+
+def create_grouped_network(df, config, show_all_nodes=False, expanded_groups=None):
+    """Create a level-of-detail network where nodes are collapsed into group supernodes
+
+    Only the visible level is built: collapsed groups become one node and all
+    mounts between two visible nodes become one edge with status counts.
+    Members of groups listed in `expanded_groups` are shown individually.
+    """
+    net = _new_network(config)
+    viz_config = config["visualization"]
+    node_sizing = viz_config["node_sizing"]
+    edge_colors = viz_config["edge_colors"]
+    expanded = set(expanded_groups or [])
+
+    members = list(pd.unique(pd.concat([df['nfs_server'], df['nfs_client']], ignore_index=True)))
+    if show_all_nodes:
+        members = list(dict.fromkeys(list(config["cluster_nodes"]) + members))
+    groups = node_groups(members, config)
+
+    # Each node is drawn as itself if its group is expanded, otherwise as its group
+    visible = pd.Series(
+        np.where(groups.isin(expanded), groups.index.astype(str), "group:" + groups.astype(str)),
+        index=groups.index
+    )
+
+    # Aggregate mounts between visible nodes into one edge each
+    mounts = df.drop_duplicates(['nfs_server', 'nfs_client', 'mount_path'])
+    mounts = pd.DataFrame({
+        "source": mounts['nfs_client'].map(visible).to_numpy(),
+        "target": mounts['nfs_server'].map(visible).to_numpy(),
+        "accessible": mounts['accessible'].astype(bool).to_numpy(),
+    })
+    edges = mounts.groupby(["source", "target"], sort=False, observed=True)["accessible"].agg(total="size", accessible="sum").reset_index()
+    edges["inaccessible"] = edges["total"] - edges["accessible"]
+    # Mounts within one collapsed group are counted on its supernode instead of drawn as a self-loop
+    loops = edges["source"] == edges["target"]
+    internal_mounts = dict(zip(edges.loc[loops, "source"], edges.loc[loops, "total"]))
+    edges = edges[~loops].reset_index(drop=True)
+
+    # Supernodes for collapsed groups, individual nodes for expanded ones
+    collapsed = groups[~groups.isin(expanded)]
+    group_sizes = collapsed.value_counts(sort=False)
+    group_ids = ["group:" + str(group) for group in group_sizes.index]
+    first_member = collapsed.groupby(collapsed, sort=False).head(1)
+    node_types = config["node_types"]
+    default_node = node_types.get("default", {"color": "#607D8B", "title": "Cluster Node"})
+    group_colors = [node_types.get(node, default_node)["color"] for node in first_member.index]
+    group_titles = [f"{group} \n Nodes: {count} \n Mounts within group: {internal_mounts.get('group:' + str(group), 0)}"
+                    f" \n (expand to show members)" for group, count in group_sizes.items()]
+    group_sizes_px = (node_sizing["base_size"] + np.sqrt(group_sizes.to_numpy()) * node_sizing["export_multiplier"] * 2).tolist()
+
+    expanded_nodes = list(groups.index[groups.isin(expanded)])
+    node_ids = group_ids + expanded_nodes
+    positions = _fixed_positions(net, config, node_ids, list(zip(edges["source"], edges["target"])))
+
+    group_labels = [f"{group} ({count})" for group, count in group_sizes.items()]
+    _add_nodes_bulk(net, group_ids, group_colors, group_titles, group_sizes_px, [3] * len(group_ids), positions,
+                    group_labels)
+    _add_nodes_bulk(net, expanded_nodes, *_node_styles(df, expanded_nodes, config), positions)
+
+    # Edge color shows whether any aggregated mount is failing, width the mount count
+    edge_titles = (
+        edges["source"].astype(str).str.replace("group:", "", regex=False) + " → "
+        + edges["target"].astype(str).str.replace("group:", "", regex=False)
+        + "<br>Mounts: " + edges["total"].astype(str)
+        + "<br>✅ Accessible: " + edges["accessible"].astype(str)
+        + "<br>❌ Inaccessible: " + edges["inaccessible"].astype(str)
+    )
+    edge_color_values = np.where(edges["inaccessible"] > 0, edge_colors["inaccessible"], edge_colors["accessible"])
+    _add_edges_bulk(
+        net,
+        edges["source"].tolist(),
+        edges["target"].tolist(),
+        edge_titles.tolist(),
+        edge_color_values.tolist(),
+        edges["total"].astype(str).tolist(),
+        (1 + np.log2(edges["total"].to_numpy())).tolist()
+    )
+
+    net.show_buttons(filter_=['physics', 'nodes', 'edges'])
+    return net
+
+def network_view_key(df, config, show_all_nodes=False, focus_nodes=None, expanded_groups=None, merge_edges=False,
+                     neighbor_nodes=None):
+    """Content hash of everything that determines the network graph HTML"""
+    digest = hashlib.sha1()
+    digest.update(json.dumps(list(df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    digest.update(json.dumps(
+        {
+            "show_all_nodes": show_all_nodes,
+            "focus_nodes": sorted(focus_nodes or []),
+            "neighbor_nodes": None if neighbor_nodes is None else sorted(neighbor_nodes),
+            "expanded_groups": None if expanded_groups is None else sorted(expanded_groups),
+            "merge_edges": merge_edges,
+            "config": config
+        },
+        sort_keys=True,
+        default=str
+    ).encode("utf-8"))
+    return digest.hexdigest()
+
+def session_memo(name, inputs, compute):
+    """compute() for this session, reused until `inputs` differ from the last call"""
+    memo = st.session_state.get(f"_memo_{name}")
+    if memo is not None and memo[0] == inputs:
+        return memo[1]
+    value = compute()
+    st.session_state[f"_memo_{name}"] = (inputs, value)
+    return value
+
+def get_network_html(df, config, show_all_nodes=False, focus_nodes=None, expanded_groups=None, merge_edges=False,
+                     neighbor_nodes=None):
+    """Build the network graph HTML in memory, memoized by a hash of the view
+
+    Passing `expanded_groups` (possibly empty) selects the grouped level-of-detail view.
+    """
+    key = network_view_key(df, config, show_all_nodes, focus_nodes, expanded_groups, merge_edges, neighbor_nodes)
+
+    def build():
+        with instrumentation.span("graph.build", rows=len(df)) as span:
+            if expanded_groups is not None:
+                net = create_grouped_network(df, config, show_all_nodes, expanded_groups)
+            else:
+                net = create_pyvis_network(df, config, show_all_nodes, focus_nodes, merge_edges, neighbor_nodes)
+            span.set(nodes=len(net.nodes), edges=len(net.edges))
+        with instrumentation.span("graph.serialize") as span:
+            html = net.generate_html()
+            span.set(bytes=len(html))
+        return html
+
+    return graph_html_cache.get_or_fetch(key, float("inf"), build)
+
+def render_network_tab(config, snapshot):
     """Render the network visualization tab"""
-    if 'df' in st.session_state and not st.session_state.df.empty:
+    if not snapshot.empty:
         # Add filters for the network view
         st.write("Filter the network visualization:")
 
@@ -365,7 +990,7 @@ def render_network_tab(config):
             # Filter by NFS Server nodes
             server_nodes = st.multiselect(
                 "Focus on NFS Server nodes",
-                options=sorted(st.session_state.df['nfs_server'].unique()),
+                options=snapshot.servers,
                 default=[]
             )
 
@@ -373,7 +998,7 @@ def render_network_tab(config):
             # Filter by NFS Client nodes
             client_nodes = st.multiselect(
                 "Focus on NFS Client nodes",
-                options=sorted(st.session_state.df['nfs_client'].unique()),
+                options=snapshot.clients,
                 default=[]
             )
 
@@ -389,61 +1014,97 @@ def render_network_tab(config):
         with col3:
             show_all_nodes = st.checkbox("Show all nodes", value=True)
 
-        # Filter the DataFrame based on selections
-        filtered_df = st.session_state.df.copy()
+        # Large cluster options: merge parallel mounts, or collapse nodes into groups
+        col1, col2, col3 = st.columns([1, 1, 2])
 
-        # Apply accessibility filters
-        if not show_accessible:
-            filtered_df = filtered_df[filtered_df['accessible'] == False]
-
-        if not show_inaccessible:
-            filtered_df = filtered_df[filtered_df['accessible'] == True]
+        with col1:
+            merge_edges = st.checkbox("Merge mounts per node pair",
+                                      value=config["visualization"].get("merge_edges", False),
+                                      help="Draw one weighted edge per client/server pair")
 
-        # Apply node filters
+        with col2:
+            group_nodes = st.checkbox("Group nodes", value=False,
+                                      help="Collapse nodes into groups for large clusters")
+
+        expanded_groups = None
+        if group_nodes:
+            with col3:
+                expanded_groups = st.multiselect(
+                    "Expand groups",
+                    options=sorted(node_groups(pd.Series(snapshot.nodes, dtype=object), config).unique()),
+                    default=[]
+                )
+
+        # Select rows through the snapshot indexes instead of copying and rescanning the frame
         focus_nodes = list(set(server_nodes + client_nodes))
-        if focus_nodes:
-            if not show_all_nodes:
-                # Only filter if not showing all nodes
-                filtered_df = filtered_df[
-                    (filtered_df['nfs_server'].isin(focus_nodes)) |
-                    (filtered_df['nfs_client'].isin(focus_nodes))
-                ]
-
-        # Create the network visualization
-        net = create_pyvis_network(
-            filtered_df,
-            config,
-            show_all_nodes=show_all_nodes,
-            focus_nodes=focus_nodes if focus_nodes else None
-        )
-
-        # Save to HTML file
-        html_file = os.path.join(config["cache_dir"], "nfs_network.html")
-        net.save_graph(html_file)
+        status = None
+        if show_accessible and not show_inaccessible:
+            status = "accessible"
+        elif show_inaccessible and not show_accessible:
+            status = "inaccessible"
+
+        # Only filter by focus nodes if not showing all nodes; Prometheus then
+        # returns just the series touching them
+        touching = focus_nodes if focus_nodes and not show_all_nodes else None
+        view = get_view_snapshot(config, snapshot, st.session_state.get('demo_mode', False), touching=touching)
+
+        def build_html():
+            filtered_df = view.select(status=status, touching=touching)
+            if not show_accessible and not show_inaccessible:
+                filtered_df = filtered_df.iloc[0:0]
+
+            # Create the network visualization (reused if this exact view was rendered before);
+            # the focus nodes' neighbors come from the snapshot adjacency indexes
+            return get_network_html(
+                filtered_df,
+                config,
+                show_all_nodes=show_all_nodes,
+                focus_nodes=focus_nodes if focus_nodes else None,
+                expanded_groups=expanded_groups,
+                merge_edges=merge_edges,
+                neighbor_nodes=view.neighbors(focus_nodes) if touching else None
+            )
 
-        # Read the HTML content
-        with open(html_file, "r", encoding="utf-8") as f:
-            html_content = f.read()
+        # A timer rerun or an unrelated widget leaves these unchanged, which skips
+        # selecting and hashing the rows again
+        html_content = session_memo("network_html", (
+            view.version, status, show_accessible or show_inaccessible, touching, show_all_nodes,
+            sorted(focus_nodes), expanded_groups, merge_edges, json.dumps(config, sort_keys=True, default=str)
+        ), build_html)
 
         # Display with HTML component
         st.components.v1.html(html_content, height=730)
     else:
         st.info("No data available. Please refresh.")
 
-def render_table_tab():
+MOUNT_TABLE_LABELS = {
+    'source': 'Source',
+    'nfs_server': 'NFS Server',
+    'nfs_client': 'NFS Client',
+    'mount_path': 'Mount Path',
+    'accessible': 'Status',
+}
+
+def format_mount_table(df):
+    """Display frame for a page of the mount table, with readable headers and status"""
+    page = {MOUNT_TABLE_LABELS.get(column, column): df[column].to_numpy()
+            for column in df.columns if column != 'accessible'}
+    page['Status'] = np.where(df['accessible'].to_numpy(dtype=bool), "✅ Accessible", "❌ Inaccessible")
+    return pd.DataFrame(page)
+
+def render_table_tab(config, snapshot):
     """Render the mount table tab"""
-    if 'df' in st.session_state and not st.session_state.df.empty:
+    if not snapshot.empty:
         # Add filters for the table
         server_filter = st.multiselect("Filter by NFS Server",
-                                       options=sorted(st.session_state.df['nfs_server'].unique()),
+                                       options=snapshot.servers,
                                        default=[])
 
         # Get available mount paths based on selected server(s)
         mount_paths = []
         if server_filter:
             # Get mount paths only for the selected servers
-            server_df = st.session_state.df[st.session_state.df['nfs_server'].isin(server_filter)]
-            mount_paths = sorted(server_df['mount_path'].unique())
+            mount_paths = snapshot.paths_for(server_filter)
 
             # Add mount path filter that depends on selected server(s)
             mount_path_filter = st.multiselect(
@@ -456,46 +1117,166 @@ def render_table_tab():
             st.info("Select an NFS Server to filter by mount path")
 
         client_filter = st.multiselect("Filter by NFS Client",
-                                       options=sorted(st.session_state.df['nfs_client'].unique()),
+                                       options=snapshot.clients,
                                        default=[])
 
         status_filter = st.multiselect("Filter by Status",
                                        options=["Accessible", "Inaccessible"],
                                        default=[])
 
-        # Apply filters
-        filtered_df = st.session_state.df.copy()
-
-        if server_filter:
-            filtered_df = filtered_df[filtered_df['nfs_server'].isin(server_filter)]
-
-            # Apply mount path filter if selected
-            if mount_path_filter:
-                filtered_df = filtered_df[filtered_df['mount_path'].isin(mount_path_filter)]
-
-        if client_filter:
-            filtered_df = filtered_df[filtered_df['nfs_client'].isin(client_filter)]
+        search = st.text_input("Search nodes and mount paths", placeholder="e.g. storage1 scratch")
 
-        if status_filter:
-            if "Accessible" in status_filter and "Inaccessible" not in status_filter:
-                filtered_df = filtered_df[filtered_df['accessible'] == True]
-            elif "Inaccessible" in status_filter and "Accessible" not in status_filter:
-                filtered_df = filtered_df[filtered_df['accessible'] == False]
+        # Apply filters as index lookups on the snapshot
+        status = None
+        if "Accessible" in status_filter and "Inaccessible" not in status_filter:
+            status = "accessible"
+        elif "Inaccessible" in status_filter and "Accessible" not in status_filter:
+            status = "inaccessible"
 
-        # Display the filtered table
-        st.dataframe(
-            filtered_df.rename(columns={
-                'nfs_server': 'NFS Server',
-                'nfs_client': 'NFS Client',
-                'mount_path': 'Mount Path',
-                'accessible': 'Status'
-            }).replace({True: "✅ Accessible", False: "❌ Inaccessible"}),
-            use_container_width=True
-        )
+        filters = {
+            "servers": server_filter or None,
+            "paths": mount_path_filter or None,
+            "clients": client_filter or None,
+        }
+        # A server or client filter is pushed down to Prometheus as label matchers
+        view = get_view_snapshot(config, snapshot, st.session_state.get('demo_mode', False), **filters)
+        positions = view.rows(status=status, search=search, **filters)
+        total = len(view) if positions is None else len(positions)
+
+        # Sort and paginate on the server; only the visible page is formatted and sent
+        sort_col, order_col, size_col, page_col = st.columns(4)
+        sort_by = sort_col.selectbox("Sort by", options=list(view.df.columns),
+                                     format_func=lambda column: MOUNT_TABLE_LABELS.get(column, column))
+        descending = order_col.selectbox("Order", options=["Ascending", "Descending"]) == "Descending"
+        page_size = size_col.selectbox("Rows per page", options=[50, 100, 250, 1000], index=1)
+        pages = max(1, -(-total // page_size))
+        # The page lives only in session state: a narrower filter keeps it where possible,
+        # clamped to the last page
+        st.session_state["table_page"] = min(st.session_state.get("table_page", 1), pages)
+        page = page_col.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, key="table_page")
+
+        start = (page - 1) * page_size
+        with instrumentation.span("table.page", rows=total) as span:
+            page_rows = view.sorted_rows(positions, sort_by, descending)[start:start + page_size]
+            st.dataframe(format_mount_table(view.df.take(page_rows)), use_container_width=True, hide_index=True)
+            span.set(page_rows=len(page_rows))
+        if total:
+            st.caption(f"Rows {start + 1:,}–{start + len(page_rows):,} of {total:,}")
+        else:
+            st.caption("No mounts match the filters")
     else:
         st.info("No data available. Please refresh.")
 
-def render_historical_tab(config):
+def format_duration(seconds):
+    """Format a duration in seconds as a short human readable string"""
+    if seconds is None:
+        return "n/a"
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+def render_interval_chart(intervals, config):
+    """Draw accessibility as a timeline of state intervals instead of per-sample points"""
+    edge_colors = config["visualization"]["edge_colors"]
+    chart_df = pd.DataFrame({
+        "start": to_local_datetimes(intervals["start"]),
+        "end": to_local_datetimes(intervals["end"]),
+        "status": np.where(intervals["state"] == 1, "Accessible", "Inaccessible"),
+    })
+    chart = alt.Chart(chart_df).mark_rect().encode(
+        x=alt.X("start:T", title=None),
+        x2="end:T",
+        color=alt.Color(
+            "status:N",
+            scale=alt.Scale(
+                domain=["Accessible", "Inaccessible"],
+                range=[edge_colors["accessible"], edge_colors["inaccessible"]]
+            ),
+            legend=None
+        ),
+        tooltip=["status:N", alt.Tooltip("start:T", format="%Y-%m-%d %H:%M"), alt.Tooltip("end:T", format="%Y-%m-%d %H:%M")]
+    ).properties(height=60)
+    st.altair_chart(chart, use_container_width=True)
+
+def render_mount_history(label, intervals, config):
+    """Render uptime, outage statistics and the interval timeline for one mount"""
+    stats = interval_stats(intervals)
+    uptime = stats["uptime"] if stats["uptime"] is not None else 0.0
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(label=label, value=f"{uptime:.1f}% Uptime", delta=None)
+    col2.metric(label="Outages", value=stats["outages"])
+    col3.metric(label="MTTR", value=format_duration(stats["mttr"]))
+    col4.metric(label="MTBF", value=format_duration(stats["mtbf"]))
+
+    render_interval_chart(intervals, config)
+
+def render_long_term(config, snapshot):
+    """Render months of uptime from the local archive, beyond Prometheus retention"""
+    archive = mount_archive(config)
+    if st.session_state.get('demo_mode', False) or archive is None:
+        st.info("The long-term archive is filled from live snapshots and is not available in demo mode"
+                if archive is not None else "The long-term archive is disabled (archive.enabled)")
+        return
+
+    coverage = archive.coverage()
+    if coverage is None:
+        st.info("Nothing archived yet. Snapshots are archived as they are collected; "
+                "enable the background collector to record continuously.")
+        return
+
+    days = st.select_slider("Days", options=[1, 7, 30, 90, 180, 365], value=30)
+    end_time = time.time()
+    start_time = end_time - days * 86400
+    first, last = to_local_datetimes([coverage[0], coverage[1]])
+    st.caption(f"Archive covers {first:%Y-%m-%d %H:%M} to {last:%Y-%m-%d %H:%M}; "
+               "uptime counts only time covered by snapshots.")
+
+    servers = st.multiselect("NFS Server", options=snapshot.servers, default=[], key="archive_servers")
+    uptime_df = archive.uptime(start_time, end_time, servers=servers or None)
+    if uptime_df.empty:
+        st.info("No archived data in this window")
+        return
+    if not (uptime_df["source"] != "").any():
+        uptime_df = uptime_df.drop(columns="source")
+    st.dataframe(
+        uptime_df.rename(columns={
+            'source': 'Source',
+            'nfs_server': 'NFS Server',
+            'nfs_client': 'NFS Client',
+            'mount_path': 'Mount Path',
+            'uptime': 'Uptime %',
+            'observed_hours': 'Observed Hours'
+        }),
+        column_config={"Uptime %": st.column_config.NumberColumn(format="%.2f"),
+                       "Observed Hours": st.column_config.NumberColumn(format="%.1f")},
+        use_container_width=True,
+        hide_index=True
+    )
+
+    # Uptime per hour or day for one mount
+    labels = [f"{row.nfs_server} → {row.nfs_client}: {row.mount_path}" for row in uptime_df.itertuples(index=False)]
+    choice = st.selectbox("Mount", options=range(len(labels)), format_func=labels.__getitem__)
+    row = uptime_df.iloc[choice]
+    timeline = archive.timeline(row["nfs_server"], row["nfs_client"], start_time, end_time, row["mount_path"])
+    timeline["bucket"] = to_local_datetimes(timeline["bucket"].to_numpy())
+    chart = alt.Chart(timeline).mark_bar().encode(
+        x=alt.X("bucket:T", title=None),
+        y=alt.Y("uptime:Q", title="Uptime %", scale=alt.Scale(domain=[0, 100])),
+        color=alt.Color("source:N", legend=None),
+        tooltip=[alt.Tooltip("bucket:T", format="%Y-%m-%d %H:%M"), alt.Tooltip("uptime:Q", format=".2f")]
+    ).properties(height=200)
+    st.altair_chart(chart, use_container_width=True)
+
+def render_historical_tab(config, snapshot):
     """Render the historical view tab"""
     st.write("Historical View of Mount Accessibility")
 
@@ -503,18 +1284,31 @@ def render_historical_tab(config):
     time_range = st.slider(
         "Select Time Range",
         min_value=1,
-        max_value=24,
+        max_value=168,
         value=6,
         help="Show data for the past X hours"
     )
 
+    view = st.radio("View", options=["Mount pair", "Worst mounts (cluster-wide)", "Heatmap (cluster-wide)",
+                                     "Long-term (archive)"],
+                    horizontal=True)
+    if view == "Long-term (archive)":
+        render_long_term(config, snapshot)
+        return
+    if view == "Worst mounts (cluster-wide)":
+        render_uptime_table(config, time_range)
+        return
+    if view == "Heatmap (cluster-wide)":
+        render_heatmap(config, time_range)
+        return
+
     # Get available servers and clients from current data
     available_servers = []
     available_clients = []
     
-    if 'df' in st.session_state and not st.session_state.df.empty:
-        available_servers = sorted(st.session_state.df['nfs_server'].unique())
-        available_clients = sorted(st.session_state.df['nfs_client'].unique())
+    if not snapshot.empty:
+        available_servers = snapshot.servers
+        available_clients = snapshot.clients
     else:
         available_servers = config["cluster_nodes"]
         available_clients = config["cluster_nodes"]
@@ -532,62 +1326,166 @@ def render_historical_tab(config):
         if demo_mode:
             # Generate sample historical data
             hist_data = generate_sample_historical_data(config, nfs_server, nfs_client, "data", time_range)
-            
-            # Display sample data
-            hist_df = pd.DataFrame(hist_data, columns=["timestamp", "accessible"])
-            hist_df["mount_path"] = "data"  # Sample mount path
-            
-            # Calculate uptime percentage
-            uptime = (hist_df["accessible"].sum() / len(hist_df)) * 100
-            
-            # Display uptime metric
-            st.metric(
-                label="Mount: data (sample data)",
-                value=f"{uptime:.1f}% Uptime",
-                delta=None
-            )
-            
-            # Display the chart
-            st.line_chart(
-                hist_df.set_index("timestamp")["accessible"],
-                use_container_width=True
-            )
+            timestamps = [int(timestamp.timestamp()) for timestamp, _ in hist_data]
+            values = [value for _, value in hist_data]
+
+            # Sample data is spaced 10 minutes apart
+            render_mount_history("Mount: data (sample data)", to_intervals(timestamps, values, 600), config)
         else:
             # Query historical data from Prometheus
             mapping = config["metric_mapping"]
-            query = f'{config["metric_name"]}{{{mapping["server_label"]}="{nfs_server}", {mapping["client_label"]}="{nfs_client}"}}'
-            result = query_prometheus(config["prometheus_url"], query, time_range * 3600)
+            query = prometheus.label_selector(config["metric_name"], {
+                mapping["server_label"]: [nfs_server],
+                mapping["client_label"]: [nfs_client],
+            })
+
+            # Only the part of the window not already stored in cache_dir is fetched
+            end_time = int(time.time())
+            store = HistoryStore.from_config(config)
+            series_list = store.query_range(
+                query,
+                end_time - time_range * 3600,
+                end_time,
+                lambda start, end, step: query_prometheus_window(config, query, start, end, step)
+            )
 
-            if result and result["status"] == "success" and result["data"]["result"]:
-                # Process and display historical data
-                for series in result["data"]["result"]:
+            if series_list:
+                # Process and display historical data as outage intervals
+                for series in series_list:
                     mount_path = series["metric"][mapping["path_label"]]
-                    values = [(datetime.fromtimestamp(point[0]), int(point[1])) for point in series["values"]]
-
-                    # Create a dataframe for this mount
-                    hist_df = pd.DataFrame(values, columns=["timestamp", "accessible"])
-                    hist_df["mount_path"] = mount_path
-
-                    # Calculate uptime percentage
-                    uptime = (hist_df["accessible"].sum() / len(hist_df)) * 100
-
-                    # Display uptime metric
-                    st.metric(
-                        label=f"Mount: {mount_path}",
-                        value=f"{uptime:.1f}% Uptime",
-                        delta=None
-                    )
-
-                    # Display the chart
-                    st.line_chart(
-                        hist_df.set_index("timestamp")["accessible"],
-                        use_container_width=True
-                    )
+                    if prometheus.is_federated(config["prometheus_url"]):
+                        mount_path = f"{mount_path} ({series['metric'].get(prometheus.SOURCE_LABEL)})"
+                    intervals = to_intervals(series["timestamps"], series["values"], store.step)
+                    render_mount_history(f"Mount: {mount_path}", intervals, config)
             else:
                 st.info(f"No historical data available for {nfs_server} to {nfs_client}")
     else:
         st.info("No NFS clients available for selection")
 
+def render_recent_changes(config, snapshot, demo_mode=False, limit=200):
+    """Render the mount state transitions logged at recent refreshes"""
+    events = transitions.transition_log(config, demo_mode).recent(limit)
+    # Events logged by the refresh that produced this snapshot
+    latest = int((events["time"] == snapshot.created_at).sum()) if not events.empty else 0
+
+    with st.expander(f"Recent changes ({latest} at the last refresh)", expanded=False):
+        if events.empty:
+            st.info("No mount state changes recorded yet")
+            return
+        if events["source"].isna().all():
+            events = events.drop(columns="source")
+        events["time"] = to_local_datetimes(events["time"].to_numpy())
+        st.dataframe(
+            events.rename(columns={
+                'time': 'Time',
+                'source': 'Source',
+                'nfs_server': 'NFS Server',
+                'nfs_client': 'NFS Client',
+                'mount_path': 'Mount Path',
+                'event': 'Change'
+            }).replace({'Change': {
+                "failed": "❌ Failed",
+                "recovered": "✅ Recovered",
+                "appeared": "➕ Appeared",
+                "disappeared": "➖ Disappeared"
+            }}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+def run_fragment(render, config, *args):
+    """Call `render(config, *args)` as a fragment
+
+    Its widgets rerun only the fragment instead of the whole page, and a timer
+    reruns it every refresh_interval so it picks up new snapshots without any
+    interaction.
+    """
+    st.fragment(render, run_every=config["refresh_interval"])(config, *args)
+
+def render_tab(config, demo_mode, render):
+    """Render one tab against the current shared snapshot
+
+    Fragment reruns reuse the arguments of the last full run, so the snapshot
+    is looked up here rather than passed in.
+    """
+    snapshot = get_snapshot(config, demo_mode)
+    with instrumentation.span(f"render.{render.__name__}", rows=len(snapshot)):
+        render(config, snapshot)
+
+def render_status(config, demo_mode):
+    """Render the data source line, staleness and source warnings and the recent changes"""
+    snapshot = get_snapshot(config, demo_mode)
+    mode_text = "Demo Mode" if demo_mode else "Live Data"
+    last_refresh = datetime.fromtimestamp(snapshot.created_at)
+    sources_text = ""
+    if "source" in snapshot.df:
+        sources_text = f" | Sources: {', '.join(snapshot.df['source'].cat.categories)}"
+    st.text(f"{mode_text} | Last updated: {last_refresh.strftime('%Y-%m-%d %H:%M:%S')} | "
+            f"Snapshot v{snapshot.version}{sources_text}")
+
+    # A collector that stopped polling leaves the page on old data
+    if time.time() - snapshot.created_at > 2 * config["refresh_interval"]:
+        st.warning(f"Mount data is stale (last collected {last_refresh.strftime('%Y-%m-%d %H:%M:%S')}). "
+                   "Check that the collector is running.")
+    warn_unavailable_sources(snapshot.source_errors)
+    # Set until the next refresh succeeds, so every session sees it
+    failed = snapshot_errors.get(snapshot_key(config, demo_mode))
+    if failed and snapshot.empty:
+        st.error(f"Could not load mount data from Prometheus: {failed[1]}")
+    elif failed:
+        st.error(f"Could not refresh mount data from Prometheus ({failed[1]}); "
+                 f"showing data last updated {last_refresh.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    render_recent_changes(config, snapshot, demo_mode)
+
+def render_debug_panel(config, limit=100):
+    """Render the recorded timing spans: totals per stage and the most recent spans"""
+    with st.expander("Performance (timing spans)", expanded=False):
+        port = config.get("instrumentation", {}).get("metrics_port")
+        if port:
+            st.caption(f"Also served in the Prometheus format at http://<host>:{port}/metrics")
+        summary = instrumentation.stage_summary()
+        if not summary:
+            st.info("No spans recorded yet")
+            return
+        st.dataframe(pd.DataFrame([
+            {
+                "Stage": stage,
+                "Calls": totals["count"],
+                "Errors": totals["errors"],
+                "Mean ms": 1000 * totals["seconds"] / totals["count"],
+                "Last ms": 1000 * totals["last_seconds"],
+                "Last rows": totals["last"].get("rows"),
+                "Last bytes": totals["last"].get("bytes"),
+            }
+            for stage, totals in summary.items()
+        ]), use_container_width=True, hide_index=True)
+
+        caches = instrumentation.cache_stats()
+        st.dataframe(pd.DataFrame([
+            {
+                "Cache": name,
+                "Hits": stats["hits"],
+                "Misses": stats["misses"],
+                "Coalesced": stats["coalesced"],
+                "Evictions": stats["evictions"],
+                "Entries": stats["entries"],
+                "Hit rate %": 100 * stats["hits"] / max(1, stats["hits"] + stats["misses"] + stats["coalesced"]),
+            }
+            for name, stats in caches.items()
+        ]), use_container_width=True, hide_index=True)
+
+        spans = instrumentation.recent_spans(limit)
+        if not spans:
+            # Reset since the summary was read, or recent_spans is 0
+            st.info("No recent spans recorded")
+            return
+        recent = pd.DataFrame(spans)
+        recent["time"] = to_local_datetimes(recent["time"].to_numpy())
+        recent["seconds"] = 1000 * recent["seconds"]
+        st.dataframe(recent.rename(columns={'time': 'Time', 'stage': 'Stage', 'seconds': 'ms', 'failed': 'Failed'}),
+                     use_container_width=True, hide_index=True)
+
 def main(config_path=None, demo_mode=False):
     """Main function to render the Streamlit app"""
     # Load configuration
@@ -595,6 +1493,8 @@ def main(config_path=None, demo_mode=False):
     
     # Setup page
     setup_page(config["app_title"])
+    configure_caches(config)
+    instrumentation.configure(config.get("instrumentation"))
     
     # Store demo mode in session state
     if 'demo_mode' not in st.session_state:
@@ -607,7 +1507,7 @@ def main(config_path=None, demo_mode=False):
     st.title(title)
 
     # Add demo mode toggle and refresh button
-    col1, col2, col3 = st.columns([1, 1, 2])
+    col1, col2, _ = st.columns([1, 1, 2])
     with col1:
         refresh = st.button("🔄 Refresh Data")
     with col2:
@@ -615,35 +1515,18 @@ def main(config_path=None, demo_mode=False):
             st.session_state.demo_mode = not st.session_state.demo_mode
             st.rerun()
 
-    # Use session state to keep track of last refresh time
-    if 'last_refresh' not in st.session_state:
-        st.session_state.last_refresh = datetime.now()
-        refresh = True
-
-    # Check if it's time to auto-refresh
-    if (datetime.now() - st.session_state.last_refresh).seconds >= config["refresh_interval"]:
-        refresh = True
+    # The snapshot is shared by all sessions and refreshed once per refresh_interval;
+    # an explicit refresh rebuilds it right away
+    get_snapshot(config, st.session_state.demo_mode, force_refresh=refresh)
 
-    # Get data if refresh is triggered
-    if refresh:
-        st.session_state.df = get_mount_accessibility(config, st.session_state.demo_mode)
-        st.session_state.last_refresh = datetime.now()
+    run_fragment(render_status, config, st.session_state.demo_mode)
 
-    with col3:
-        mode_text = "Demo Mode" if st.session_state.demo_mode else "Live Data"
-        st.text(f"{mode_text} | Last updated: {st.session_state.last_refresh.strftime('%Y-%m-%d %H:%M:%S')}")
-
-    # Create different views as tabs
-    tab1, tab2, tab3 = st.tabs(["Network Graph", "Mount Table", "Historical View"])
-
-    with tab1:
-        render_network_tab(config)
-
-    with tab2:
-        render_table_tab()
-
-    with tab3:
-        render_historical_tab(config)
+    # Only the selected tab runs; switching tabs reruns the page
+    tabs = st.tabs(["Network Graph", "Mount Table", "Historical View"], key="main_tab", on_change="rerun")
+    for tab, render in zip(tabs, [render_network_tab, render_table_tab, render_historical_tab]):
+        if tab.open:
+            with tab:
+                run_fragment(render_tab, config, st.session_state.demo_mode, render)
 
     # Add a footer with information
     st.divider()
@@ -656,6 +1539,9 @@ def main(config_path=None, demo_mode=False):
     Data sourced from Prometheus NFS mount exporter metrics.
     """)
 
+    if instrumentation.enabled():
+        render_debug_panel(config)
+
 def run_app():
     """Entry point for running the app from the command line"""
     parser = argparse.ArgumentParser(description="NFS Mount Visualizer")
@@ -0,0 +1,359 @@
+"""
+Long-retention archive of mount accessibility in SQLite
+
+Prometheus usually keeps a few weeks of samples; capacity reviews need months.
+Every snapshot the app or the collector takes is recorded in
+`<cache_dir>/archive/mounts-<source>.sqlite`, one database per Prometheus
+source and metric so switching `prometheus_url` does not mix two clusters:
+
+- `mounts` holds one row per (server, client, mount_path, source), with a
+  unique index on those columns.
+- `events` keeps one row per state change, indexed on (mount, time). Samples
+  that did not change anything are not stored.
+- `rollups` accumulates accessible and observed seconds per mount in hourly
+  buckets. Each completed hour is added to daily buckets, so reads over
+  months touch one row per mount and day.
+
+Time between two snapshots is only counted as observed when they are at most
+`max_gap` seconds apart, so periods without collection do not count as
+uptime. The database runs in WAL mode, so the app can read while a separate
+collector process writes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from nfs_mount_visualizer import prometheus
+from nfs_mount_visualizer.config import DEFAULT_ARCHIVE_SETTINGS
+
+HOUR = 3600
+DAY = 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mounts (
+    id INTEGER PRIMARY KEY,
+    nfs_server TEXT NOT NULL,
+    nfs_client TEXT NOT NULL,
+    mount_path TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT ''
+);
+CREATE UNIQUE INDEX IF NOT EXISTS mounts_key ON mounts (nfs_server, nfs_client, mount_path, source);
+CREATE TABLE IF NOT EXISTS events (
+    mount_id INTEGER NOT NULL,
+    time REAL NOT NULL,
+    state INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_mount_time ON events (mount_id, time);
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution INTEGER NOT NULL,
+    mount_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    up_seconds REAL NOT NULL,
+    observed_seconds REAL NOT NULL,
+    PRIMARY KEY (resolution, mount_id, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollups_bucket ON rollups (resolution, bucket);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def archive_settings(overrides=None):
+    """Merge the `archive` config section over the defaults"""
+    settings = dict(DEFAULT_ARCHIVE_SETTINGS)
+    if overrides:
+        settings.update(overrides)
+    return settings
+
+
+def archive_path(config):
+    """Database file of the archive for this Prometheus source and metric"""
+    source = json.dumps([prometheus.source_key(config["prometheus_url"]), config["metric_name"]])
+    name = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    return os.path.abspath(os.path.join(config["cache_dir"], "archive", f"mounts-{name}.sqlite"))
+
+
+def _key_columns(df):
+    """(server, client, mount_path, source) as parallel lists of Python strings"""
+    columns = [df[column].to_numpy(dtype=object).tolist() for column in ("nfs_server", "nfs_client", "mount_path")]
+    sources = df["source"].to_numpy(dtype=object).tolist() if "source" in df else [""] * len(df)
+    return columns + [sources]
+
+
+def _bucket_overlaps(starts, end, resolution):
+    """Split the intervals [starts[i], end) at bucket boundaries
+
+    Yields (row positions, bucket start, seconds inside that bucket).
+    """
+    first = int(starts.min() // resolution)
+    last = int(np.ceil(end / resolution))
+    for bucket in range(first, last):
+        lower, upper = bucket * resolution, (bucket + 1) * resolution
+        seconds = np.minimum(end, upper) - np.maximum(starts, lower)
+        rows = np.flatnonzero(seconds > 0)
+        if len(rows):
+            yield rows, lower, seconds[rows]
+
+
+class MountArchive:
+    """SQLite store of mount state changes and hourly/daily uptime rollups"""
+
+    def __init__(self, path, max_gap=600, hourly_retention_days=31, retention_days=400):
+        self.path = path
+        self.max_gap = max_gap
+        self.hourly_retention_days = hourly_retention_days
+        self.retention_days = retention_days
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._ids = None          # (server, client, path, source) -> mount id
+        self._sources = {}        # mount id -> source
+        self._state = np.empty(0, dtype=np.int8)  # last state per mount id, -1 = absent
+        self._last_time = None
+
+    @classmethod
+    def from_config(cls, config):
+        settings = archive_settings(config.get("archive"))
+        return cls(
+            archive_path(config),
+            max_gap=settings["max_gap"] or 2 * config["refresh_interval"],
+            hourly_retention_days=settings["hourly_retention_days"],
+            retention_days=settings["retention_days"],
+        )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _load(self):
+        """Rebuild the in-memory mount ids and last states from the database"""
+        self._ids = {}
+        for mount_id, server, client, path, source in self._db.execute(
+                "SELECT id, nfs_server, nfs_client, mount_path, source FROM mounts"):
+            self._ids[(server, client, path, source)] = mount_id
+            self._sources[mount_id] = source
+        self._state = np.full(max(self._ids.values(), default=0) + 1, -1, dtype=np.int8)
+        latest = self._db.execute(
+            "SELECT mount_id, state FROM events e WHERE time = "
+            "(SELECT MAX(time) FROM events WHERE mount_id = e.mount_id)"
+        ).fetchall()
+        for mount_id, state in latest:
+            self._state[mount_id] = -1 if state is None else state
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'last_record'").fetchone()
+        self._last_time = row[0] if row else None
+
+    def _mount_ids(self, keys):
+        """Mount ids for parallel key columns, inserting unseen mounts"""
+        missing = [key for key in set(zip(*keys)) if key not in self._ids]
+        if missing:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO mounts (nfs_server, nfs_client, mount_path, source) VALUES (?, ?, ?, ?)",
+                missing
+            )
+            for key in missing:
+                mount_id = self._db.execute(
+                    "SELECT id FROM mounts WHERE nfs_server = ? AND nfs_client = ? AND mount_path = ? AND source = ?",
+                    key
+                ).fetchone()[0]
+                self._ids[key] = mount_id
+                self._sources[mount_id] = key[3]
+            size = max(self._ids.values()) + 1
+            if size > len(self._state):
+                self._state = np.concatenate([self._state, np.full(size - len(self._state), -1, dtype=np.int8)])
+        return np.fromiter((self._ids[key] for key in zip(*keys)), dtype=np.int64, count=len(keys[0]))
+
+    def record(self, df, created_at, skip_sources=()):
+        """Record the mount table observed at `created_at`
+
+        The time since the previous record is credited to every mount that was
+        present in both, with its previous state. Mounts of `skip_sources`
+        (instances that could not be queried) are neither credited nor marked
+        absent.
+        """
+        if df.empty:
+            return
+        with self._lock, self._db:
+            if self._ids is None:
+                self._load()
+            ids = self._mount_ids(_key_columns(df))
+            states = df["accessible"].to_numpy(dtype=bool).astype(np.int8)
+            previous = self._state[ids]
+
+            if self._last_time is not None and 0 < created_at - self._last_time <= self.max_gap:
+                credited = previous >= 0
+                starts = np.full(int(credited.sum()), self._last_time)
+                up = previous[credited] == 1
+                for rows, bucket, seconds in _bucket_overlaps(starts, created_at, HOUR):
+                    self._db.executemany(
+                        "INSERT INTO rollups VALUES (?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+                        "up_seconds = up_seconds + excluded.up_seconds, "
+                        "observed_seconds = observed_seconds + excluded.observed_seconds",
+                        zip([HOUR] * len(rows), ids[credited][rows].tolist(), [bucket] * len(rows),
+                            (seconds * up[rows]).tolist(), seconds.tolist())
+                    )
+
+            changed = previous != states
+            self._db.executemany(
+                "INSERT INTO events VALUES (?, ?, ?)",
+                zip(ids[changed].tolist(), [created_at] * int(changed.sum()), states[changed].tolist())
+            )
+            present = np.zeros(len(self._state), dtype=bool)
+            present[ids] = True
+            gone = np.flatnonzero((self._state >= 0) & ~present)
+            gone = [mount_id for mount_id in gone.tolist() if self._sources.get(mount_id) not in skip_sources]
+            self._db.executemany("INSERT INTO events VALUES (?, ?, NULL)", [(mount_id, created_at) for mount_id in gone])
+            self._state[gone] = -1
+            self._state[ids] = states
+
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('last_record', ?)", (created_at,))
+            self._last_time = created_at
+            self._roll_up_days(created_at)
+            self._prune(created_at)
+
+    def _roll_up_days(self, now):
+        """Add the hourly rollups of every completed hour to the daily rollups"""
+        current = int(now // HOUR * HOUR)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'rolled_up_until'").fetchone()
+        since = row[0] if row else self._db.execute(
+            "SELECT MIN(bucket) FROM rollups WHERE resolution = ?", (HOUR,)).fetchone()[0]
+        if since is None or since >= current:
+            return
+        self._db.execute(
+            "INSERT INTO rollups SELECT ?, mount_id, bucket / ? * ?, SUM(up_seconds), SUM(observed_seconds) "
+            "FROM rollups WHERE resolution = ? AND bucket >= ? AND bucket < ? GROUP BY mount_id, bucket / ? "
+            "ON CONFLICT DO UPDATE SET up_seconds = up_seconds + excluded.up_seconds, "
+            "observed_seconds = observed_seconds + excluded.observed_seconds",
+            (DAY, DAY, DAY, HOUR, since, current, DAY)
+        )
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES ('rolled_up_until', ?)", (current,))
+
+    def _prune(self, now):
+        """Drop rollups and events past their retention, at most once per day"""
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'last_prune'").fetchone()
+        if row and now - row[0] < DAY:
+            return
+        self._db.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                         (HOUR, now - self.hourly_retention_days * DAY))
+        self._db.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                         (DAY, now - self.retention_days * DAY))
+        self._db.execute("DELETE FROM events WHERE time < ?", (now - self.retention_days * DAY,))
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES ('last_prune', ?)", (now,))
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _filters(servers=None, clients=None, paths=None):
+        clauses, params = [], []
+        for column, values in (("nfs_server", servers), ("nfs_client", clients), ("mount_path", paths)):
+            if values:
+                clauses.append(f"m.{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+    def _rollups(self, start, end, resolution):
+        """Subquery over the rollups of [start, end) at `resolution`
+
+        Daily reads add the hourly rollups that have not been rolled up into
+        days yet, so the current day is included.
+        """
+        start = start // resolution * resolution
+        if resolution != DAY:
+            return ("SELECT mount_id, bucket, up_seconds, observed_seconds FROM rollups "
+                    "WHERE resolution = ? AND bucket >= ? AND bucket < ?"), [resolution, start, end]
+        row = self._query("SELECT value FROM meta WHERE key = 'rolled_up_until'", ())
+        rolled = row[0][0] if row else start
+        return ("SELECT mount_id, bucket / ? * ? AS bucket, up_seconds, observed_seconds FROM rollups "
+                "WHERE (resolution = ? AND bucket >= ? AND bucket < ?) "
+                "OR (resolution = ? AND bucket >= ? AND bucket < ?)"), \
+            [DAY, DAY, DAY, start, min(rolled, end), HOUR, max(rolled, start), end]
+
+    def coverage(self):
+        """(first, last) unix time with recorded data, or None when the archive is empty"""
+        row = self._query("SELECT MIN(bucket), MAX(bucket) FROM rollups WHERE resolution = ?", (HOUR,))[0]
+        if row[0] is None:
+            row = self._query("SELECT MIN(bucket), MAX(bucket) FROM rollups WHERE resolution = ?", (DAY,))[0]
+            if row[0] is None:
+                return None
+            return row[0], row[1] + DAY
+        return row[0], row[1] + HOUR
+
+    def uptime(self, start, end, servers=None, clients=None, paths=None, resolution=None):
+        """Uptime per mount over the buckets in [start, end), worst first
+
+        Reads daily rollups for windows longer than a week and hourly rollups
+        otherwise, unless `resolution` is given.
+        """
+        resolution = resolution or (DAY if end - start > 7 * DAY else HOUR)
+        rollups, rollup_params = self._rollups(start, end, resolution)
+        where, params = self._filters(servers, clients, paths)
+        rows = self._query(
+            "SELECT m.source, m.nfs_server, m.nfs_client, m.mount_path, "
+            "SUM(r.up_seconds), SUM(r.observed_seconds) "
+            f"FROM ({rollups}) r JOIN mounts m ON m.id = r.mount_id "
+            f"WHERE 1{where} GROUP BY r.mount_id",
+            rollup_params + params
+        )
+        df = pd.DataFrame(rows, columns=["source", "nfs_server", "nfs_client", "mount_path",
+                                         "up_seconds", "observed_seconds"])
+        df["uptime"] = 100 * df["up_seconds"] / df["observed_seconds"]
+        df["observed_hours"] = df["observed_seconds"] / HOUR
+        df = df.drop(columns=["up_seconds", "observed_seconds"])
+        return df.sort_values(["uptime", "nfs_server", "nfs_client", "mount_path"], ignore_index=True)
+
+    def timeline(self, server, client, start, end, mount_path=None, resolution=None):
+        """Uptime per bucket for the mounts between `server` and `client`"""
+        resolution = resolution or (DAY if end - start > 7 * DAY else HOUR)
+        rollups, rollup_params = self._rollups(start, end, resolution)
+        where, params = self._filters([server], [client], [mount_path] if mount_path else None)
+        rows = self._query(
+            "SELECT m.source, m.mount_path, r.bucket, SUM(r.up_seconds), SUM(r.observed_seconds) "
+            f"FROM ({rollups}) r JOIN mounts m ON m.id = r.mount_id "
+            f"WHERE 1{where} GROUP BY r.mount_id, r.bucket "
+            "ORDER BY m.mount_path, m.source, r.bucket",
+            rollup_params + params
+        )
+        df = pd.DataFrame(rows, columns=["source", "mount_path", "bucket", "up_seconds", "observed_seconds"])
+        df["uptime"] = 100 * df["up_seconds"] / df["observed_seconds"]
+        return df.drop(columns="up_seconds")
+
+    def events(self, start, end, servers=None, clients=None, paths=None):
+        """State changes in [start, end): state 1 accessible, 0 inaccessible, None gone"""
+        where, params = self._filters(servers, clients, paths)
+        rows = self._query(
+            "SELECT e.time, m.source, m.nfs_server, m.nfs_client, m.mount_path, e.state "
+            "FROM events e JOIN mounts m ON m.id = e.mount_id "
+            f"WHERE e.time >= ? AND e.time < ?{where} "
+            "ORDER BY e.time, m.nfs_server, m.nfs_client, m.mount_path, m.source",
+            [start, end] + params
+        )
+        df = pd.DataFrame(rows, columns=["time", "source", "nfs_server", "nfs_client", "mount_path", "state"])
+        df["state"] = df["state"].astype("Int8")
+        return df
+
+
+def mount_archive(config):
+    """Process-wide archive for this cache_dir and data source, or None when disabled"""
+    if not archive_settings(config.get("archive")).get("enabled", True):
+        return None
+    path = archive_path(config)
+    with _archives_lock:
+        archive = _archives.get(path)
+        if archive is None:
+            archive = _archives[path] = MountArchive.from_config(config)
+        return archive
@@ -1,20 +1,105 @@
 #!/usr/bin/env python3
 """
 Command-line interface for the NFS Mount Visualizer
+
+Without a subcommand the Streamlit app is started; `collect` runs the
+background snapshot collector as its own process and `export` writes the
+current mount table for scripts. Imports are deferred to the command that needs
+them, so `export` never loads streamlit, pyvis, pandas or numpy (except for
+Parquet output).
 """
 
 import argparse
 import os
 import sys
-from nfs_mount_visualizer.app import main
+
+# Exit codes of `export`
+EXIT_ERROR = 1
+EXIT_INACCESSIBLE = 2
+
+def collect(args):
+    """Poll Prometheus and keep the latest mount snapshot in cache_dir"""
+    import logging
+    from nfs_mount_visualizer import instrumentation
+    from nfs_mount_visualizer.collector import Collector, snapshot_path
+    from nfs_mount_visualizer.config import load_config
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    config = load_config(args.config)
+    instrumentation.configure(config.get("instrumentation"))
+    collector = Collector(config, interval=args.interval)
+    if args.once:
+        return 0 if collector.run_once() else 1
+
+    logging.info("Writing snapshots to %s every %ss", snapshot_path(config["cache_dir"]), collector.interval)
+    try:
+        collector.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def export(args):
+    """Query the current mount states and write them as JSON lines, CSV or Parquet"""
+    from nfs_mount_visualizer.config import load_config
+    from nfs_mount_visualizer.export import COLUMNS, SOURCE_COLUMNS, export_mounts, fetch_mounts
+    from nfs_mount_visualizer.prometheus import PrometheusError, is_federated
+
+    if args.format == "parquet" and args.output in (None, "-"):
+        print("error: parquet output needs --output", file=sys.stderr)
+        return EXIT_ERROR
+
+    config = load_config(args.config)
+    mapping = config["metric_mapping"]
+    columns = SOURCE_COLUMNS if is_federated(config["prometheus_url"]) else COLUMNS
+    try:
+        series = fetch_mounts(config)
+        if args.format == "parquet":
+            total, inaccessible = export_mounts(series, mapping, "parquet", args.output, columns)
+        elif args.output in (None, "-"):
+            total, inaccessible = export_mounts(series, mapping, args.format, sys.stdout, columns)
+        else:
+            with open(args.output, "w", newline="") as f:
+                total, inaccessible = export_mounts(series, mapping, args.format, f, columns)
+    except PrometheusError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if inaccessible:
+        print(f"{inaccessible} of {total} mounts inaccessible", file=sys.stderr)
+        if args.fail_on_inaccessible:
+            return EXIT_INACCESSIBLE
+    return 0
 
 def run():
     """Entry point for the CLI"""
     parser = argparse.ArgumentParser(description="NFS Mount Visualizer")
     parser.add_argument("--config", type=str, help="Path to configuration file (JSON or YAML)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    collect_parser = subparsers.add_parser("collect", help="Poll Prometheus and write mount snapshots to cache_dir")
+    # SUPPRESS keeps a --config given before the subcommand
+    collect_parser.add_argument("--config", type=str, default=argparse.SUPPRESS,
+                                help="Path to configuration file (JSON or YAML)")
+    collect_parser.add_argument("--interval", type=float, help="Seconds between polls (default: refresh_interval)")
+    collect_parser.add_argument("--once", action="store_true", help="Collect a single snapshot and exit")
+
+    export_parser = subparsers.add_parser("export", help="Write the current mount table and exit")
+    export_parser.add_argument("--config", type=str, default=argparse.SUPPRESS,
+                               help="Path to configuration file (JSON or YAML)")
+    export_parser.add_argument("--format", choices=["jsonl", "csv", "parquet"], default="jsonl",
+                               help="Output format (default: jsonl)")
+    export_parser.add_argument("-o", "--output", type=str, help="Output file (default: stdout; required for parquet)")
+    export_parser.add_argument("--fail-on-inaccessible", action="store_true",
+                               help=f"Exit with status {EXIT_INACCESSIBLE} if any mount is inaccessible")
     args = parser.parse_args()
-    
+
+    if args.command == "collect":
+        sys.exit(collect(args))
+    if args.command == "export":
+        sys.exit(export(args))
+
+    from nfs_mount_visualizer.app import main
     main(args.config)
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
@@ -0,0 +1,213 @@
+"""
+Background collector for mount snapshots
+
+Polls Prometheus every `refresh_interval` independently of page views and
+writes the compact mount table to `<cache_dir>/snapshot/mounts-latest.npz`
+with an atomic rename, so readers never see a partial file. The app then only
+reads the latest snapshot. The collector runs either as a daemon thread of the
+app process or as a separate `nfs-mount-visualizer collect` process. With
+several Prometheus instances one snapshot holds the merged mounts of all of them.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from nfs_mount_visualizer import instrumentation, prometheus, transitions
+from nfs_mount_visualizer.archive import mount_archive
+from nfs_mount_visualizer.snapshot import COLUMNS, compact_mounts, concat_mounts, mounts_from_series
+from nfs_mount_visualizer.utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "mounts-latest.npz"
+
+_collectors = {}
+_collectors_lock = threading.Lock()
+
+
+def snapshot_path(cache_dir):
+    """Location of the latest collected snapshot"""
+    return os.path.join(cache_dir, "snapshot", SNAPSHOT_FILE)
+
+
+def write_snapshot(path, df, created_at):
+    """Atomically write a mount table as dictionary-encoded numpy arrays"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    source_errors = df.attrs.get("source_errors", {})
+    if df.empty:
+        columns = {column: pd.Categorical([]) for column in COLUMNS[:3]}
+        df = pd.DataFrame(dict(columns, accessible=np.empty(0, dtype=bool)))
+    elif not isinstance(df["nfs_server"].dtype, pd.CategoricalDtype):
+        df = compact_mounts(df)
+
+    arrays = {
+        "nodes": np.asarray(df["nfs_server"].cat.categories, dtype=str),
+        "paths": np.asarray(df["mount_path"].cat.categories, dtype=str),
+        "server": df["nfs_server"].cat.codes.to_numpy(),
+        "client": df["nfs_client"].cat.codes.to_numpy(),
+        "path": df["mount_path"].cat.codes.to_numpy(),
+        "accessible": df["accessible"].to_numpy(dtype=bool),
+        "created_at": np.float64(created_at),
+        "source_errors": np.array(json.dumps(source_errors)),
+    }
+    if "source" in df:
+        arrays["sources"] = np.asarray(df["source"].cat.categories, dtype=str)
+        arrays["source"] = df["source"].cat.codes.to_numpy()
+    atomic_write(path, lambda f: np.savez(f, **arrays))
+
+
+def read_snapshot(path):
+    """Return (mount table, created_at) from a snapshot file, or None if missing or unreadable"""
+    try:
+        with np.load(path) as data:
+            node_dtype = pd.CategoricalDtype(data["nodes"].astype(object))
+            path_dtype = pd.CategoricalDtype(data["paths"].astype(object))
+            df = pd.DataFrame({
+                "nfs_server": pd.Categorical.from_codes(data["server"], dtype=node_dtype),
+                "nfs_client": pd.Categorical.from_codes(data["client"], dtype=node_dtype),
+                "mount_path": pd.Categorical.from_codes(data["path"], dtype=path_dtype),
+                "accessible": data["accessible"],
+            })
+            if "source" in data:
+                df["source"] = pd.Categorical.from_codes(data["source"],
+                                                         dtype=pd.CategoricalDtype(data["sources"].astype(object)))
+            if "source_errors" in data:
+                df.attrs["source_errors"] = json.loads(str(data["source_errors"]))
+            return df, float(data["created_at"])
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning("Could not read snapshot %s: %s", path, e)
+        return None
+
+
+def query_mounts(config, query=None):
+    """Compact mount table for `query` (default: the whole metric)
+
+    With several Prometheus instances they are queried concurrently and merged
+    with a `source` column; instances that failed or missed their deadline are
+    listed in df.attrs["source_errors"].
+    """
+    query = query or config["metric_name"]
+    mapping = config["metric_mapping"]
+
+    def fetch(url, settings):
+        return mounts_from_series(prometheus.stream_instant_query(url, query, settings), mapping)
+
+    if not prometheus.is_federated(config["prometheus_url"]):
+        return fetch(config["prometheus_url"], config.get("prometheus_client"))
+    frames, errors = prometheus.fan_out(config["prometheus_url"], fetch, config.get("prometheus_client"))
+    df = concat_mounts(frames)
+    df.attrs["source_errors"] = errors
+    return df
+
+
+def collect_once(config):
+    """Query the current mount states, write them as the latest snapshot and log what changed"""
+    with instrumentation.span("collector.query_mounts") as span:
+        df = query_mounts(config)
+        span.set(rows=len(df))
+    created_at = time.time()
+    for label, error in df.attrs.get("source_errors", {}).items():
+        logger.warning("Prometheus %s unavailable: %s", label, error)
+    with instrumentation.span("collector.write_snapshot", rows=len(df)):
+        write_snapshot(snapshot_path(config["cache_dir"]), df, created_at)
+    if not df.empty:
+        record_history(config, df, created_at)
+    return df
+
+
+def record_history(config, df, created_at, demo_mode=False):
+    """Log the transitions since the previous mount table and add it to the archive
+
+    Returns the transitions. Demo data is not archived.
+    """
+    source_errors = df.attrs.get("source_errors", {})
+    with instrumentation.span("transitions.update", rows=len(df)) as span:
+        changes = transitions.transition_log(config, demo_mode).update(df, created_at, skip_sources=source_errors)
+        span.set(changes=len(changes))
+    archive = None if demo_mode else mount_archive(config)
+    if archive is not None:
+        try:
+            with instrumentation.span("archive.record", rows=len(df)):
+                archive.record(df, created_at, skip_sources=source_errors)
+        except sqlite3.Error as e:
+            # The live views do not depend on the archive
+            logger.warning("Could not archive snapshot: %s", e)
+    return changes
+
+
+class Collector:
+    """Polls Prometheus on a fixed interval and keeps the latest snapshot on disk"""
+
+    def __init__(self, config, interval=None):
+        self.config = config
+        self.interval = interval or config["refresh_interval"]
+        self.last_success = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._run_lock = threading.Lock()
+
+    def run_once(self):
+        """Collect one snapshot; returns True on success, failures are logged and kept"""
+        with self._run_lock:
+            try:
+                df = collect_once(self.config)
+            except prometheus.PrometheusError as e:
+                self.last_error = str(e)
+                logger.warning("Snapshot collection failed: %s", e)
+                return False
+            except Exception as e:
+                # Keep the polling loop alive; the previous snapshot stays in place
+                self.last_error = str(e)
+                logger.exception("Snapshot collection failed")
+                return False
+            self.last_success = time.time()
+            self.last_error = None
+            logger.info("Collected %d mounts", len(df))
+            return True
+
+    def run(self):
+        """Collect every `interval` seconds until stopped"""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.run_once()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        """Run the collection loop in a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="nfs-mount-collector", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def ensure_collector(config):
+    """Start (once per process) an in-app collector thread for this data source"""
+    key = (os.path.abspath(config["cache_dir"]), prometheus.source_key(config["prometheus_url"]), config["metric_name"])
+    with _collectors_lock:
+        collector = _collectors.get(key)
+        if collector is None:
+            collector = _collectors[key] = Collector(config).start()
+        return collector
+
+
+def stop_collectors():
+    """Stop every in-app collector thread (mainly for tests and shutdown)"""
+    with _collectors_lock:
+        for collector in _collectors.values():
+            collector.stop()
+        _collectors.clear()
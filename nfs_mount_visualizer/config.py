@@ -0,0 +1,197 @@
+"""
+Configuration loading for the NFS Mount Visualizer
+
+Kept free of streamlit and of the numeric libraries, so headless commands load
+the same configuration as the app without paying for heavy imports. The
+defaults of the client, history store, archive, instrumentation and layout
+sections live here and are re-exported by the modules that use them.
+"""
+
+import copy
+import json
+import os
+import sys
+import threading
+
+DEFAULT_CLIENT_SETTINGS = {
+    "timeout": 5,             # seconds, instant queries
+    "range_timeout": 10,      # seconds, range queries
+    "retries": 3,             # retry attempts on connection errors, timeouts and 5xx
+    "backoff_factor": 0.5,    # sleep backoff_factor * 2 ** (attempt - 1) between retries
+    "pool_maxsize": 10,       # keep-alive connections kept per Prometheus host
+    "max_points": 11000,      # Prometheus' per-series limit for one range query
+    "max_workers": 4,         # range query shards fetched concurrently
+    "instance_deadline": 30,  # seconds one of several Prometheus instances may take before
+                              # the page goes on without its results
+}
+
+DEFAULT_HISTORY_SETTINGS = {
+    "step": 15,               # seconds between stored samples, match the scrape interval
+    "retention_hours": 168,   # samples older than this are evicted
+    "max_chunks": 8,          # chunks per series before they are compacted into one
+}
+
+DEFAULT_ARCHIVE_SETTINGS = {
+    "enabled": True,
+    "max_gap": None,              # seconds between snapshots still counted as observed
+                                  # (null = 2 * refresh_interval)
+    "hourly_retention_days": 31,  # hourly rollups older than this are dropped
+    "retention_days": 400,        # daily rollups and state changes older than this are dropped
+}
+
+DEFAULT_INSTRUMENTATION_SETTINGS = {
+    "enabled": False,             # record timing spans and show the debug panel
+    "metrics_port": None,         # serve /metrics on this port (implies enabled)
+    "metrics_host": "0.0.0.0",
+    "recent_spans": 200,          # finished spans kept for the debug panel
+}
+
+DEFAULT_LAYOUT_SETTINGS = {
+    "engine": "physics",      # physics (in-browser), layered or force
+    "iterations": 50,         # force layout iterations
+    "scale": 1000,            # approximate layout extent in vis.js pixels
+    "row_width": 60,          # layered layout: nodes per row before wrapping
+}
+
+
+# {config_path: (file key, parsed config, [(level, message)])}
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def _report_stderr(level, message):
+    print(f"{level}: {message}", file=sys.stderr)
+
+
+def _file_key(config_path):
+    """What identifies one version of the config file: its path, mtime and size"""
+    if not config_path:
+        return None
+    try:
+        stat = os.stat(config_path)
+    except OSError:
+        return (config_path, None, None)
+    return (config_path, stat.st_mtime_ns, stat.st_size)
+
+
+def load_config(config_path=None, report=None):
+    """Load configuration from file or use defaults
+
+    Problems with the file are passed to `report(level, message)` ("warning" or
+    "error"), printed to stderr by default, and the defaults are used instead.
+
+    The parsed file is memoized by its mtime and size, so the app can call this
+    on every rerun without re-reading YAML; problems found when it was parsed
+    are reported again on every call. Each call returns its own copy.
+    """
+    report = report or _report_stderr
+    key = _file_key(config_path)
+    with _loaded_lock:
+        loaded = _loaded.get(config_path)
+        if loaded is None or loaded[0] != key:
+            problems = []
+            config = _read_config(config_path, lambda level, message: problems.append((level, message)))
+            # Ensure cache directory exists
+            os.makedirs(config["cache_dir"], exist_ok=True)
+            loaded = _loaded[config_path] = (key, config, problems)
+    for level, message in loaded[2]:
+        report(level, message)
+    return copy.deepcopy(loaded[1])
+
+
+def _read_config(config_path, report):
+    """Parse the config file over the defaults"""
+    default_config = {
+        "prometheus_url": "http://localhost:9090",
+        "cluster_nodes": ["node1", "node2", "node3"],
+        "refresh_interval": 300,  # seconds
+        "cache_dir": ".cache",
+        "node_types": {
+            "default": {"color": "#607D8B", "title": "Cluster Node"}
+        },
+        "app_title": "NFS Mount Visualizer",
+        "metric_name": "nfs_mount_accessible",
+        "prometheus_client": dict(DEFAULT_CLIENT_SETTINGS),
+        "query_cache": {
+            "max_entries": 256,
+            "ttl": None  # seconds, defaults to refresh_interval
+        },
+        "query_pushdown": {
+            "enabled": True,  # narrowed views query only their series from Prometheus
+            "max_values": 100  # larger filters are applied to the full snapshot instead
+        },
+        "graph_cache": {
+            "max_entries": 32  # rendered network graph views kept in memory
+        },
+        "history_store": dict(DEFAULT_HISTORY_SETTINGS),
+        "archive": dict(DEFAULT_ARCHIVE_SETTINGS),
+        "collector": {
+            "enabled": False,  # read snapshots written by a background collector
+            "run_in_app": True  # run the collector as a thread of the app process
+        },
+        "transitions": {
+            "max_events": 10000  # mount state changes kept in the recent changes log
+        },
+        "heatmap": {
+            "buckets": 288  # time columns in the cluster-wide heatmap
+        },
+        "instrumentation": dict(DEFAULT_INSTRUMENTATION_SETTINGS),
+        "metric_mapping": {
+            "server_label": "source_node",
+            "client_label": "target_node", 
+            "path_label": "mount_path",
+            "mount_path_prefix": "/mnt/"
+        },
+        "visualization": {
+            "network": {
+                "height": "700px",
+                "width": "100%",
+                "bgcolor": "#222222",
+                "font_color": "white"
+            },
+            "edge_colors": {
+                "accessible": "#4CAF50",
+                "inaccessible": "#F44336"
+            },
+            "node_sizing": {
+                "base_size": 25,
+                "export_multiplier": 3
+            },
+            "physics": {
+                "gravity": -8000,
+                "central_gravity": 0.3,
+                "spring_length": 200
+            },
+            "layout": dict(DEFAULT_LAYOUT_SETTINGS),
+            "merge_edges": False,  # default for "Merge mounts per node pair"
+            "grouping": {
+                "by": "node_type",        # node_type or regex
+                "pattern": r"^(.*?)\d*$"  # regex mode: first capture group names the group
+            },
+            "charts": {
+                "line_chart_height": 400
+            }
+        }
+    }
+    
+    config = default_config.copy()
+    
+    if config_path:
+        try:
+            if config_path.endswith('.json'):
+                with open(config_path, 'r') as f:
+                    user_config = json.load(f)
+            elif config_path.endswith(('.yaml', '.yml')):
+                import yaml  # deferred, only needed for YAML files
+                with open(config_path, 'r') as f:
+                    user_config = yaml.safe_load(f)
+            else:
+                report("warning", f"Unsupported config file format: {config_path}")
+                return config
+                
+            # Update config with user values
+            config.update(user_config)
+        except Exception as e:
+            report("error", f"Error loading config file: {str(e)}")
+
+    return config
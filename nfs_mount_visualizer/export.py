@@ -0,0 +1,114 @@
+"""
+Headless export of the current mount table
+
+Used by `nfs-mount-visualizer export` from cron jobs and Slurm prolog scripts,
+so it must start fast: only the Prometheus client is imported here. The
+response is streamed and rows are written as each series is decoded (JSON lines
+or CSV); pandas and pyarrow are imported only for Parquet output. Several
+Prometheus instances are queried concurrently and a `source` column is added.
+"""
+
+import csv
+import json
+import sys
+
+from nfs_mount_visualizer import prometheus
+
+FORMATS = ("jsonl", "csv", "parquet")
+COLUMNS = ("nfs_server", "nfs_client", "mount_path", "accessible")
+SOURCE_COLUMNS = COLUMNS + ("source",)
+
+
+def _report_stderr(label, error):
+    print(f"warning: Prometheus {label} unavailable: {error}", file=sys.stderr)
+
+
+def fetch_mounts(config, report=None):
+    """Stream the series of the instant query for the mount metric
+
+    With several Prometheus instances they are queried concurrently and every
+    series is tagged with its instance label; `report(label, error)` is called
+    for instances that failed or missed their deadline.
+    """
+    prometheus_url = config["prometheus_url"]
+    settings = config.get("prometheus_client")
+    if not prometheus.is_federated(prometheus_url):
+        return prometheus.stream_instant_query(prometheus_url, config["metric_name"], settings)
+
+    results, errors = prometheus.fan_out(
+        prometheus_url,
+        lambda url, instance_settings: list(prometheus.stream_instant_query(url, config["metric_name"],
+                                                                            instance_settings)),
+        settings
+    )
+    for label, error in errors.items():
+        (report or _report_stderr)(label, error)
+    return (
+        dict(item, metric={**item["metric"], prometheus.SOURCE_LABEL: label})
+        for label, items in results.items() for item in items
+    )
+
+
+def iter_mounts(series, mapping, columns=COLUMNS):
+    """Yield (server, client, mount_path, accessible[, source]) for each instant vector series"""
+    with_source = "source" in columns
+    for item in series:
+        metric = item["metric"]
+        row = (
+            metric[mapping["server_label"]],
+            metric[mapping["client_label"]],
+            metric[mapping["path_label"]],
+            float(item["value"][1]) == 1,
+        )
+        yield row + (metric.get(prometheus.SOURCE_LABEL),) if with_source else row
+
+
+def write_jsonl(rows, f, columns=COLUMNS):
+    for row in rows:
+        f.write(json.dumps(dict(zip(columns, row))) + "\n")
+
+
+def write_csv(rows, f, columns=COLUMNS):
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+
+
+def write_parquet(series, mapping, path, source_label=None):
+    """Write the compact mount table to a Parquet file and return it"""
+    # Deferred: only Parquet output needs the columnar stack
+    from nfs_mount_visualizer.snapshot import mounts_from_series
+
+    df = mounts_from_series(series, mapping, source_label)
+    df.to_parquet(path, index=False)
+    return df
+
+
+def export_mounts(series, mapping, fmt, output, columns=COLUMNS):
+    """Write the mount table in `fmt` to a text stream (jsonl/csv) or a path (parquet)
+
+    `series` may be a stream of instant vector series. Pass SOURCE_COLUMNS for
+    series from several Prometheus instances. Returns (rows written,
+    inaccessible rows).
+    """
+    if fmt == "parquet":
+        source_label = prometheus.SOURCE_LABEL if "source" in columns else None
+        df = write_parquet(series, mapping, output, source_label)
+        return len(df), int((~df["accessible"]).sum())
+
+    counts = [0, 0]
+
+    def counted(rows):
+        for row in rows:
+            counts[0] += 1
+            counts[1] += not row[3]
+            yield row
+
+    if fmt == "csv":
+        write_csv(counted(iter_mounts(series, mapping, columns)), output, columns)
+    elif fmt == "jsonl":
+        write_jsonl(counted(iter_mounts(series, mapping, columns)), output, columns)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return counts[0], counts[1]
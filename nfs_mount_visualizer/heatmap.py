@@ -0,0 +1,125 @@
+"""
+Dense mounts x time matrix for the cluster-wide heatmap
+
+Every mount edge is one row and every aligned time bucket one column of a
+uint8 matrix (0 = inaccessible, 1 = accessible, MISSING = no sample). Row labels
+are kept as parallel index arrays so rows can be sorted and sliced without
+touching the matrix values, and the matrix is rendered as an RGB image rather
+than as chart points.
+"""
+
+import numpy as np
+
+MISSING = 255
+
+
+def build_heatmap(labels, timestamps, values, start, step, buckets):
+    """Build a heatmap from per-series label tuples and sample arrays
+
+    `labels` is a list of (server, client, mount_path) tuples; `timestamps` and
+    `values` are matching lists of arrays. Samples are placed in the bucket
+    `(timestamp - start) // step`; samples outside the window are dropped.
+    """
+    matrix = np.full((len(labels), buckets), MISSING, dtype=np.uint8)
+    lengths = np.fromiter((len(ts) for ts in timestamps), dtype=np.int64, count=len(timestamps))
+    if lengths.sum():
+        rows = np.repeat(np.arange(len(labels)), lengths)
+        columns = (np.concatenate(timestamps).astype(np.int64) - start) // step
+        samples = np.concatenate(values).astype(np.uint8)
+        inside = (columns >= 0) & (columns < buckets)
+        matrix[rows[inside], columns[inside]] = samples[inside]
+
+    if labels:
+        servers, clients, paths = (np.array(column, dtype=object) for column in zip(*labels))
+    else:
+        servers = clients = paths = np.empty(0, dtype=object)
+    return {
+        "server": servers,
+        "client": clients,
+        "mount_path": paths,
+        "matrix": matrix,
+        "bucket_start": start + np.arange(buckets, dtype=np.int64) * step,
+        "step": step,
+    }
+
+
+def build_heatmap_from_series(series, mapping, start, step, buckets):
+    """Build a heatmap from range query series, consumed one at a time
+
+    `series` can be a stream; samples are converted to arrays as each series is
+    read. A series repeated across range shards is merged into one row.
+    """
+    rows = {}
+    for item in series:
+        metric = item["metric"]
+        points = item.get("values", [])
+        key = tuple(sorted(metric.items()))
+        if key not in rows:
+            rows[key] = ((metric.get(mapping["server_label"]), metric.get(mapping["client_label"]),
+                          metric.get(mapping["path_label"])), [], [])
+        _, timestamps, values = rows[key]
+        timestamps.append(np.fromiter((point[0] for point in points), dtype=np.float64, count=len(points)))
+        values.append(np.fromiter((float(point[1]) for point in points), dtype=np.float64, count=len(points)))
+    return build_heatmap(
+        [label for label, _, _ in rows.values()],
+        [np.concatenate(timestamps) for _, timestamps, _ in rows.values()],
+        [np.concatenate(values) for _, _, values in rows.values()],
+        start, step, buckets
+    )
+
+
+def build_heatmap_from_result(result, mapping, start, step, buckets):
+    """Build a heatmap from a parsed Prometheus range query response"""
+    return build_heatmap_from_series(result["data"]["result"], mapping, start, step, buckets)
+
+
+def failure_counts(heatmap):
+    """Number of inaccessible buckets per row"""
+    return np.count_nonzero(heatmap["matrix"] == 0, axis=1)
+
+
+def sort_rows(heatmap, by="failures"):
+    """Row order for the heatmap: most failures first, or by a label column"""
+    if by == "failures":
+        # Stable sort keeps label order among rows with equal failure counts
+        base = np.lexsort((heatmap["mount_path"].astype(str), heatmap["client"].astype(str),
+                           heatmap["server"].astype(str)))
+        return base[np.argsort(-failure_counts(heatmap)[base], kind="stable")]
+    keys = {
+        "server": (heatmap["mount_path"], heatmap["client"], heatmap["server"]),
+        "client": (heatmap["mount_path"], heatmap["server"], heatmap["client"]),
+    }[by]
+    return np.lexsort(tuple(key.astype(str) for key in keys))
+
+
+def hex_to_rgb(color):
+    """Convert a '#RRGGBB' color to an (r, g, b) tuple"""
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def heatmap_image(matrix, accessible_color, inaccessible_color, missing_color="#424242", row_height=1):
+    """Render a heatmap matrix to an RGB uint8 image through a color lookup table"""
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    palette[0] = hex_to_rgb(inaccessible_color)
+    palette[1] = hex_to_rgb(accessible_color)
+    palette[MISSING] = hex_to_rgb(missing_color)
+    image = palette[matrix]
+    if row_height > 1:
+        image = np.repeat(image, row_height, axis=0)
+    return image
+
+
+def merge_heatmaps(heatmaps):
+    """Stack heatmaps of the same window from several Prometheus instances
+
+    `heatmaps` maps each instance label to its heatmap; a `source` array
+    records which instance each row came from.
+    """
+    parts = list(heatmaps.values())
+    merged = dict(parts[0])
+    for column in ("server", "client", "mount_path"):
+        merged[column] = np.concatenate([part[column] for part in parts])
+    merged["matrix"] = np.concatenate([part["matrix"] for part in parts])
+    merged["source"] = np.repeat(np.array(list(heatmaps), dtype=object), [len(part["server"]) for part in parts])
+    return merged
@@ -0,0 +1,263 @@
+"""
+Incremental on-disk store for Prometheus range query results
+
+Range data is kept under `<cache_dir>/history/` as columnar numpy chunks: one
+directory per (Prometheus source, query, step), one sub-directory per series, one `.npz` chunk per
+fetch. A read only asks Prometheus for the part of the requested window that is
+not stored yet. Chunks are compacted once a series accumulates too many of them
+and samples older than the retention window are evicted.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from nfs_mount_visualizer import prometheus
+from nfs_mount_visualizer.utils import atomic_write
+from nfs_mount_visualizer.config import DEFAULT_HISTORY_SETTINGS
+
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def history_settings(overrides=None):
+    """Merge the `history_store` config section over the defaults"""
+    settings = dict(DEFAULT_HISTORY_SETTINGS)
+    if overrides:
+        settings.update(overrides)
+    return settings
+
+
+def _lock_for(path):
+    """Return the process-wide lock guarding one query directory"""
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _chunk_bounds(path):
+    """Parse the (start, end) window encoded in a chunk file name"""
+    start, end = os.path.basename(path)[len("chunk-"):-len(".npz")].split("-")
+    return int(start), int(end)
+
+
+def _dedupe(timestamps, values):
+    """Sort samples by time, keeping the last written value for repeated timestamps"""
+    order = np.argsort(timestamps, kind="stable")
+    timestamps = timestamps[order]
+    values = values[order]
+    keep = np.append(timestamps[1:] != timestamps[:-1], True)
+    return timestamps[keep], values[keep]
+
+
+def parse_range_series(series):
+    """Convert one Prometheus range series into (timestamps, values) numpy arrays"""
+    points = series.get("values", [])
+    timestamps = np.fromiter((point[0] for point in points), dtype=np.int64, count=len(points))
+    values = np.fromiter((float(point[1]) for point in points), dtype=np.float64, count=len(points))
+    return timestamps, values.astype(np.int8)
+
+
+class HistoryStore:
+    """Per-query, per-series chunked store of range data under `cache_dir`"""
+
+    def __init__(self, cache_dir, step=15, retention_hours=168, max_chunks=8, source=""):
+        self.root = os.path.join(cache_dir, "history")
+        # The Prometheus instance(s) the data comes from, so switching servers does
+        # not serve the previous server's samples
+        self.source = source
+        self.step = int(step)
+        self.retention = int(retention_hours * 3600)
+        self.max_chunks = max_chunks
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a store from the app configuration"""
+        return cls(config["cache_dir"], source=prometheus.source_key(config["prometheus_url"]),
+                   **history_settings(config.get("history_store")))
+
+    def query_range(self, query, start, end, fetch, now=None):
+        """Return stored series for [start, end], fetching only the missing slices
+
+        `fetch(start, end, step)` must return a Prometheus range query response
+        or None on failure. A response with `source_errors` (some federated
+        instances missing) is stored but its window is not marked covered, so it
+        is fetched again. Returns a list of dicts with `metric` labels and
+        `timestamps`/`values` numpy arrays, sorted by labels.
+        """
+        now = int(time.time()) if now is None else int(now)
+        start = int(start) // self.step * self.step
+        end = int(end) // self.step * self.step
+        query_dir = self._query_dir(query)
+
+        with _lock_for(query_dir):
+            os.makedirs(query_dir, exist_ok=True)
+            meta = self._load_meta(query_dir, query)
+
+            for gap_start, gap_end in self._missing_ranges(query_dir, meta, start, end):
+                result = fetch(gap_start, gap_end, self.step)
+                if not result or result.get("status") != "success":
+                    continue
+                self._append(query_dir, meta, result["data"]["result"], gap_start, gap_end)
+                if result.get("source_errors"):
+                    continue
+                meta["start"] = gap_start if meta["start"] is None else min(meta["start"], gap_start)
+                meta["end"] = gap_end if meta["end"] is None else max(meta["end"], gap_end)
+
+            self._evict(query_dir, meta, now - self.retention)
+            self._compact(query_dir, meta)
+            self._save_meta(query_dir, meta)
+            series = self._read(query_dir, meta, start, end)
+
+        self.evict_stale_queries(now)
+        return series
+
+    def _query_dir(self, query):
+        return os.path.join(self.root, _digest(f"{self.source}|{query}|{self.step}"))
+
+    def covered_range(self, query):
+        """Return the (start, end) window stored for a query, or None"""
+        query_dir = self._query_dir(query)
+        meta = self._load_meta(query_dir, query)
+        if meta["start"] is None:
+            return None
+        return meta["start"], meta["end"]
+
+    def evict_stale_queries(self, now=None):
+        """Remove query directories whose newest data is past the retention window"""
+        now = int(time.time()) if now is None else int(now)
+        cutoff = now - self.retention
+        for meta_path in glob.glob(os.path.join(self.root, "*", "meta.json")):
+            query_dir = os.path.dirname(meta_path)
+            try:
+                with open(meta_path, "r") as f:
+                    end = json.load(f).get("end")
+            except (OSError, ValueError):
+                continue
+            if end is not None and end < cutoff:
+                with _lock_for(query_dir):
+                    shutil.rmtree(query_dir, ignore_errors=True)
+
+    def _load_meta(self, query_dir, query):
+        try:
+            with open(os.path.join(query_dir, "meta.json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"query": query, "step": self.step, "start": None, "end": None, "series": {}}
+
+    def _save_meta(self, query_dir, meta):
+        payload = json.dumps(meta).encode("utf-8")
+        atomic_write(os.path.join(query_dir, "meta.json"), lambda f: f.write(payload))
+
+    def _missing_ranges(self, query_dir, meta, start, end):
+        """Slices of [start, end] not covered by the stored window"""
+        covered_start, covered_end = meta["start"], meta["end"]
+        if covered_start is None or end < covered_start - self.step or start > covered_end + self.step:
+            # Nothing stored, or the request would leave a hole: start over
+            self._reset(query_dir, meta)
+            return [(start, end)]
+
+        gaps = []
+        if start < covered_start:
+            gaps.append((start, covered_start - self.step))
+        if end > covered_end:
+            # Re-fetch the last stored sample, it may have been written before the scrape settled
+            gaps.append((covered_end, end))
+        return gaps
+
+    def _reset(self, query_dir, meta):
+        for series_key in meta["series"]:
+            shutil.rmtree(os.path.join(query_dir, series_key), ignore_errors=True)
+        meta.update({"start": None, "end": None, "series": {}})
+
+    def _append(self, query_dir, meta, result, start, end):
+        """Write one chunk per series returned by a fetch"""
+        for series in result:
+            labels = series["metric"]
+            series_key = _digest(json.dumps(labels, sort_keys=True))
+            timestamps, values = parse_range_series(series)
+            if not len(timestamps):
+                continue
+            meta["series"][series_key] = labels
+            series_dir = os.path.join(query_dir, series_key)
+            os.makedirs(series_dir, exist_ok=True)
+            self._write_chunk(series_dir, start, end, timestamps, values)
+
+    def _write_chunk(self, series_dir, start, end, timestamps, values):
+        path = os.path.join(series_dir, f"chunk-{start}-{end}.npz")
+        atomic_write(path, lambda f: np.savez(f, timestamps=timestamps, values=values))
+
+    def _chunks(self, query_dir, series_key):
+        """Chunk files of one series ordered by window (later windows win on overlap)"""
+        paths = glob.glob(os.path.join(query_dir, series_key, "chunk-*.npz"))
+        return sorted(paths, key=_chunk_bounds)
+
+    def _load_chunks(self, paths):
+        timestamps, values = [], []
+        for path in paths:
+            with np.load(path) as chunk:
+                timestamps.append(chunk["timestamps"])
+                values.append(chunk["values"])
+        if not timestamps:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8)
+        return _dedupe(np.concatenate(timestamps), np.concatenate(values))
+
+    def _read(self, query_dir, meta, start, end):
+        series_list = []
+        for series_key, labels in meta["series"].items():
+            paths = [path for path in self._chunks(query_dir, series_key)
+                     if _chunk_bounds(path)[1] >= start and _chunk_bounds(path)[0] <= end]
+            timestamps, values = self._load_chunks(paths)
+            window = (timestamps >= start) & (timestamps <= end)
+            if window.any():
+                series_list.append({
+                    "metric": labels,
+                    "timestamps": timestamps[window],
+                    "values": values[window],
+                })
+        return sorted(series_list, key=lambda series: sorted(series["metric"].items()))
+
+    def _evict(self, query_dir, meta, cutoff):
+        """Drop chunks that end before the retention cutoff"""
+        for series_key in list(meta["series"]):
+            paths = self._chunks(query_dir, series_key)
+            for path in paths:
+                if _chunk_bounds(path)[1] < cutoff:
+                    os.remove(path)
+            if not self._chunks(query_dir, series_key):
+                shutil.rmtree(os.path.join(query_dir, series_key), ignore_errors=True)
+                del meta["series"][series_key]
+        if meta["start"] is not None:
+            aligned_cutoff = -(-cutoff // self.step) * self.step
+            if meta["end"] < aligned_cutoff:
+                self._reset(query_dir, meta)
+            else:
+                meta["start"] = max(meta["start"], aligned_cutoff)
+
+    def _compact(self, query_dir, meta):
+        """Merge a series' chunks into one once it has more than `max_chunks`"""
+        for series_key in meta["series"]:
+            paths = self._chunks(query_dir, series_key)
+            if len(paths) <= self.max_chunks:
+                continue
+            timestamps, values = self._load_chunks(paths)
+            keep = timestamps >= (meta["start"] or 0)
+            bounds = [_chunk_bounds(path) for path in paths]
+            start = max(min(b[0] for b in bounds), meta["start"] or 0)
+            end = max(b[1] for b in bounds)
+            series_dir = os.path.join(query_dir, series_key)
+            self._write_chunk(series_dir, start, end, timestamps[keep], values[keep])
+            merged = os.path.join(series_dir, f"chunk-{start}-{end}.npz")
+            for path in paths:
+                if path != merged:
+                    os.remove(path)
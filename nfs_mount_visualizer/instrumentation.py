@@ -0,0 +1,259 @@
+"""
+Timing spans for the stages of a page load, exported as Prometheus metrics
+
+Stages (Prometheus requests and parsing, building the mount table, the graph
+build and serialization, each tab) are wrapped in `span(name)`. A span measures
+wall time and carries counts such as `rows` or `bytes` set while it runs.
+Finished spans are aggregated per stage into a duration histogram and counters,
+and the most recent ones are kept for the debug panel. The hit, miss,
+coalesced and eviction counters of the registered result caches are exported
+alongside them.
+
+Recording is off by default: `span` then returns one shared no-op object, so an
+instrumented call costs a function call and a flag check. When
+`instrumentation.metrics_port` is set, a small HTTP server in a daemon thread
+serves the aggregates at /metrics in the Prometheus text format; http.server is
+only imported then. Like the config module this does not import streamlit,
+pandas or numpy, so the collector process can expose the same metrics.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+from nfs_mount_visualizer.config import DEFAULT_INSTRUMENTATION_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "nfs_mount_visualizer_stage"
+CACHE_METRIC_PREFIX = "nfs_mount_visualizer_cache"
+CACHE_COUNTERS = ["hits", "misses", "coalesced", "evictions"]
+# Histogram buckets in seconds, from cached lookups to slow Prometheus queries
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_enabled = False
+_stages = {}
+_recent = deque(maxlen=DEFAULT_INSTRUMENTATION_SETTINGS["recent_spans"])
+_lock = threading.Lock()
+_server = None
+_caches = {}
+
+
+class _NoopSpan:
+    """Stand-in returned by `span` while recording is off"""
+
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **counts):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """One timed stage; use as a context manager and `set` counts while it runs"""
+
+    recording = True
+
+    def __init__(self, name, counts):
+        self.name = name
+        self.counts = counts
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record(self.name, time.perf_counter() - self.started, self.counts, exc_type is not None)
+        return False
+
+    def set(self, **counts):
+        """Record counts such as rows=..., bytes=... for this span"""
+        self.counts.update(counts)
+
+
+class _Stage:
+    """Aggregates of every finished span of one stage"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.last_seconds = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.totals = {}
+        self.last = {}
+
+
+def span(name, **counts):
+    """Context manager timing the stage `name`, or a no-op while recording is off"""
+    if not _enabled:
+        return _NOOP
+    return Span(name, counts)
+
+
+def _record(name, seconds, counts, failed):
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = _Stage()
+        stage.count += 1
+        stage.errors += failed
+        stage.seconds += seconds
+        stage.last_seconds = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stage.buckets[i] += 1
+        for key, value in counts.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stage.totals[key] = stage.totals.get(key, 0) + value
+        stage.last = dict(counts)
+        _recent.append({"time": time.time(), "stage": name, "seconds": seconds, "failed": failed, **counts})
+
+
+def configure(settings=None):
+    """Apply the `instrumentation` config section; cheap enough to call on every rerun"""
+    global _enabled, _recent
+    settings = dict(DEFAULT_INSTRUMENTATION_SETTINGS, **(settings or {}))
+    _enabled = bool(settings["enabled"] or settings["metrics_port"])
+    if _recent.maxlen != settings["recent_spans"]:
+        with _lock:
+            _recent = deque(_recent, maxlen=settings["recent_spans"])
+    if settings["metrics_port"]:
+        start_metrics_server(settings["metrics_port"], settings["metrics_host"])
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    """Forget every recorded span"""
+    with _lock:
+        _stages.clear()
+        _recent.clear()
+
+
+def recent_spans(limit=None):
+    """Finished spans, newest first, as dicts of time, stage, seconds, failed and counts"""
+    with _lock:
+        spans = list(_recent)
+    spans.reverse()
+    return spans if limit is None else spans[:limit]
+
+
+def stage_summary():
+    """Per stage: calls, errors, total and last seconds, count totals and last counts"""
+    with _lock:
+        return {
+            name: {"count": stage.count, "errors": stage.errors, "seconds": stage.seconds,
+                   "last_seconds": stage.last_seconds, "totals": dict(stage.totals), "last": dict(stage.last)}
+            for name, stage in sorted(_stages.items())
+        }
+
+
+def register_cache(name, cache):
+    """Export the counters of `cache` (anything with a ResultCache-like `stats()`) as `name`"""
+    _caches[name] = cache
+
+
+def cache_stats():
+    """{cache name: stats()} of every registered cache"""
+    return {name: cache.stats() for name, cache in sorted(_caches.items())}
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    """The aggregates in the Prometheus text exposition format"""
+    with _lock:
+        stages = sorted((name, stage.count, stage.errors, stage.seconds, list(stage.buckets), dict(stage.totals))
+                        for name, stage in _stages.items())
+    name = f"{METRIC_PREFIX}_duration_seconds"
+    lines = [f"# HELP {name} Wall time spent in each instrumented stage",
+             f"# TYPE {name} histogram"]
+    for stage, count, _, seconds, buckets, _ in stages:
+        label = f"stage=\"{_label(stage)}\""
+        for bound, value in zip(BUCKETS, buckets):
+            lines.append(f"{name}_bucket{{{label},le=\"{_number(float(bound))}\"}} {value}")
+        lines.append(f"{name}_bucket{{{label},le=\"+Inf\"}} {count}")
+        lines.append(f"{name}_sum{{{label}}} {_number(seconds)}")
+        lines.append(f"{name}_count{{{label}}} {count}")
+
+    name = f"{METRIC_PREFIX}_errors_total"
+    lines += [f"# HELP {name} Stage runs that raised", f"# TYPE {name} counter"]
+    lines += [f"{name}{{stage=\"{_label(stage)}\"}} {errors}" for stage, _, errors, _, _, _ in stages]
+
+    # One counter per recorded count, e.g. rows and bytes
+    keys = sorted({key for *_, totals in stages for key in totals})
+    for key in keys:
+        name = f"{METRIC_PREFIX}_{re.sub(r'[^a-zA-Z0-9_]', '_', key)}_total"
+        lines += [f"# HELP {name} Sum of the {key} recorded by each stage", f"# TYPE {name} counter"]
+        lines += [f"{name}{{stage=\"{_label(stage)}\"}} {_number(totals[key])}"
+                  for stage, *_, totals in stages if key in totals]
+
+    caches = cache_stats()
+    for key in CACHE_COUNTERS:
+        name = f"{CACHE_METRIC_PREFIX}_{key}_total"
+        lines += [f"# HELP {name} Result cache lookups counted as {key}", f"# TYPE {name} counter"]
+        lines += [f"{name}{{cache=\"{_label(cache)}\"}} {stats[key]}" for cache, stats in caches.items()]
+    name = f"{CACHE_METRIC_PREFIX}_entries"
+    lines += [f"# HELP {name} Entries currently held by each result cache", f"# TYPE {name} gauge"]
+    lines += [f"{name}{{cache=\"{_label(cache)}\"}} {stats['entries']}" for cache, stats in caches.items()]
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread, once per process
+
+    Returns the server, or None when the port cannot be bound (for example
+    because the collector process already serves it).
+    """
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _lock:
+        if _server is not None:
+            return _server or None
+        try:
+            _server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+        except OSError as e:
+            logger.warning("Could not serve metrics on %s:%s: %s", host, port, e)
+            # Don't retry on every rerun
+            _server = False
+            return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%s/metrics", host, _server.server_address[1])
+    return _server
@@ -0,0 +1,50 @@
+"""
+Run-length representation of mount accessibility history
+
+A 0/1 accessibility series changes rarely, so it is stored as intervals of
+constant state instead of one sample per scrape. Each sample is taken to cover
+[t, t + step); runs are also broken where samples are missing, so gaps in the
+data never count as uptime or downtime.
+"""
+
+import numpy as np
+
+
+def to_intervals(timestamps, values, step):
+    """Run-length encode a 0/1 series into `start`, `end` and `state` arrays"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int8)
+    if not len(timestamps):
+        empty = np.empty(0, dtype=np.int64)
+        return {"start": empty, "end": empty, "state": np.empty(0, dtype=np.int8)}
+
+    # A new run starts wherever the state changes or samples are missing
+    breaks = np.flatnonzero((np.diff(values) != 0) | (np.diff(timestamps) > step)) + 1
+    first = np.concatenate(([0], breaks))
+    last = np.concatenate((breaks, [len(timestamps)])) - 1
+    return {
+        "start": timestamps[first],
+        "end": timestamps[last] + step,
+        "state": values[first],
+    }
+
+
+def interval_stats(intervals):
+    """Uptime, outage count, MTTR and MTBF (seconds) computed from intervals
+
+    MTTR is the mean outage duration; MTBF is accessible time divided by the
+    number of outages. Both are None when there were no outages.
+    """
+    durations = intervals["end"] - intervals["start"]
+    down = intervals["state"] == 0
+    observed = int(durations.sum())
+    up_time = int(durations[~down].sum())
+    outages = int(np.count_nonzero(down))
+    return {
+        "observed": observed,
+        "uptime": (up_time / observed * 100) if observed else None,
+        "outages": outages,
+        "downtime": observed - up_time,
+        "mttr": float(durations[down].mean()) if outages else None,
+        "mtbf": up_time / outages if outages else None,
+    }
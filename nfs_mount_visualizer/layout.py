@@ -0,0 +1,240 @@
+"""
+Server-side graph layout for the network tab
+
+Instead of letting vis.js run Barnes-Hut physics in the browser on every render,
+node positions can be computed once here and shipped as fixed coordinates.
+Two engines are available:
+
+- `layered`: bipartite layout with servers on top, nodes that both export and
+  mount in the middle and clients below, ordered by neighbor barycenter.
+- `force`: numpy Fruchterman-Reingold force-directed layout.
+
+Layouts are cached in `<cache_dir>/layout/` keyed by a hash of the topology.
+When the topology changes, nodes that were already placed keep their position
+and only new nodes are laid out around them.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from nfs_mount_visualizer.utils import atomic_write
+from nfs_mount_visualizer.config import DEFAULT_LAYOUT_SETTINGS
+
+
+MAX_CACHED_LAYOUTS = 64
+
+LAYER_GAP = 400
+ROW_GAP = 120
+NODE_GAP = 80
+
+
+def layout_settings(overrides=None):
+    """Merge the `visualization.layout` config section over the defaults"""
+    settings = dict(DEFAULT_LAYOUT_SETTINGS)
+    if overrides:
+        settings.update(overrides)
+    return settings
+
+
+def topology_hash(nodes, edges):
+    """Hash the node set and (client, server) edge set, ignoring mount status"""
+    digest = hashlib.sha1()
+    digest.update(json.dumps(sorted(nodes)).encode("utf-8"))
+    digest.update(json.dumps(sorted(set(edges))).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _edge_index(nodes, edges):
+    """Map (client, server) pairs to an (E, 2) array of node indices"""
+    index = {node: i for i, node in enumerate(nodes)}
+    pairs = [(index[a], index[b]) for a, b in set(edges) if a in index and b in index and a != b]
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+
+def _barycenter_order(candidates, anchor_x, edge_index):
+    """Order candidate node indices by the mean x of their already placed neighbors"""
+    sums = np.zeros(len(anchor_x))
+    counts = np.zeros(len(anchor_x))
+    placed = ~np.isnan(anchor_x)
+    for a, b in ((edge_index[:, 0], edge_index[:, 1]), (edge_index[:, 1], edge_index[:, 0])):
+        use = placed[b]
+        np.add.at(sums, a[use], anchor_x[b[use]])
+        np.add.at(counts, a[use], 1)
+    with np.errstate(invalid="ignore"):
+        barycenter = np.where(counts > 0, sums / np.maximum(counts, 1), np.inf)
+    return candidates[np.argsort(barycenter[candidates], kind="stable")]
+
+
+def layered_layout(nodes, edges, settings, pinned=None):
+    """Bipartite layered layout; pinned positions are kept and new nodes go below them"""
+    nodes = list(nodes)
+    edge_index = _edge_index(nodes, edges)
+    n = len(nodes)
+    is_client = np.zeros(n, dtype=bool)
+    is_server = np.zeros(n, dtype=bool)
+    is_client[edge_index[:, 0]] = True
+    is_server[edge_index[:, 1]] = True
+    layer = np.where(is_server & ~is_client, 0, np.where(is_server & is_client, 1, 2))
+
+    x = np.full(n, np.nan)
+    y = np.full(n, np.nan)
+    base_y = 0.0
+    if pinned:
+        for i, node in enumerate(nodes):
+            if node in pinned:
+                x[i], y[i] = pinned[node]
+        if not np.isnan(y).all():
+            # New nodes are placed in fresh rows below the existing layout
+            base_y = np.nanmax(y) + LAYER_GAP
+
+    row_width = settings["row_width"]
+    names = np.array(nodes, dtype=object)
+    for level in (0, 1, 2):
+        candidates = np.flatnonzero((layer == level) & np.isnan(x))
+        if not len(candidates):
+            continue
+        # Sort by name first so ties in barycenter stay deterministic
+        candidates = candidates[np.argsort(names[candidates].astype(str), kind="stable")]
+        if level:
+            candidates = _barycenter_order(candidates, x, edge_index)
+        slots = np.arange(len(candidates))
+        row, column = slots // row_width, slots % row_width
+        per_row = np.minimum(len(candidates) - row * row_width, row_width)
+        x[candidates] = (column - (per_row - 1) / 2) * NODE_GAP
+        y[candidates] = base_y + row * ROW_GAP
+        base_y = y[candidates].max() + LAYER_GAP
+
+    return {node: (float(x[i]), float(y[i])) for i, node in enumerate(nodes)}
+
+
+def force_layout(nodes, edges, settings, pinned=None, seed=0, block=512):
+    """Fruchterman-Reingold layout in numpy; pinned nodes do not move"""
+    nodes = list(nodes)
+    n = len(nodes)
+    if not n:
+        return {}
+    edge_index = _edge_index(nodes, edges)
+    scale = float(settings["scale"])
+    rng = np.random.default_rng(seed)
+
+    pos = rng.uniform(-scale / 2, scale / 2, size=(n, 2)).astype(np.float32)
+    movable = np.ones(n, dtype=bool)
+    if pinned:
+        for i, node in enumerate(nodes):
+            if node in pinned:
+                pos[i] = pinned[node]
+                movable[i] = False
+        # Start new nodes next to the centroid of their pinned neighbors
+        sums = np.zeros((n, 2), dtype=np.float32)
+        counts = np.zeros(n, dtype=np.float32)
+        for a, b in ((edge_index[:, 0], edge_index[:, 1]), (edge_index[:, 1], edge_index[:, 0])):
+            use = ~movable[b]
+            np.add.at(sums, a[use], pos[b[use]])
+            np.add.at(counts, a[use], 1)
+        seeded = movable & (counts > 0)
+        pos[seeded] = sums[seeded] / counts[seeded, None] + rng.normal(0, scale / 50, size=(seeded.sum(), 2))
+
+    movers = np.flatnonzero(movable)
+    if not len(movers):
+        return {node: (float(pos[i, 0]), float(pos[i, 1])) for i, node in enumerate(nodes)}
+
+    k2 = np.float32(scale * scale / n)
+    k = np.sqrt(k2)
+    temperature = scale / 10
+    cooling = temperature / (settings["iterations"] + 1)
+    for _ in range(settings["iterations"]):
+        displacement = np.zeros((n, 2), dtype=np.float32)
+        squared = (pos ** 2).sum(axis=1)
+
+        # Repulsion k^2 / d between every movable node and all nodes, in row blocks to bound
+        # memory: sum_j (p_i - p_j) * w_ij == p_i * sum_j w_ij - (W @ p)_i with w_ij = k^2 / d_ij^2
+        for start in range(0, len(movers), block):
+            rows = movers[start:start + block]
+            distance2 = squared[rows, None] + squared[None, :] - 2 * (pos[rows] @ pos.T)
+            weights = k2 / np.maximum(distance2, 0.01)
+            weights[np.arange(len(rows)), rows] = 0
+            displacement[rows] += pos[rows] * weights.sum(axis=1)[:, None] - weights @ pos
+
+        # Attraction along edges
+        if len(edge_index):
+            delta = pos[edge_index[:, 0]] - pos[edge_index[:, 1]]
+            distance = np.maximum(np.linalg.norm(delta, axis=1), 0.01)
+            force = delta * (distance / k)[:, None]
+            np.add.at(displacement, edge_index[:, 0], -force)
+            np.add.at(displacement, edge_index[:, 1], force)
+
+        # Move by at most the current temperature
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 0.01)
+        step = displacement * (np.minimum(length, temperature) / length)[:, None]
+        pos[movers] += step[movers]
+        temperature = max(temperature - cooling, 1.0)
+
+    return {node: (float(pos[i, 0]), float(pos[i, 1])) for i, node in enumerate(nodes)}
+
+
+ENGINES = {
+    "layered": layered_layout,
+    "force": force_layout,
+}
+
+
+def _load_positions(path):
+    try:
+        with open(path, "r") as f:
+            return {node: tuple(xy) for node, xy in json.load(f).items()}
+    except (OSError, ValueError):
+        return None
+
+
+def _save_positions(path, positions):
+    payload = json.dumps(positions).encode("utf-8")
+    atomic_write(path, lambda f: f.write(payload))
+
+
+def _prune_layouts(layout_dir, engine):
+    """Keep only the most recently written cached layouts of an engine"""
+    paths = [
+        os.path.join(layout_dir, name) for name in os.listdir(layout_dir)
+        if name.startswith(f"{engine}-") and name.endswith(".json") and name != f"{engine}-latest.json"
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[MAX_CACHED_LAYOUTS:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def compute_layout(cache_dir, nodes, edges, settings):
+    """Return {node: (x, y)} for the topology, computing it at most once per topology
+
+    The previous layout of the same engine is reused for nodes that are still
+    present, as long as at least half of the nodes were already placed.
+    """
+    settings = layout_settings(settings)
+    engine = settings["engine"]
+    layout_dir = os.path.join(cache_dir, "layout")
+    os.makedirs(layout_dir, exist_ok=True)
+
+    cache_path = os.path.join(layout_dir, f"{engine}-{topology_hash(nodes, edges)}.json")
+    positions = _load_positions(cache_path)
+    if positions is not None and all(node in positions for node in nodes):
+        return positions
+
+    latest_path = os.path.join(layout_dir, f"{engine}-latest.json")
+    previous = _load_positions(latest_path) or {}
+    pinned = {node: previous[node] for node in nodes if node in previous}
+    if len(pinned) * 2 < len(nodes):
+        pinned = None
+
+    positions = ENGINES[engine](nodes, edges, settings, pinned=pinned)
+    _save_positions(cache_path, positions)
+    _prune_layouts(layout_dir, engine)
+
+    # Remember every position ever placed so nodes filtered out and back in keep their spot
+    previous.update(positions)
+    _save_positions(latest_path, previous)
+    return positions
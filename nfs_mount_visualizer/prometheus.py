@@ -0,0 +1,426 @@
+"""
+Shared HTTP client for the Prometheus API
+
+Keeps one pooled keep-alive requests.Session per process so Streamlit reruns and
+concurrent sessions reuse TCP/TLS connections. Transient failures (connection
+errors, timeouts, 5xx) are retried with exponential backoff before surfacing.
+Results are memoized in a process-wide TTL/LRU cache shared by every session.
+Long range queries are split into shards under Prometheus' points-per-series
+limit and fetched concurrently. Large responses can be streamed: the series of
+the result array are decoded one at a time from the response body instead of
+parsing the whole body into one tree. Selectors narrowed by label matchers let
+views fetch only the series they show. `prometheus_url` may list several
+instances, which are queried concurrently, each within its own deadline, and
+whose results are tagged with the instance label. This module deliberately does
+not import streamlit so it can be used headless, and imports requests only when
+the first session is built so importing it (e.g. for `cli export --help`) stays cheap.
+"""
+
+import codecs
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from urllib.parse import urlparse
+
+from nfs_mount_visualizer import instrumentation
+from nfs_mount_visualizer.utils import ResultCache
+from nfs_mount_visualizer.config import DEFAULT_CLIENT_SETTINGS
+
+
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# Label added to series (and column added to mount tables) naming the Prometheus instance
+SOURCE_LABEL = "source"
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+_RESULT_START = re.compile(r'"result"\s*:\s*\[')
+_STATUS = re.compile(r'"status"\s*:\s*"(\w+)"')
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class PrometheusError(Exception):
+    """Raised when Prometheus cannot be reached or answers with an error"""
+
+
+def client_settings(overrides=None):
+    """Merge the `prometheus_client` config section over the defaults"""
+    settings = dict(DEFAULT_CLIENT_SETTINGS)
+    if overrides:
+        settings.update(overrides)
+    return settings
+
+
+def _build_session(settings):
+    """Create a session with connection pooling, gzip and bounded retries"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=settings["retries"],
+        connect=settings["retries"],
+        read=settings["retries"],
+        status=settings["retries"],
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET"]),
+        backoff_factor=settings["backoff_factor"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings["pool_maxsize"],
+        pool_maxsize=settings["pool_maxsize"],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip", "Accept": "application/json"})
+    return session
+
+
+def get_session(settings=None):
+    """Return the process-wide session for the given client settings"""
+    settings = client_settings(settings)
+    key = (settings["retries"], settings["backoff_factor"], settings["pool_maxsize"])
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = _build_session(settings)
+        return session
+
+
+def close_sessions():
+    """Close all pooled sessions (mainly for tests and shutdown)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def _get(prometheus_url, endpoint, params, timeout, settings):
+    """GET a Prometheus API endpoint and return the decoded JSON body"""
+    import requests
+
+    try:
+        with instrumentation.span(f"prometheus.{endpoint}") as span:
+            response = get_session(settings).get(
+                f"{prometheus_url.rstrip('/')}/api/v1/{endpoint}",
+                params=params,
+                timeout=timeout
+            )
+            span.set(bytes=len(response.content))
+    except requests.exceptions.RequestException as e:
+        raise PrometheusError(f"Error connecting to Prometheus: {str(e)}") from e
+
+    if response.status_code != 200:
+        raise PrometheusError(f"Failed to query Prometheus: {response.text}")
+    with instrumentation.span("prometheus.parse", bytes=len(response.content)):
+        return response.json()
+
+
+def instant_query(prometheus_url, query, settings=None):
+    """Run an instant query against /api/v1/query"""
+    settings = client_settings(settings)
+    return _get(prometheus_url, "query", {"query": query}, settings["timeout"], settings)
+
+
+def range_query(prometheus_url, query, start, end, step, settings=None):
+    """Run a range query against /api/v1/query_range"""
+    settings = client_settings(settings)
+    params = {"query": query, "start": start, "end": end, "step": step}
+    return _get(prometheus_url, "query_range", params, settings["range_timeout"], settings)
+
+
+def _error_message(body):
+    """Best-effort error text from a (possibly partial) Prometheus response body"""
+    try:
+        return json.loads(body).get("error", "unknown error")
+    except (ValueError, AttributeError):
+        return "unexpected response"
+
+
+def iter_result_series(chunks):
+    """Incrementally decode the `data.result` array of a Prometheus API response
+
+    `chunks` yields pieces of the body as text. Series objects are decoded one at
+    a time with JSONDecoder.raw_decode and yielded as soon as they are complete,
+    so neither the whole body nor the full parsed tree is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buffer = ""
+
+    # Everything before the result array is status and resultType
+    match = None
+    while match is None:
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise PrometheusError(f"Failed to query Prometheus: {_error_message(buffer)}")
+        buffer += chunk
+        match = _RESULT_START.search(buffer)
+    status = _STATUS.search(buffer, 0, match.start())
+    if status is not None and status.group(1) != "success":
+        raise PrometheusError(f"Failed to query Prometheus: {status.group(1)}")
+
+    pos = match.end()
+    exhausted = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            series, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise PrometheusError("Truncated response from Prometheus")
+            # Incomplete series: keep the unparsed tail and at least double it before
+            # retrying, so a series spanning many chunks is not re-parsed once per chunk
+            buffer = buffer[pos:]
+            pos = 0
+            target = max(2 * len(buffer), STREAM_CHUNK_SIZE)
+            while len(buffer) < target:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                buffer += chunk
+            continue
+        yield series
+        pos = end
+
+
+def _stream(prometheus_url, endpoint, params, timeout, settings):
+    """GET an API endpoint and yield the series of its result array as they arrive"""
+    import requests
+
+    received = 0
+
+    # Transfer and decoding interleave with the caller consuming the series,
+    # so this span covers all three
+    with instrumentation.span(f"prometheus.stream_{endpoint}") as span:
+        try:
+            response = get_session(settings).get(
+                f"{prometheus_url.rstrip('/')}/api/v1/{endpoint}",
+                params=params,
+                timeout=timeout,
+                stream=True
+            )
+        except requests.exceptions.RequestException as e:
+            raise PrometheusError(f"Error connecting to Prometheus: {str(e)}") from e
+
+        def decoded():
+            nonlocal received
+            # iter_content undoes gzip; decode UTF-8 incrementally so multi-byte characters may span chunks
+            text = codecs.getincrementaldecoder("utf-8")()
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                received += len(chunk)
+                yield text.decode(chunk)
+
+        with response:
+            if response.status_code != 200:
+                raise PrometheusError(f"Failed to query Prometheus: {response.text}")
+            try:
+                yield from iter_result_series(decoded())
+            except requests.exceptions.RequestException as e:
+                raise PrometheusError(f"Error reading response from Prometheus: {str(e)}") from e
+            finally:
+                span.set(bytes=received)
+
+
+def stream_instant_query(prometheus_url, query, settings=None):
+    """Instant query whose result series are yielded one at a time"""
+    settings = client_settings(settings)
+    return _stream(prometheus_url, "query", {"query": query}, settings["timeout"], settings)
+
+
+def stream_range_query(prometheus_url, query, start, end, step, settings=None):
+    """Range query whose series are yielded one at a time, shard after shard
+
+    A series spanning several shards is yielded once per shard, in time order.
+    """
+    settings = client_settings(settings)
+    for shard_start, shard_end in range_shards(start, end, step, settings["max_points"]):
+        params = {"query": query, "start": shard_start, "end": shard_end, "step": step}
+        yield from _stream(prometheus_url, "query_range", params, settings["range_timeout"], settings)
+
+
+def range_shards(start, end, step, max_points):
+    """Split [start, end] into consecutive windows of at most `max_points` samples"""
+    span = (max_points - 1) * step
+    shards = []
+    shard_start = start
+    while shard_start <= end:
+        shard_end = min(shard_start + span, end)
+        shards.append((shard_start, shard_end))
+        shard_start = shard_end + step
+    return shards
+
+
+def merge_range_results(results):
+    """Stitch per-shard range results in order, dropping duplicate boundary samples"""
+    merged = OrderedDict()
+    for result in results:
+        for series in result["data"]["result"]:
+            key = json.dumps(series["metric"], sort_keys=True)
+            target = merged.setdefault(key, {"metric": series["metric"], "values": []})
+            values = series.get("values", [])
+            # Shards are in time order, so only the head of each shard can repeat the previous tail
+            last = target["values"][-1][0] if target["values"] else None
+            skip = 0
+            while skip < len(values) and last is not None and values[skip][0] <= last:
+                skip += 1
+            target["values"].extend(values[skip:])
+    return {"status": "success", "data": {"resultType": "matrix", "result": list(merged.values())}}
+
+
+def sharded_range_query(prometheus_url, query, start, end, step, settings=None):
+    """Range query split into shards under the points limit and fetched concurrently"""
+    settings = client_settings(settings)
+    shards = range_shards(start, end, step, settings["max_points"])
+    if len(shards) == 1:
+        return range_query(prometheus_url, query, start, end, step, settings)
+
+    with ThreadPoolExecutor(max_workers=min(settings["max_workers"], len(shards))) as pool:
+        responses = list(pool.map(
+            lambda shard: range_query(prometheus_url, query, shard[0], shard[1], step, settings),
+            shards
+        ))
+
+    for response in responses:
+        if response.get("status") != "success":
+            raise PrometheusError(f"Failed to query Prometheus: {response.get('error', 'unknown error')}")
+    return merge_range_results(responses)
+
+
+query_cache = ResultCache()
+instrumentation.register_cache("prometheus_query", query_cache)
+
+
+def cached_instant_query(prometheus_url, query, ttl, settings=None):
+    """Instant query served from the shared cache when younger than `ttl` seconds"""
+    key = (prometheus_url, query, None, None, None)
+    return query_cache.get_or_fetch(key, ttl, lambda: instant_query(prometheus_url, query, settings))
+
+
+def cached_range_query(prometheus_url, query, start, end, step, ttl, settings=None):
+    """Range query served from the shared cache; callers should align start/end to `step`"""
+    key = (prometheus_url, query, start, end, step)
+    return query_cache.get_or_fetch(
+        key, ttl, lambda: sharded_range_query(prometheus_url, query, start, end, step, settings)
+    )
+
+
+_REGEX_SPECIAL = re.compile(r"([\\.+*?()|\[\]{}^$])")
+
+
+def quote_label_value(value):
+    """Quote a label value as a PromQL string literal"""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+def regex_alternation(values):
+    """RE2 pattern matching exactly one of `values` (Prometheus anchors label regexes)"""
+    return "|".join(_REGEX_SPECIAL.sub(r"\\\1", str(value)) for value in sorted(set(values)))
+
+
+def label_selector(metric_name, matchers):
+    """Instant vector selector for `metric_name` narrowed by {label: values} matchers
+
+    A single value becomes an equality matcher and several values an escaped
+    regex alternation, so Prometheus only returns the matching series.
+    """
+    terms = []
+    for label, values in matchers.items():
+        values = sorted(set(values))
+        if len(values) == 1:
+            terms.append(f"{label}={quote_label_value(values[0])}")
+        else:
+            terms.append(f"{label}=~{quote_label_value(regex_alternation(values))}")
+    return f"{metric_name}{{{', '.join(terms)}}}" if terms else metric_name
+
+
+def is_federated(prometheus_url):
+    """True when `prometheus_url` lists several Prometheus instances"""
+    return isinstance(prometheus_url, (list, tuple))
+
+
+def source_key(prometheus_url):
+    """Hashable cache key for a single or federated `prometheus_url`"""
+    if is_federated(prometheus_url):
+        return json.dumps(prometheus_url, sort_keys=True)
+    return prometheus_url
+
+
+def instances(prometheus_url, settings=None):
+    """Normalize `prometheus_url` to a list of {label, url, settings} instances
+
+    Each entry is a URL or a dict with `url`, an optional `label` (defaults to
+    the host of the URL) and optional `prometheus_client` overrides such as
+    `timeout` or `instance_deadline` for that instance only.
+    """
+    entries = prometheus_url if is_federated(prometheus_url) else [prometheus_url]
+    result = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        overrides = {key: value for key, value in entry.items() if key not in ("url", "label")}
+        instance_settings = client_settings(settings)
+        instance_settings.update(overrides)
+        result.append({
+            "label": entry.get("label") or urlparse(entry["url"]).netloc or entry["url"],
+            "url": entry["url"],
+            "settings": instance_settings,
+        })
+    return result
+
+
+def fan_out(prometheus_url, fetch, settings=None):
+    """Call fetch(url, settings) for every instance concurrently
+
+    Returns ({label: result}, {label: error message}) in configuration order.
+    An instance that fails, or has not answered within its `instance_deadline`,
+    is reported in the errors and left behind so it cannot stall the others.
+    Raises PrometheusError when no instance answered.
+    """
+    targets = instances(prometheus_url, settings)
+    pool = ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="prometheus-fan-out")
+    started = time.monotonic()
+    try:
+        futures = [pool.submit(fetch, target["url"], target["settings"]) for target in targets]
+        results, errors = {}, {}
+        for target, future in zip(targets, futures):
+            deadline = target["settings"]["instance_deadline"]
+            try:
+                results[target["label"]] = future.result(max(0.0, started + deadline - time.monotonic()))
+            except FutureTimeoutError:
+                errors[target["label"]] = f"No answer from {target['url']} within {deadline}s"
+            except PrometheusError as e:
+                errors[target["label"]] = str(e)
+    finally:
+        # Do not wait for instances that missed their deadline
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if not results:
+        raise PrometheusError("; ".join(f"{label}: {error}" for label, error in errors.items()))
+    return results, errors
+
+
+def merge_source_results(results):
+    """Merge responses from several instances, tagging every series with its instance label"""
+    merged = []
+    result_type = "vector"
+    for label, response in results.items():
+        if response.get("status") != "success":
+            raise PrometheusError(f"Failed to query Prometheus {label}: {response.get('error', 'unknown error')}")
+        result_type = response["data"].get("resultType", result_type)
+        for series in response["data"]["result"]:
+            merged.append(dict(series, metric={**series["metric"], SOURCE_LABEL: label}))
+    return {"status": "success", "data": {"resultType": result_type, "result": merged}}
@@ -0,0 +1,335 @@
+"""
+Indexed snapshot of the mount accessibility table
+
+Built once per refresh from the DataFrame returned by `get_mount_accessibility`.
+It keeps row-position indexes per server, client and (server, path) plus
+precomputed status masks, so the filters in the network and table tabs become
+index lookups and a single `take` of the selected rows instead of a copy and
+rescan of the full frame on every rerun.
+
+The mount table itself is stored compactly: `nfs_server` and `nfs_client` are
+categoricals sharing one sorted node dictionary, `mount_path` is a categorical
+over its own dictionary and `accessible` is a bool column, so each row costs a
+few bytes of integer codes instead of three Python strings.
+
+The table tab also searches and sorts over the snapshot: a search index of the
+distinct node and path names and a full row order per sort column are built on
+first use and kept with it, so a page is a mask over a cached order.
+
+A snapshot is immutable once built and carries a process-wide increasing
+`version`, so one instance can be shared read-only by every browser session.
+When it merges several Prometheus instances, a `source` column tags each row
+and `source_errors` names the instances that could not be reached.
+"""
+
+import copy
+import itertools
+import time
+from array import array
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["nfs_server", "nfs_client", "mount_path", "accessible"]
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+_versions = itertools.count(1)
+
+
+def _encode(values, sort=True):
+    """Integer codes plus a sorted dictionary for a sequence of labels"""
+    codes, uniques = pd.factorize(pd.Index(values, dtype=object), sort=sort)
+    return codes, pd.CategoricalDtype(uniques)
+
+
+def _compact_frame(servers, clients, paths, accessible):
+    """Build the compact mount table from parallel label sequences"""
+    n = len(servers)
+    # Servers and clients share one node dictionary, so their codes are comparable
+    node_codes, node_dtype = _encode(list(servers) + list(clients))
+    path_codes, path_dtype = _encode(paths)
+    return pd.DataFrame({
+        "nfs_server": pd.Categorical.from_codes(node_codes[:n], dtype=node_dtype),
+        "nfs_client": pd.Categorical.from_codes(node_codes[n:], dtype=node_dtype),
+        "mount_path": pd.Categorical.from_codes(path_codes, dtype=path_dtype),
+        "accessible": np.asarray(accessible, dtype=bool),
+    })
+
+
+def _sorted_dictionary(dictionary):
+    """Sorted categorical dtype for an insertion-ordered {label: code} dictionary,
+    plus the array mapping insertion codes to codes in that dtype"""
+    labels = np.array(list(dictionary), dtype=object)
+    order = np.argsort(labels, kind="stable")
+    remap = np.empty(len(order), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return pd.CategoricalDtype(labels[order]), remap
+
+
+def _recode(codes, dtype, remap):
+    codes = np.frombuffer(codes, dtype=np.int64) if len(codes) else np.empty(0, dtype=np.int64)
+    return pd.Categorical.from_codes(remap[codes], dtype=dtype)
+
+
+def mounts_from_series(series, mapping, source_label=None):
+    """Compact mount table from instant vector series, consumed one at a time
+
+    Labels are dictionary-encoded into integer code buffers as each series is
+    read, so `series` can be a stream and no per-row records are kept. With
+    `source_label`, that label becomes a categorical `source` column.
+    """
+    server_label, client_label, path_label = (
+        mapping["server_label"], mapping["client_label"], mapping["path_label"]
+    )
+    nodes, paths, sources = {}, {}, {}
+    servers, clients, mount_paths, source_codes = array("q"), array("q"), array("q"), array("q")
+    accessible = bytearray()
+    for item in series:
+        metric = item["metric"]
+        servers.append(nodes.setdefault(metric[server_label], len(nodes)))
+        clients.append(nodes.setdefault(metric[client_label], len(nodes)))
+        mount_paths.append(paths.setdefault(metric[path_label], len(paths)))
+        accessible.append(float(item["value"][1]) == 1)
+        if source_label is not None:
+            source_codes.append(sources.setdefault(metric.get(source_label), len(sources)))
+
+    # Servers and clients share one sorted node dictionary
+    node_dtype, node_remap = _sorted_dictionary(nodes)
+    path_dtype, path_remap = _sorted_dictionary(paths)
+    df = pd.DataFrame({
+        "nfs_server": _recode(servers, node_dtype, node_remap),
+        "nfs_client": _recode(clients, node_dtype, node_remap),
+        "mount_path": _recode(mount_paths, path_dtype, path_remap),
+        "accessible": np.frombuffer(bytes(accessible), dtype=bool),
+    })
+    if source_label is not None:
+        df["source"] = _recode(source_codes, pd.CategoricalDtype(list(sources)), np.arange(len(sources)))
+    return df
+
+
+def mounts_from_result(result, mapping):
+    """Compact mount table from an already parsed instant query response"""
+    return mounts_from_series(result["data"]["result"], mapping)
+
+
+def concat_mounts(frames):
+    """Merge compact mount tables from several Prometheus instances
+
+    `frames` maps each instance label to its table. The node and path
+    dictionaries are unioned so the codes stay comparable, and a categorical
+    `source` column records which instance each row came from.
+    """
+    frames = {label: frame for label, frame in frames.items() if not frame.empty}
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS + ["source"])
+    node_dtype = pd.CategoricalDtype(sorted(set().union(*(f["nfs_server"].cat.categories for f in frames.values()))))
+    path_dtype = pd.CategoricalDtype(sorted(set().union(*(f["mount_path"].cat.categories for f in frames.values()))))
+    parts = [
+        pd.DataFrame({
+            "nfs_server": frame["nfs_server"].cat.set_categories(node_dtype.categories),
+            "nfs_client": frame["nfs_client"].cat.set_categories(node_dtype.categories),
+            "mount_path": frame["mount_path"].cat.set_categories(path_dtype.categories),
+            "accessible": frame["accessible"].to_numpy(dtype=bool),
+        })
+        for frame in frames.values()
+    ]
+    df = pd.concat(parts, ignore_index=True)
+    lengths = [len(frame) for frame in frames.values()]
+    df["source"] = pd.Categorical.from_codes(np.repeat(np.arange(len(frames)), lengths),
+                                             dtype=pd.CategoricalDtype(list(frames)))
+    return df
+
+
+def compact_mounts(df):
+    """Convert a mount table with string columns to the compact layout"""
+    if df.empty:
+        return df
+    return _compact_frame(
+        df["nfs_server"].tolist(),
+        df["nfs_client"].tolist(),
+        df["mount_path"].tolist(),
+        df["accessible"].to_numpy(dtype=bool),
+    )
+
+
+class MountSnapshot:
+    """Mount table plus server/client/path adjacency indexes and status masks
+
+    Treat every attribute as read-only: snapshots are shared between sessions.
+    """
+
+    def __init__(self, df, created_at=None, source_errors=None):
+        self.version = next(_versions)
+        # When the data was collected, which may be earlier than when it was indexed
+        self.created_at = time.time() if created_at is None else created_at
+        # {instance label: error} for instances missing from a federated snapshot;
+        # fetchers attach it to the frame as df.attrs["source_errors"]
+        if source_errors is None and df is not None:
+            source_errors = df.attrs.get("source_errors")
+        self.source_errors = dict(source_errors or {})
+        if df is None or df.empty:
+            df = pd.DataFrame(columns=COLUMNS)
+        self.df = df.reset_index(drop=True)
+
+        accessible = self.df["accessible"].to_numpy(dtype=bool) if len(self.df) else np.empty(0, dtype=bool)
+        self.status_masks = {"accessible": accessible, "inaccessible": ~accessible}
+        for mask in self.status_masks.values():
+            mask.setflags(write=False)
+
+        # Row positions per key; groupby().indices builds all of them in one pass
+        self.server_rows = self._indices(["nfs_server"])
+        self.client_rows = self._indices(["nfs_client"])
+        self.path_rows = self._indices(["nfs_server", "mount_path"])
+
+        # Adjacency: server -> clients, client -> servers, server -> paths
+        self.server_clients = self._unique_by("nfs_server", "nfs_client")
+        self.client_servers = self._unique_by("nfs_client", "nfs_server")
+        self.server_paths = self._unique_by("nfs_server", "mount_path")
+
+        self.servers = sorted(self.server_rows)
+        self.clients = sorted(self.client_rows)
+
+        # Built on first use by the table tab, then shared like the indexes above
+        self._search_index = None
+        self._orders = {}
+
+    def _indices(self, keys):
+        if not len(self.df):
+            return {}
+        indices = self.df.groupby(keys, sort=True, observed=True).indices
+        if len(keys) == 1:
+            return indices
+        return {tuple(key): rows for key, rows in indices.items()}
+
+    def _unique_by(self, key, value):
+        if not len(self.df):
+            return {}
+        pairs = self.df[[key, value]].drop_duplicates().sort_values([key, value])
+        return {k: group.tolist() for k, group in pairs.groupby(key, sort=True, observed=True)[value]}
+
+    def refreshed(self, created_at=None):
+        """This snapshot re-stamped as collected at `created_at`, for a refresh that changed nothing
+
+        The version and indexes are shared, so anything keyed on them stays valid.
+        """
+        snapshot = copy.copy(self)
+        snapshot.created_at = time.time() if created_at is None else created_at
+        return snapshot
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def nodes(self):
+        """Every node appearing as a server or a client"""
+        return sorted(set(self.server_rows) | set(self.client_rows))
+
+    def paths_for(self, servers):
+        """Sorted mount paths exported by any of `servers`"""
+        paths = set()
+        for server in servers:
+            paths.update(self.server_paths.get(server, ()))
+        return sorted(paths)
+
+    def neighbors(self, nodes):
+        """The given nodes plus every node sharing a mount with one of them"""
+        result = set(nodes)
+        for node in nodes:
+            result.update(self.server_clients.get(node, ()))
+            result.update(self.client_servers.get(node, ()))
+        return sorted(result)
+
+    def _union(self, index, keys):
+        arrays = [index[key] for key in keys if key in index]
+        if not arrays:
+            return _EMPTY
+        return np.unique(np.concatenate(arrays))
+
+    def _search_names(self):
+        """Lower-cased distinct server, client and path names, plus per column the
+        name id of every row"""
+        if self._search_index is None:
+            ids_by_name = {}
+            row_ids = []
+            for column in COLUMNS[:3]:
+                codes, uniques = pd.factorize(self.df[column])
+                ids = np.array([ids_by_name.setdefault(str(name).lower(), len(ids_by_name)) for name in uniques],
+                               dtype=np.int32)
+                row_ids.append(ids[codes])
+            self._search_index = (np.array(list(ids_by_name), dtype=str), row_ids)
+        return self._search_index
+
+    def search(self, text):
+        """Row positions whose server, client or mount path contains every word of `text`
+
+        Matching is case-insensitive; each word is matched once per distinct
+        name and mapped back to rows through the name ids.
+        """
+        names, row_ids = self._search_names()
+        selected = np.ones(len(self.df), dtype=bool)
+        for word in text.lower().split():
+            matched = np.char.find(names, word) >= 0
+            selected &= matched[row_ids[0]] | matched[row_ids[1]] | matched[row_ids[2]]
+        return np.flatnonzero(selected)
+
+    def order(self, column, descending=False):
+        """Every row position sorted by `column`, ties broken by server, client and path"""
+        key = (column, descending)
+        if key not in self._orders:
+            ranks = {name: pd.factorize(self.df[name], sort=True)[0] for name in [column] + COLUMNS[:3]}
+            primary = -ranks[column] if descending else ranks[column]
+            order = np.lexsort([ranks["mount_path"], ranks["nfs_client"], ranks["nfs_server"], primary])
+            order.setflags(write=False)
+            self._orders[key] = order
+        return self._orders[key]
+
+    def sorted_rows(self, positions, column, descending=False):
+        """`positions` (None for every row) in the order of `column`"""
+        order = self.order(column, descending)
+        if positions is None:
+            return order
+        selected = np.zeros(len(self.df), dtype=bool)
+        selected[positions] = True
+        return order[selected[order]]
+
+    def rows(self, servers=None, clients=None, paths=None, status=None, touching=None, search=None):
+        """Row positions matching every given filter (None means no filter)
+
+        `paths` only applies together with `servers`, matching the table tab.
+        `status` is "accessible" or "inaccessible"; `touching` keeps rows where
+        either end of the mount is one of the given nodes; `search` is text
+        matched against node and path names.
+        """
+        selected = None
+
+        def narrow(positions):
+            return positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+
+        if servers:
+            if paths:
+                selected = narrow(self._union(self.path_rows, [(s, p) for s in servers for p in paths]))
+            else:
+                selected = narrow(self._union(self.server_rows, servers))
+        if clients:
+            selected = narrow(self._union(self.client_rows, clients))
+        if touching:
+            selected = narrow(np.union1d(self._union(self.server_rows, touching),
+                                         self._union(self.client_rows, touching)))
+        if search and search.strip():
+            selected = narrow(self.search(search))
+        if status is not None:
+            mask = self.status_masks[status]
+            selected = np.flatnonzero(mask) if selected is None else selected[mask[selected]]
+        return selected
+
+    def select(self, **filters):
+        """DataFrame of the matching rows; the full frame itself when nothing is filtered"""
+        positions = self.rows(**filters)
+        if positions is None:
+            return self.df
+        return self.df.take(positions)
@@ -0,0 +1,165 @@
+"""
+Mount state transitions between consecutive snapshots
+
+Each refresh is diffed against the previous mount table with one keyed outer
+join on (source, server, client, mount_path). The resulting events (a mount
+newly failing, recovering, appearing or disappearing) are appended to a bounded
+ring buffer that is persisted to `<cache_dir>/transitions/` so the app and a
+separate collector process read the same log.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from nfs_mount_visualizer import prometheus
+from nfs_mount_visualizer.utils import atomic_write
+
+KEYS = ["nfs_server", "nfs_client", "mount_path"]
+EVENTS = ["failed", "recovered", "appeared", "disappeared"]
+COLUMNS = ["time", "source", "nfs_server", "nfs_client", "mount_path", "event"]
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def _as_categorical(column):
+    return column if isinstance(column.dtype, pd.CategoricalDtype) else column.astype("category")
+
+
+def diff_mounts(old, new):
+    """Transitions from the mount table `old` to `new`, one row per changed mount
+
+    Returns a frame with the key columns and an `event` column. Key columns are
+    brought to shared categories first so the join compares integer codes.
+    """
+    keys = (["source"] if "source" in old and "source" in new else []) + KEYS
+    left, right = {}, {}
+    for key in keys:
+        old_column, new_column = _as_categorical(old[key]), _as_categorical(new[key])
+        categories = old_column.cat.categories.union(new_column.cat.categories)
+        left[key] = old_column.cat.set_categories(categories)
+        right[key] = new_column.cat.set_categories(categories)
+    left = pd.DataFrame(dict(left, accessible=old["accessible"].to_numpy(dtype=bool)))
+    right = pd.DataFrame(dict(right, accessible=new["accessible"].to_numpy(dtype=bool)))
+
+    merged = left.merge(right, on=keys, how="outer", suffixes=("_old", "_new"), indicator=True)
+    both = (merged["_merge"] == "both").to_numpy()
+    was = merged["accessible_old"].to_numpy(dtype=bool, na_value=False)
+    now = merged["accessible_new"].to_numpy(dtype=bool, na_value=False)
+    event = np.select(
+        [both & was & ~now, both & ~was & now, (merged["_merge"] == "right_only").to_numpy(),
+         (merged["_merge"] == "left_only").to_numpy()],
+        EVENTS,
+        default=""
+    )
+    changed = event != ""
+    result = merged.loc[changed, keys].reset_index(drop=True)
+    result["event"] = pd.Categorical(event[changed], categories=EVENTS)
+    return result
+
+
+def log_name(config, demo_mode=False):
+    """File name of the transition log for this data source"""
+    if demo_mode:
+        return "demo"
+    source = json.dumps([prometheus.source_key(config["prometheus_url"]), config["metric_name"]])
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
+
+class TransitionLog:
+    """Bounded, persisted log of mount state transitions
+
+    `update` is called with every new mount table; the previous one is kept in
+    memory as the baseline, so the first table after a restart only sets it.
+    """
+
+    def __init__(self, path, max_events=10000):
+        self.path = path
+        self.events = deque(maxlen=max_events)
+        self._baseline = None
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _reload(self):
+        """Re-read the file if another process (the collector) has rewritten it"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                events = json.load(f)["events"]
+        except (OSError, ValueError, KeyError):
+            return
+        self.events.clear()
+        self.events.extend(tuple(event) for event in events)
+        self._mtime = mtime
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        payload = json.dumps({"events": list(self.events)}).encode("utf-8")
+        atomic_write(self.path, lambda f: f.write(payload))
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def update(self, df, created_at, skip_sources=()):
+        """Diff `df` against the previous table, log and return the transitions
+
+        Rows of `skip_sources` (instances that could not be queried) are left
+        out on both sides, so an unreachable site does not look like all of its
+        mounts disappeared. Their previous rows stay in the baseline, so the
+        site coming back does not look like all of its mounts appeared.
+        """
+        if skip_sources and "source" in df:
+            df = df[~df["source"].isin(list(skip_sources))]
+        with self._lock:
+            baseline = self._baseline
+            if baseline is None:
+                self._baseline = df
+                return pd.DataFrame(columns=KEYS + ["event"])
+            if skip_sources and "source" in baseline:
+                skipped = baseline["source"].isin(list(skip_sources))
+                self._baseline = pd.concat([df, baseline[skipped]], ignore_index=True)
+                baseline = baseline[~skipped]
+            else:
+                self._baseline = df
+            changes = diff_mounts(baseline, df)
+            if len(changes):
+                self._reload()
+                sources = changes["source"].astype(object) if "source" in changes else [None] * len(changes)
+                self.events.extend(zip(
+                    [created_at] * len(changes),
+                    sources,
+                    *(changes[column].astype(object) for column in KEYS + ["event"]),
+                ))
+                self._save()
+            return changes
+
+    def recent(self, limit=None):
+        """Logged transitions as a frame, newest first"""
+        with self._lock:
+            self._reload()
+            events = list(self.events)
+        events.reverse()
+        if limit is not None:
+            events = events[:limit]
+        return pd.DataFrame(events, columns=COLUMNS)
+
+
+def transition_log(config, demo_mode=False):
+    """Process-wide transition log for this data source"""
+    path = os.path.join(config["cache_dir"], "transitions", f"{log_name(config, demo_mode)}.json")
+    max_events = config.get("transitions", {}).get("max_events", 10000)
+    with _logs_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = _logs[path] = TransitionLog(path, max_events)
+        return log
@@ -18,11 +18,13 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.9",
     install_requires=[
-        "streamlit>=1.0.0",
+        "streamlit>=1.55.0",
         "pandas>=1.0.0",
-        "pyvis>=0.1.9",
+        "numpy>=1.20",
+        "altair>=4.0",
+        "pyvis>=0.3.2",
         "requests>=2.25.0",
         "pyyaml>=5.1",
     ],
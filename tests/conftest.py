@@ -0,0 +1,70 @@
+"""
+Shared fixtures: a local stand-in for the Prometheus HTTP API
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from nfs_mount_visualizer import prometheus
+
+
+class FakePrometheus:
+    """Minimal Prometheus API server that counts connections and requests"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        # Callable (endpoint, params) -> (status, body); replaced by tests
+        self.respond = lambda endpoint, params: (200, {"status": "success", "data": {"resultType": "vector", "result": []}})
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with fake.lock:
+                    fake.connections += 1
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                endpoint = parsed.path.rsplit("/", 1)[-1]
+                with fake.lock:
+                    fake.requests.append({"endpoint": endpoint, "params": params, "headers": dict(self.headers)})
+                status, body = fake.respond(endpoint, params)
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_prometheus():
+    server = FakePrometheus().start()
+    prometheus.close_sessions()
+    yield server
+    prometheus.close_sessions()
+    server.stop()
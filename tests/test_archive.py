@@ -0,0 +1,96 @@
+"""
+Tests for the long-retention SQLite archive
+"""
+import pandas as pd
+import pytest
+from nfs_mount_visualizer.archive import DAY, HOUR, MountArchive
+from nfs_mount_visualizer.snapshot import compact_mounts
+
+def _mounts(states):
+    return compact_mounts(pd.DataFrame(
+        [("storage1", client, "data", accessible) for client, accessible in states.items()],
+        columns=["nfs_server", "nfs_client", "mount_path", "accessible"]
+    ))
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MountArchive(str(tmp_path / "archive" / "mounts.sqlite"), max_gap=600)
+    yield archive
+    archive.close()
+
+def _uptime(archive, start, end, **kwargs):
+    df = archive.uptime(start, end, **kwargs)
+    return {row.nfs_client: (round(row.uptime, 3), row.observed_hours) for row in df.itertuples()}
+
+def test_uptime_rollups(archive):
+    """Test uptime agrees between raw intervals and hourly and daily rollups"""
+    base = 10 * DAY
+    archive.record(_mounts({"node1": True, "node2": True}), base)
+    archive.record(_mounts({"node1": True, "node2": False}), base + 300)
+    archive.record(_mounts({"node1": True, "node2": False}), base + 600)
+    archive.record(_mounts({"node1": True, "node2": True}), base + 900)
+
+    # node2 was seen down for the second and third of three 5 minute intervals
+    assert _uptime(archive, base, base + HOUR) == {"node2": (33.333, 0.25), "node1": (100.0, 0.25)}
+    # Daily reads include the hours not yet rolled up, and agree once they are
+    assert _uptime(archive, base, base + 30 * DAY) == _uptime(archive, base, base + HOUR)
+    archive.record(_mounts({"node1": True, "node2": True}), base + HOUR)
+    assert _uptime(archive, base, base + 30 * DAY) == _uptime(archive, base, base + HOUR)
+    assert archive.timeline("storage1", "node2", base, base + 30 * DAY)["bucket"].tolist() == [base]
+    assert _uptime(archive, base, base + HOUR, clients=["node1"]) == {"node1": (100.0, 0.25)}
+
+    events = archive.events(base, base + HOUR)
+    assert events[["nfs_client", "state"]].values.tolist() == [
+        ["node1", 1], ["node2", 1], ["node2", 0], ["node2", 1]
+    ]
+
+def test_intervals_split_at_bucket_boundaries(archive):
+    """Test an interval spanning a bucket boundary is split between the buckets"""
+    start = 10 * DAY - 120
+    archive.record(_mounts({"node1": False}), start)
+    archive.record(_mounts({"node1": False}), start + 300)
+    timeline = archive.timeline("storage1", "node1", start - HOUR, start + HOUR, resolution=HOUR)
+    assert timeline["observed_seconds"].tolist() == [120, 180]
+    assert archive.coverage() == (10 * DAY - HOUR, 10 * DAY + HOUR)
+
+def test_gaps_are_not_counted(archive):
+    """Test intervals longer than max_gap are not credited"""
+    archive.record(_mounts({"node1": True}), 0)
+    archive.record(_mounts({"node1": False}), 5000)
+    assert archive.uptime(0, DAY).empty
+
+def test_disappeared_and_restart(tmp_path, archive):
+    """Test a reopened archive marks missing mounts gone and continues crediting"""
+    archive.record(_mounts({"node1": True, "node2": True}), 0)
+    archive.record(_mounts({"node1": True}), 300)
+    archive.close()
+
+    reopened = MountArchive(archive.path, max_gap=600)
+    reopened.record(_mounts({"node1": True}), 600)
+    events = reopened.events(0, DAY)
+    assert events["nfs_client"].tolist() == ["node1", "node2", "node2"]
+    assert events["state"].tolist()[:2] == [1, 1] and events["state"].isna().tolist() == [False, False, True]
+    # The reopened archive continues crediting from the last record
+    # node2 was not seen again, so its last interval is not credited
+    assert _uptime(reopened, 0, HOUR) == {"node1": (100.0, 600 / HOUR)}
+    reopened.close()
+
+def test_unreachable_source_is_not_marked_gone(archive):
+    """Test mounts of an unreachable source are not marked gone"""
+    both = pd.concat([_mounts({"node1": True}).assign(source="a"), _mounts({"node1": True}).assign(source="b")],
+                     ignore_index=True)
+    archive.record(both, 0)
+    archive.record(_mounts({"node1": True}).assign(source="a"), 300, skip_sources={"b": "timeout"})
+    assert archive.events(0, DAY)["state"].tolist() == [1, 1]
+
+def test_archives_are_separate_per_prometheus(tmp_path):
+    """Test switching Prometheus opens another archive instead of mixing the clusters"""
+    from nfs_mount_visualizer.archive import mount_archive
+    config = {"cache_dir": str(tmp_path), "metric_name": "nfs_mount_accessible", "refresh_interval": 300,
+              "prometheus_url": "http://prom-a:9090"}
+    first = mount_archive(config)
+    first.record(_mounts({"node1": True}), 0)
+    other = mount_archive(dict(config, prometheus_url="http://prom-b:9090"))
+    assert other is not first and other.path != first.path
+    assert other.events(0, DAY).empty and len(first.events(0, DAY)) == 1
+    assert mount_archive(dict(config)) is first
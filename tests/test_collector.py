@@ -0,0 +1,145 @@
+"""
+Tests for the background snapshot collector
+"""
+import os
+import time
+import pandas as pd
+import pytest
+from nfs_mount_visualizer import app
+from nfs_mount_visualizer.collector import Collector, collect_once, read_snapshot, snapshot_path, write_snapshot
+from nfs_mount_visualizer.config import load_config
+from nfs_mount_visualizer.snapshot import compact_mounts
+
+@pytest.fixture
+def mounts():
+    return pd.DataFrame([
+        {"nfs_server": "storage1", "nfs_client": "node1", "mount_path": "data", "accessible": True},
+        {"nfs_server": "storage1", "nfs_client": "node2", "mount_path": "home", "accessible": False},
+    ])
+
+@pytest.fixture
+def config(tmp_path, fake_prometheus):
+    config = load_config()
+    config.update({"cache_dir": str(tmp_path), "prometheus_url": fake_prometheus.url,
+                   "prometheus_client": {"retries": 0}})
+    result = [
+        {"metric": {"source_node": "storage1", "target_node": "node1", "mount_path": "data"}, "value": [0, "1"]},
+        {"metric": {"source_node": "storage1", "target_node": "node2", "mount_path": "home"}, "value": [0, "0"]},
+    ]
+    fake_prometheus.respond = lambda endpoint, params: (200, {"status": "success", "data": {"resultType": "vector", "result": result}})
+    return config
+
+def _plain(df):
+    return df.astype({"nfs_server": object, "nfs_client": object, "mount_path": object})
+
+@pytest.mark.parametrize("layout", ["strings", "compact", "empty"])
+def test_snapshot_round_trip(tmp_path, mounts, layout):
+    """Test a mount table written as the latest snapshot reads back unchanged"""
+    df = {"strings": mounts, "compact": compact_mounts(mounts), "empty": pd.DataFrame()}[layout]
+    path = snapshot_path(str(tmp_path))
+    write_snapshot(path, df, 1700000000.5)
+
+    loaded, created_at = read_snapshot(path)
+    assert created_at == 1700000000.5
+    assert loaded["nfs_server"].dtype == loaded["nfs_client"].dtype
+    if layout == "empty":
+        assert loaded.empty
+    else:
+        pd.testing.assert_frame_equal(_plain(loaded), _plain(mounts))
+
+def test_read_missing_snapshot(tmp_path):
+    """Test reading a snapshot that was never written returns None"""
+    assert read_snapshot(snapshot_path(str(tmp_path))) is None
+
+def test_collect_once_writes_snapshot(config, mounts):
+    """Test one collection writes the queried mounts as the latest snapshot"""
+    collect_once(config)
+    loaded, created_at = read_snapshot(snapshot_path(config["cache_dir"]))
+    pd.testing.assert_frame_equal(_plain(loaded), _plain(mounts))
+    assert abs(created_at - time.time()) < 60
+
+def test_failed_collection_keeps_previous_snapshot(config, fake_prometheus):
+    """Test a failed collection records the error and keeps the previous snapshot"""
+    collector = Collector(config)
+    assert collector.run_once()
+    fake_prometheus.respond = lambda endpoint, params: (400, {"status": "error", "error": "bad query"})
+    assert not collector.run_once()
+    assert collector.last_error and read_snapshot(snapshot_path(config["cache_dir"])) is not None
+
+def test_collector_thread_polls(config, fake_prometheus):
+    """Test the collector thread polls Prometheus until stopped"""
+    collector = Collector(config, interval=0.05).start()
+    try:
+        deadline = time.time() + 5
+        while len(fake_prometheus.requests) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        collector.stop(timeout=5)
+    assert len(fake_prometheus.requests) >= 2
+    assert os.path.exists(snapshot_path(config["cache_dir"]))
+
+def test_app_reads_collected_snapshot(config, fake_prometheus, monkeypatch):
+    """Test the app reads the collected snapshot instead of querying Prometheus"""
+    monkeypatch.setattr(app, "snapshot_cache", app.ResultCache(max_entries=4))
+    config["collector"] = {"enabled": True, "run_in_app": False}
+    collect_once(config)
+    requests_before = len(fake_prometheus.requests)
+
+    snapshot = app.get_snapshot(config)
+    assert snapshot.servers == ["storage1"] and len(snapshot) == 2
+    # Re-read only when the file changes, and never query Prometheus from the UI
+    assert app.get_snapshot(config) is snapshot
+    assert len(fake_prometheus.requests) == requests_before
+
+def test_federated_query_merges_sources(config, fake_prometheus):
+    """Test federated instances are merged with a source column and late ones are listed as errors"""
+    from tests.conftest import FakePrometheus
+    from nfs_mount_visualizer.collector import query_mounts
+
+    other, slow = FakePrometheus().start(), FakePrometheus().start()
+    other.respond = lambda endpoint, params: (200, {"status": "success", "data": {"resultType": "vector", "result": [
+        {"metric": {"source_node": "nas1", "target_node": "node1", "mount_path": "scratch"}, "value": [0, "0"]},
+    ]}})
+    slow.respond = lambda endpoint, params: time.sleep(2) or (200, {"status": "success", "data": {"result": []}})
+    config["prometheus_url"] = [
+        {"url": fake_prometheus.url, "label": "site-a"},
+        {"url": other.url, "label": "site-b"},
+        {"url": slow.url, "label": "site-c", "instance_deadline": 0.3},
+    ]
+    try:
+        started = time.monotonic()
+        df = query_mounts(config)
+        assert time.monotonic() - started < 1.5
+    finally:
+        other.stop()
+        slow.stop()
+
+    assert df["nfs_server"].dtype == df["nfs_client"].dtype
+    assert df.astype(object).values.tolist() == [
+        ["storage1", "node1", "data", True, "site-a"],
+        ["storage1", "node2", "home", False, "site-a"],
+        ["nas1", "node1", "scratch", False, "site-b"],
+    ]
+    assert list(df.attrs["source_errors"]) == ["site-c"]
+
+    # The source column and the missing instances survive the snapshot file
+    path = snapshot_path(config["cache_dir"])
+    write_snapshot(path, df, 1700000000.0)
+    loaded, _ = read_snapshot(path)
+    assert loaded["source"].tolist() == ["site-a", "site-a", "site-b"]
+    assert app.MountSnapshot(loaded).source_errors == df.attrs["source_errors"]
+
+def test_collector_logs_transitions(config, fake_prometheus, monkeypatch):
+    """Test the collector logs transitions that a fresh log in the app reads back"""
+    from nfs_mount_visualizer import transitions
+    monkeypatch.setattr(transitions, "_logs", {})
+    collect_once(config)
+    fake_prometheus.respond = lambda endpoint, params: (200, {"status": "success", "data": {"result": [
+        {"metric": {"source_node": "storage1", "target_node": "node1", "mount_path": "data"}, "value": [0, "0"]},
+    ]}})
+    collect_once(config)
+
+    # A fresh log object (as in the app process) reads the events from cache_dir
+    monkeypatch.setattr(transitions, "_logs", {})
+    events = transitions.transition_log(config).recent()
+    assert sorted(events["event"]) == ["disappeared", "failed"]
@@ -73,4 +73,33 @@ def test_invalid_file():
         # Should fall back to defaults
         assert config["prometheus_url"] == "http://localhost:9090"
     finally:
-        os.unlink(temp_name)
\ No newline at end of file
+        os.unlink(temp_name)
+
+def test_config_memoized_by_mtime(tmp_path, monkeypatch):
+    """The file is parsed once per version; callers get their own copy"""
+    from nfs_mount_visualizer import config as config_module
+    path = tmp_path / "config.yaml"
+    cache_dir = "cache_dir: " + str(tmp_path / "cache") + "\n"
+    path.write_text("refresh_interval: 60\n" + cache_dir)
+    reads = []
+    read_config = config_module._read_config
+    monkeypatch.setattr(config_module, "_read_config", lambda *args: reads.append(1) or read_config(*args))
+
+    first = config_module.load_config(str(path))
+    first["refresh_interval"] = 1
+    assert config_module.load_config(str(path))["refresh_interval"] == 60
+    assert len(reads) == 1
+
+    path.write_text("refresh_interval: 120\n" + cache_dir)
+    os.utime(path, ns=(0, 10**9))
+    assert config_module.load_config(str(path))["refresh_interval"] == 120
+    assert len(reads) == 2
+
+    # Problems are reported on every call, not only when the file is parsed;
+    # the defaults used instead put the cache under the working directory
+    monkeypatch.chdir(tmp_path)
+    path.write_text("refresh_interval: [")
+    problems = []
+    for _ in range(2):
+        config_module.load_config(str(path), report=lambda level, message: problems.append(level))
+    assert problems == ["error", "error"] and len(reads) == 3
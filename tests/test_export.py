@@ -0,0 +1,98 @@
+"""
+Tests for the headless export command
+"""
+import csv
+import io
+import json
+import subprocess
+import sys
+import pytest
+from nfs_mount_visualizer.export import SOURCE_COLUMNS, export_mounts
+
+MAPPING = {"server_label": "source_node", "client_label": "target_node", "path_label": "mount_path"}
+
+RESULT = {"status": "success", "data": {"resultType": "vector", "result": [
+    {"metric": {"source_node": "storage1", "target_node": "node1", "mount_path": "data"}, "value": [0, "1"]},
+    {"metric": {"source_node": "storage1", "target_node": "node2", "mount_path": "home"}, "value": [0, "0"]},
+]}}
+
+HEAVY_MODULES = ["streamlit", "pyvis", "pandas", "numpy"]
+
+def test_export_jsonl():
+    """Test mounts are exported as one JSON object per line"""
+    out = io.StringIO()
+    assert export_mounts(RESULT["data"]["result"], MAPPING, "jsonl", out) == (2, 1)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert rows[1] == {"nfs_server": "storage1", "nfs_client": "node2", "mount_path": "home", "accessible": False}
+
+def test_export_csv():
+    """Test mounts are exported as CSV with a header row"""
+    out = io.StringIO()
+    assert export_mounts(RESULT["data"]["result"], MAPPING, "csv", out) == (2, 1)
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == ["nfs_server", "nfs_client", "mount_path", "accessible"]
+    assert rows[1] == ["storage1", "node1", "data", "True"]
+
+def test_export_with_sources(tmp_path):
+    """Test exports of federated results include the source column"""
+    series = [dict(item, metric=dict(item["metric"], source=site))
+              for item, site in zip(RESULT["data"]["result"], ["site-a", "site-b"])]
+    out = io.StringIO()
+    assert export_mounts(series, MAPPING, "csv", out, SOURCE_COLUMNS) == (2, 1)
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0][-1] == "source" and rows[2] == ["storage1", "node2", "home", "False", "site-b"]
+
+def test_export_parquet(tmp_path):
+    """Test mounts are exported as a Parquet file"""
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+    path = str(tmp_path / "mounts.parquet")
+    assert export_mounts(RESULT["data"]["result"], MAPPING, "parquet", path) == (2, 1)
+    df = pd.read_parquet(path)
+    assert df["accessible"].tolist() == [True, False]
+    assert df["nfs_client"].astype(str).tolist() == ["node1", "node2"]
+
+def _run_cli(args):
+    """Run the CLI in a subprocess and report which heavy modules it imported"""
+    script = (
+        "import sys\n"
+        "from nfs_mount_visualizer.cli import run\n"
+        f"sys.argv = ['nfs-mount-visualizer'] + {args!r}\n"
+        "try:\n"
+        "    run()\n"
+        "finally:\n"
+        f"    sys.stderr.write('HEAVY=' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    return subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+
+@pytest.fixture
+def config_path(tmp_path, fake_prometheus):
+    fake_prometheus.respond = lambda endpoint, params: (200, RESULT)
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"prometheus_url": fake_prometheus.url, "cache_dir": str(tmp_path / "cache")}))
+    return str(path)
+
+def test_cli_export_fail_on_inaccessible(config_path):
+    """Test --fail-on-inaccessible exits 2 without importing the UI or numeric stack"""
+    proc = _run_cli(["export", "--config", config_path, "--fail-on-inaccessible"])
+    assert proc.returncode == 2
+    assert len(proc.stdout.splitlines()) == 2
+    assert "1 of 2 mounts inaccessible" in proc.stderr
+    # Neither the UI nor the numeric stack is imported for a plain export
+    assert proc.stderr.endswith("HEAVY=")
+
+def test_cli_export_csv_to_file(config_path, tmp_path):
+    """Test the export writes CSV to the --output file"""
+    output = tmp_path / "mounts.csv"
+    proc = _run_cli(["export", "--config", config_path, "--format", "csv", "-o", str(output)])
+    assert proc.returncode == 0
+    assert output.read_text().splitlines()[0] == "nfs_server,nfs_client,mount_path,accessible"
+
+def test_cli_export_unreachable(tmp_path):
+    """Test the export exits 1 when Prometheus cannot be queried"""
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"prometheus_url": "http://127.0.0.1:9", "cache_dir": str(tmp_path),
+                                "prometheus_client": {"retries": 0, "timeout": 1}}))
+    proc = _run_cli(["export", "--config", str(path)])
+    assert proc.returncode == 1
+    assert "error:" in proc.stderr
@@ -0,0 +1,52 @@
+"""
+Tests for the cluster-wide heatmap matrix
+"""
+import numpy as np
+from nfs_mount_visualizer.heatmap import (
+    MISSING, build_heatmap, build_heatmap_from_result, build_heatmap_from_series, sort_rows, heatmap_image
+)
+
+MAPPING = {"server_label": "source_node", "client_label": "target_node", "path_label": "mount_path"}
+
+def _series(server, client, path, values, start=1000, step=60):
+    labels = {"source_node": server, "target_node": client, "mount_path": path}
+    return {"metric": labels, "values": [[start + i * step, str(v)] for i, v in enumerate(values)]}
+
+def test_matrix_from_result():
+    """Test samples land in their aligned bucket and gaps stay missing"""
+    result = {"data": {"result": [
+        _series("s1", "c1", "data", [1, 1, 0, 1]),
+        _series("s1", "c2", "data", [1, 1], start=1120),
+    ]}}
+    heatmap = build_heatmap_from_result(result, MAPPING, 1000, 60, 4)
+    assert heatmap["matrix"].dtype == np.uint8
+    assert heatmap["matrix"].tolist() == [[1, 1, 0, 1], [MISSING, MISSING, 1, 1]]
+    assert heatmap["client"].tolist() == ["c1", "c2"]
+
+def test_sort_by_failures():
+    """Test rows with the most failed buckets sort first"""
+    heatmap = build_heatmap(
+        [("s1", "a", "p"), ("s1", "b", "p"), ("s1", "c", "p")],
+        [np.arange(3), np.arange(3), np.arange(3)],
+        [np.array([1, 1, 1]), np.array([0, 0, 1]), np.array([0, 1, 1])],
+        0, 1, 3
+    )
+    assert sort_rows(heatmap, "failures").tolist() == [1, 2, 0]
+    assert sort_rows(heatmap, "client").tolist() == [0, 1, 2]
+
+def test_image_palette():
+    """Test the image maps states to configured colors"""
+    image = heatmap_image(np.array([[0, 1, MISSING]], dtype=np.uint8), "#00FF00", "#FF0000", "#000000", row_height=2)
+    assert image.shape == (2, 3, 3)
+    assert image[0].tolist() == [[255, 0, 0], [0, 255, 0], [0, 0, 0]]
+
+def test_series_split_across_shards_merge():
+    """Test a series streamed once per range shard becomes one row"""
+    series = iter([
+        _series("s1", "c1", "data", [1, 0]),
+        _series("s1", "c2", "data", [1]),
+        _series("s1", "c1", "data", [0, 1], start=1120),
+    ])
+    heatmap = build_heatmap_from_series(series, MAPPING, 1000, 60, 4)
+    assert heatmap["client"].tolist() == ["c1", "c2"]
+    assert heatmap["matrix"].tolist() == [[1, 0, 0, 1], [1, MISSING, MISSING, MISSING]]
@@ -0,0 +1,87 @@
+"""
+Tests for the incremental on-disk history store
+"""
+import os
+
+import numpy as np
+import pytest
+from nfs_mount_visualizer.history import HistoryStore
+
+NOW = 1_700_000_000 // 60 * 60
+LABELS = {"source_node": "storage1", "target_node": "node1", "mount_path": "data"}
+
+class RecordingFetch:
+    """Fetch callback serving a constant-accessible series and recording windows"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, start, end, step):
+        self.calls.append((start, end))
+        values = [[t, "0" if t % 600 == 0 else "1"] for t in range(start, end + 1, step)]
+        return {"status": "success", "data": {"result": [{"metric": LABELS, "values": values}]}}
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path), step=60, retention_hours=6, max_chunks=3)
+
+def test_only_delta_fetched(store):
+    """Test a second, later window only fetches the new tail"""
+    fetch = RecordingFetch()
+    store.query_range("up", NOW - 3600, NOW, fetch, now=NOW)
+    series = store.query_range("up", NOW - 3600 + 300, NOW + 300, fetch, now=NOW + 300)
+    assert fetch.calls == [(NOW - 3600, NOW), (NOW, NOW + 300)]
+    timestamps = series[0]["timestamps"]
+    assert timestamps[0] == NOW - 3600 + 300 and timestamps[-1] == NOW + 300
+    assert np.all(np.diff(timestamps) == 60)
+
+def test_narrower_window_served_from_disk(store):
+    """Test a window inside the stored range makes no request"""
+    fetch = RecordingFetch()
+    store.query_range("up", NOW - 3 * 3600, NOW, fetch, now=NOW)
+    series = store.query_range("up", NOW - 3600, NOW, fetch, now=NOW)
+    assert len(fetch.calls) == 1
+    assert series[0]["metric"] == LABELS
+    assert len(series[0]["timestamps"]) == 61
+    assert series[0]["values"].dtype == np.int8
+
+def test_failed_fetch_not_marked_covered(store):
+    """Test a failed fetch leaves the window missing so it is retried"""
+    assert store.query_range("up", NOW - 3600, NOW, lambda *args: None, now=NOW) == []
+    assert store.covered_range("up") is None
+
+def test_partial_fetch_not_marked_covered(store):
+    """Test a window with missing federated instances is served but fetched again"""
+    fetch = RecordingFetch()
+
+    def partial(start, end, step):
+        return dict(fetch(start, end, step), source_errors={"b": "timeout"})
+
+    series = store.query_range("up", NOW - 3600, NOW, partial, now=NOW)
+    assert len(series[0]["timestamps"]) == 61
+    assert store.covered_range("up") is None
+    store.query_range("up", NOW - 3600, NOW, fetch, now=NOW)
+    assert fetch.calls == [(NOW - 3600, NOW)] * 2
+    assert store.covered_range("up") == (NOW - 3600, NOW)
+
+def test_compaction_and_retention(store, tmp_path):
+    """Test chunks are merged past max_chunks and old data is evicted"""
+    fetch = RecordingFetch()
+    for i in range(5):
+        store.query_range("up", NOW - 600 + i * 60, NOW + i * 60, fetch, now=NOW + i * 60)
+    chunk_files = [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith(".npz")]
+    assert len(chunk_files) <= 3
+
+    later = NOW + 10 * 3600
+    store.query_range("up", later - 600, later, fetch, now=later)
+    start, end = store.covered_range("up")
+    assert start == later - 600 and end == later
+
+def test_stores_are_separate_per_prometheus(tmp_path):
+    """Test a store for another Prometheus does not serve the first one's samples"""
+    config = {"cache_dir": str(tmp_path), "history_store": {"step": 60}}
+    first = HistoryStore.from_config(dict(config, prometheus_url="http://prom-a:9090"))
+    first.query_range("up", NOW - 3600, NOW, RecordingFetch(), now=NOW)
+    other = HistoryStore.from_config(dict(config, prometheus_url="http://prom-b:9090"))
+    assert other.covered_range("up") is None
+    assert first.covered_range("up") == (NOW - 3600, NOW)
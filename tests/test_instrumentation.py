@@ -0,0 +1,105 @@
+"""
+Tests for the timing spans and their Prometheus metrics
+"""
+import urllib.error
+import urllib.request
+
+import pytest
+from nfs_mount_visualizer import instrumentation
+
+@pytest.fixture
+def recording():
+    instrumentation.reset()
+    instrumentation.configure({"enabled": True, "recent_spans": 3})
+    yield
+    instrumentation.configure({"enabled": False})
+    instrumentation.reset()
+
+def test_disabled_spans_record_nothing():
+    """Test spans are a shared no-op and record nothing while recording is off"""
+    instrumentation.reset()
+    with instrumentation.span("stage", rows=1) as span:
+        span.set(bytes=10)
+    assert span is instrumentation.span("other")
+    assert instrumentation.stage_summary() == {} and instrumentation.recent_spans() == []
+
+def test_spans_are_aggregated(recording):
+    """Test finished spans are aggregated per stage and rendered as Prometheus metrics"""
+    for rows in (10, 20):
+        with instrumentation.span("get_mount_accessibility") as span:
+            span.set(rows=rows, bytes=rows * 100)
+    with pytest.raises(ValueError):
+        with instrumentation.span("graph.build"):
+            raise ValueError("boom")
+
+    summary = instrumentation.stage_summary()
+    assert summary["get_mount_accessibility"]["count"] == 2
+    assert summary["get_mount_accessibility"]["totals"] == {"rows": 30, "bytes": 3000}
+    assert summary["get_mount_accessibility"]["last"] == {"rows": 20, "bytes": 2000}
+    assert summary["graph.build"]["errors"] == 1
+    assert [span["stage"] for span in instrumentation.recent_spans()] == [
+        "graph.build", "get_mount_accessibility", "get_mount_accessibility"
+    ]
+
+    metrics = instrumentation.render_metrics()
+    assert 'nfs_mount_visualizer_stage_duration_seconds_count{stage="get_mount_accessibility"} 2' in metrics
+    assert 'nfs_mount_visualizer_stage_duration_seconds_bucket{stage="graph.build",le="+Inf"} 1' in metrics
+    assert 'nfs_mount_visualizer_stage_rows_total{stage="get_mount_accessibility"} 30' in metrics
+    assert 'nfs_mount_visualizer_stage_errors_total{stage="graph.build"} 1' in metrics
+
+def test_metrics_endpoint(recording, monkeypatch):
+    """Test the metrics server serves /metrics, rejects other paths and is started once"""
+    monkeypatch.setattr(instrumentation, "_server", None)
+    server = instrumentation.start_metrics_server(0, "127.0.0.1")
+    try:
+        with instrumentation.span("render.render_table_tab", rows=5):
+            pass
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert 'stage="render.render_table_tab"' in response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+        # A second call reuses the running server
+        assert instrumentation.start_metrics_server(0, "127.0.0.1") is server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_prometheus_payload_sizes(recording, fake_prometheus):
+    """Test Prometheus requests record their response size in bytes"""
+    from nfs_mount_visualizer import prometheus
+    fake_prometheus.respond = lambda endpoint, params: (200, {"status": "success", "data": {
+        "resultType": "vector", "result": [{"metric": {"source_node": "a"}, "value": [0, "1"]}]}})
+    prometheus.instant_query(fake_prometheus.url, "up")
+    assert len(list(prometheus.stream_instant_query(fake_prometheus.url, "up"))) == 1
+
+    summary = instrumentation.stage_summary()
+    assert summary["prometheus.query"]["last"]["bytes"] == summary["prometheus.parse"]["last"]["bytes"] > 0
+    assert summary["prometheus.stream_query"]["last"]["bytes"] > 0
+
+def test_debug_panel_without_recent_spans(recording, monkeypatch):
+    """Test the debug panel shows a message instead of failing when no spans are kept"""
+    from nfs_mount_visualizer import app
+    with instrumentation.span("graph.build"):
+        pass
+    monkeypatch.setattr(instrumentation, "recent_spans", lambda limit=None: [])
+    infos = []
+    monkeypatch.setattr(app.st, "info", infos.append)
+    app.render_debug_panel({})
+    assert infos == ["No recent spans recorded"]
+
+def test_cache_counters_exported(monkeypatch):
+    """Test registered result caches export their hit, miss and entry counts"""
+    from nfs_mount_visualizer.utils import ResultCache
+    cache = ResultCache()
+    monkeypatch.setattr(instrumentation, "_caches", {})
+    instrumentation.register_cache("test", cache)
+    cache.get_or_fetch("a", 60, lambda: 1)
+    cache.get_or_fetch("a", 60, lambda: 1)
+
+    assert instrumentation.cache_stats()["test"]["hits"] == 1
+    metrics = instrumentation.render_metrics()
+    assert 'nfs_mount_visualizer_cache_hits_total{cache="test"} 1' in metrics
+    assert 'nfs_mount_visualizer_cache_misses_total{cache="test"} 1' in metrics
+    assert 'nfs_mount_visualizer_cache_entries{cache="test"} 1' in metrics
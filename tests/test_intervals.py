@@ -0,0 +1,34 @@
+"""
+Tests for the run-length outage interval representation
+"""
+import numpy as np
+from nfs_mount_visualizer.intervals import to_intervals, interval_stats
+
+def test_runs_collapsed():
+    """Test constant runs become single intervals covering [t, t + step)"""
+    intervals = to_intervals([0, 10, 20, 30, 40, 50], [1, 1, 0, 0, 1, 1], 10)
+    assert intervals["start"].tolist() == [0, 20, 40]
+    assert intervals["end"].tolist() == [20, 40, 60]
+    assert intervals["state"].tolist() == [1, 0, 1]
+
+def test_gaps_break_runs():
+    """Test missing samples split runs instead of being counted"""
+    intervals = to_intervals([0, 10, 50, 60], [1, 1, 1, 1], 10)
+    assert intervals["start"].tolist() == [0, 50]
+    assert interval_stats(intervals)["observed"] == 40
+
+def test_stats():
+    """Test uptime, outage count, MTTR and MTBF from intervals"""
+    values = np.array([1] * 8 + [0] * 2 + [1] * 6 + [0] * 4)
+    stats = interval_stats(to_intervals(np.arange(20) * 60, values, 60))
+    assert stats["uptime"] == 70.0
+    assert stats["outages"] == 2
+    assert stats["mttr"] == 180.0
+    assert stats["mtbf"] == 14 * 60 / 2
+
+def test_no_outages():
+    """Test MTTR/MTBF are undefined without outages"""
+    stats = interval_stats(to_intervals([0, 60], [1, 1], 60))
+    assert stats["uptime"] == 100.0
+    assert stats["mttr"] is None and stats["mtbf"] is None
+    assert interval_stats(to_intervals([], [], 60))["uptime"] is None
@@ -0,0 +1,49 @@
+"""
+Tests for the server-side graph layout
+"""
+import os
+
+from nfs_mount_visualizer.app import load_config, create_pyvis_network
+from nfs_mount_visualizer.layout import compute_layout, layered_layout, force_layout, layout_settings
+
+EDGES = [("node1", "storage1"), ("node2", "storage1"), ("node3", "node1")]
+NODES = ["storage1", "node1", "node2", "node3"]
+
+def test_layered_servers_above_clients():
+    """Test pure servers sit above nodes that both serve and mount, above pure clients"""
+    positions = layered_layout(NODES, EDGES, layout_settings())
+    assert positions["storage1"][1] < positions["node1"][1] < positions["node2"][1]
+    assert positions["node2"][1] == positions["node3"][1]
+
+def test_force_layout_pins_existing_nodes():
+    """Test pinned nodes keep their coordinates"""
+    pinned = {"storage1": (0.0, 0.0), "node1": (100.0, 0.0)}
+    positions = force_layout(NODES, EDGES, layout_settings({"iterations": 20}), pinned=pinned)
+    assert positions["storage1"] == (0.0, 0.0)
+    assert positions["node1"] == (100.0, 0.0)
+    assert positions["node3"] != positions["node2"]
+
+def test_layout_cached_and_reused(tmp_path):
+    """Test a topology is laid out once and known nodes keep positions when it grows"""
+    settings = {"engine": "force", "iterations": 20}
+    first = compute_layout(str(tmp_path), NODES, EDGES, settings)
+    assert compute_layout(str(tmp_path), NODES, EDGES, settings) == first
+    assert len([name for name in os.listdir(tmp_path / "layout") if name != "force-latest.json"]) == 1
+
+    grown = compute_layout(str(tmp_path), NODES + ["node4"], EDGES + [("node4", "storage1")], settings)
+    assert all(grown[node] == first[node] for node in NODES)
+
+def test_network_uses_fixed_positions(tmp_path):
+    """Test the network ships coordinates with physics disabled"""
+    config = load_config()
+    config["cache_dir"] = str(tmp_path)
+    config["cluster_nodes"] = NODES
+    config["visualization"]["layout"] = {"engine": "layered"}
+    import pandas as pd
+    df = pd.DataFrame([
+        {"nfs_server": server, "nfs_client": client, "mount_path": "data", "accessible": True}
+        for client, server in EDGES
+    ])
+    net = create_pyvis_network(df, config, show_all_nodes=True)
+    assert all("x" in node and "y" in node for node in net.nodes)
+    assert net.options.physics.enabled is False
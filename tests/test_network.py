@@ -0,0 +1,129 @@
+"""
+Tests for the network graph construction
+"""
+import pandas as pd
+import pytest
+from nfs_mount_visualizer import app
+from nfs_mount_visualizer.app import load_config, create_pyvis_network
+from nfs_mount_visualizer.snapshot import MountSnapshot, compact_mounts
+
+@pytest.fixture
+def config():
+    config = load_config()
+    config["cluster_nodes"] = ["storage1", "node1", "node2", "node3"]
+    return config
+
+@pytest.fixture(params=["strings", "compact"])
+def mounts(request):
+    df = pd.DataFrame([
+        {"nfs_server": "storage1", "nfs_client": "node1", "mount_path": "data", "accessible": True},
+        {"nfs_server": "storage1", "nfs_client": "node2", "mount_path": "data", "accessible": False},
+        {"nfs_server": "storage1", "nfs_client": "node2", "mount_path": "home", "accessible": True},
+        {"nfs_server": "node1", "nfs_client": "node3", "mount_path": "tmp", "accessible": True},
+    ])
+    return compact_mounts(df) if request.param == "compact" else df
+
+def test_all_nodes_counts(config, mounts):
+    """Test node sizes and tooltips reflect export and mount counts"""
+    net = create_pyvis_network(mounts, config, show_all_nodes=True)
+    nodes = {node["id"]: node for node in net.nodes}
+    assert list(nodes) == config["cluster_nodes"]
+    assert nodes["storage1"]["size"] == 25 + 2 * 3
+    assert "Exports: 2" in nodes["storage1"]["title"]
+    assert "Mounts: 2" in nodes["node2"]["title"]
+    assert len(net.edges) == 4
+
+def test_edges_colored_by_status(config, mounts):
+    """Test edges point client->server and are colored by accessibility"""
+    net = create_pyvis_network(mounts, config, show_all_nodes=True)
+    edges = {(e["from"], e["to"], e["label"]): e for e in net.edges}
+    failing = edges[("node2", "storage1", "data")]
+    assert failing["color"] == "#F44336"
+    assert failing["title"] == "Mount: node2 mounts storage1:/mnt/data<br>Status: ❌ Inaccessible"
+    assert edges[("node1", "storage1", "data")]["color"] == "#4CAF50"
+
+def test_focus_expansion(config, mounts):
+    """Test focus nodes pull in their direct neighbors only"""
+    net = create_pyvis_network(mounts, config, show_all_nodes=False, focus_nodes=["node3"])
+    nodes = {node["id"]: node for node in net.nodes}
+    assert set(nodes) == {"node1", "node3"}
+    assert nodes["node3"]["borderWidth"] == 3
+    assert nodes["node1"]["borderWidth"] == 1
+    assert [(e["from"], e["to"]) for e in net.edges] == [("node3", "node1")]
+
+def test_focus_neighbors_from_snapshot_index(config, mounts):
+    """Test the focus expansion uses neighbor nodes looked up in the snapshot"""
+    neighbors = MountSnapshot(mounts).neighbors(["node3"])
+    assert neighbors == ["node1", "node3"]
+    net = create_pyvis_network(mounts.iloc[0:0], config, focus_nodes=["node3"], neighbor_nodes=neighbors)
+    assert {node["id"] for node in net.nodes} == {"node1", "node3"}
+
+def test_html_memoized_by_view(config, mounts, monkeypatch):
+    """Test unchanged views reuse the rendered HTML and changed views rebuild it"""
+    builds = []
+    real_create = app.create_pyvis_network
+    monkeypatch.setattr(app, "create_pyvis_network", lambda *args: builds.append(args) or real_create(*args))
+    app.graph_html_cache.clear()
+
+    html = app.get_network_html(mounts, config, show_all_nodes=True)
+    assert "storage1" in html and "<html>" in html
+    assert app.get_network_html(mounts.copy(), config, show_all_nodes=True) is html
+    assert len(builds) == 1
+
+    changed = mounts.assign(accessible=False)
+    app.get_network_html(changed, config, show_all_nodes=True)
+    app.get_network_html(mounts, config, show_all_nodes=False, focus_nodes=["node3"])
+    assert len(builds) == 3
+    app.graph_html_cache.clear()
+
+def test_grouped_network_collapses_groups(config, mounts):
+    """Test collapsed groups become supernodes with aggregated edge counts"""
+    config["visualization"]["grouping"] = {"by": "regex", "pattern": r"^(?P<group>[a-z]+)"}
+    net = app.create_grouped_network(mounts, config, expanded_groups=[])
+    assert sorted(node["id"] for node in net.nodes) == ["group:node", "group:storage"]
+    labels = {node["id"]: node["label"] for node in net.nodes}
+    assert labels["group:node"] == "node (3)"
+    edges = {(e["from"], e["to"]): e for e in net.edges}
+    to_storage = edges[("group:node", "group:storage")]
+    assert to_storage["label"] == "3"
+    assert "❌ Inaccessible: 1" in to_storage["title"]
+    assert to_storage["color"] == "#F44336"
+    # node3 -> node1 stays inside the group: counted on the supernode, not drawn as a self-loop
+    assert ("group:node", "group:node") not in edges
+    titles = {node["id"]: node["title"] for node in net.nodes}
+    assert "Mounts within group: 1" in titles["group:node"]
+
+def test_grouped_network_empty_view(config, mounts):
+    """Test an empty filtered frame builds a grouped graph without edges"""
+    config["visualization"]["grouping"] = {"by": "regex", "pattern": r"^(?P<group>[a-z]+)"}
+    net = app.create_grouped_network(mounts.iloc[0:0], config, show_all_nodes=True, expanded_groups=[])
+    assert sorted(node["id"] for node in net.nodes) == ["group:node", "group:storage"]
+    assert net.edges == []
+
+def test_grouped_network_expands_on_demand(config, mounts):
+    """Test expanded groups show their members individually"""
+    config["visualization"]["grouping"] = {"by": "regex", "pattern": r"^(?P<group>[a-z]+)"}
+    net = app.create_grouped_network(mounts, config, expanded_groups=["node"])
+    assert sorted(node["id"] for node in net.nodes) == ["group:storage", "node1", "node2", "node3"]
+    assert {(e["from"], e["to"]) for e in net.edges} == {
+        ("node1", "group:storage"), ("node2", "group:storage"), ("node3", "node1")
+    }
+
+def test_merged_edges_one_per_pair(config, mounts):
+    """Test merged edges draw one edge per node pair with blended color and mount count"""
+    net = create_pyvis_network(mounts, config, show_all_nodes=True, merge_edges=True)
+    edges = {(e["from"], e["to"]): e for e in net.edges}
+    assert len(edges) == 3
+
+    pair = edges[("node2", "storage1")]
+    assert pair["label"] == "2 mounts"
+    assert "Inaccessible: 1 of 2" in pair["title"]
+    assert "data ❌" in pair["title"] and "home ✅" in pair["title"]
+    # Half the mounts fail, so the color sits halfway between the status colors
+    assert pair["color"] not in config["visualization"]["edge_colors"].values()
+    assert pair["width"] > edges[("node1", "storage1")]["width"]
+    assert edges[("node1", "storage1")]["color"] == config["visualization"]["edge_colors"]["accessible"]
+
+def test_blend_colors():
+    """Test colors are blended linearly between the two endpoints"""
+    assert app.blend_colors("#000000", "#FF0000", [0, 0.5, 1]) == ["#000000", "#800000", "#FF0000"]
@@ -0,0 +1,213 @@
+"""
+Tests for the shared Prometheus HTTP client
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from nfs_mount_visualizer import prometheus
+from nfs_mount_visualizer.utils import ResultCache
+from nfs_mount_visualizer.app import query_prometheus, query_prometheus_window
+
+FAST_RETRY = {"backoff_factor": 0, "retries": 2}
+NOW = 1_700_000_000
+
+def test_connection_reused(fake_prometheus):
+    """Test repeated queries share one keep-alive connection"""
+    for _ in range(5):
+        result = prometheus.instant_query(fake_prometheus.url, "up")
+        assert result["status"] == "success"
+    assert fake_prometheus.connections == 1
+    assert len(fake_prometheus.requests) == 5
+
+def test_accepts_gzip(fake_prometheus):
+    """Test requests advertise gzip encoding"""
+    prometheus.instant_query(fake_prometheus.url, "up")
+    assert "gzip" in fake_prometheus.requests[0]["headers"]["Accept-Encoding"]
+
+def test_retries_server_errors(fake_prometheus):
+    """Test transient 5xx responses are retried before succeeding"""
+    statuses = iter([503, 502, 200])
+    fake_prometheus.respond = lambda endpoint, params: (next(statuses), {"status": "success", "data": {"result": []}})
+    result = prometheus.instant_query(fake_prometheus.url, "up", FAST_RETRY)
+    assert result["status"] == "success"
+    assert len(fake_prometheus.requests) == 3
+
+def test_retries_are_bounded(fake_prometheus):
+    """Test persistent 5xx responses raise after the retry budget"""
+    fake_prometheus.respond = lambda endpoint, params: (500, {"status": "error"})
+    with pytest.raises(prometheus.PrometheusError):
+        prometheus.instant_query(fake_prometheus.url, "up", FAST_RETRY)
+    assert len(fake_prometheus.requests) == 3
+
+def test_range_query_params(fake_prometheus):
+    """Test query_prometheus_window issues range queries with the given start/end/step"""
+    config = {"prometheus_url": fake_prometheus.url, "prometheus_client": {}}
+    query_prometheus_window(config, "up", NOW - 3600, NOW, 15)
+    request = fake_prometheus.requests[0]
+    assert request["endpoint"] == "query_range"
+    assert request["params"]["start"] == str(NOW - 3600) and request["params"]["end"] == str(NOW)
+    assert request["params"]["step"] == "15"
+
+def test_range_query_reports_failed_sources(fake_prometheus):
+    """Test a federated window fetch lists the instances that did not answer"""
+    config = {"prometheus_url": [{"url": fake_prometheus.url, "label": "a"}, {"url": "http://127.0.0.1:9", "label": "b"}],
+              "prometheus_client": {"retries": 0}}
+    result = query_prometheus_window(config, "up", NOW - 3600, NOW, 15)
+    assert result["status"] == "success" and list(result["source_errors"]) == ["b"]
+
+def test_unreachable_returns_none():
+    """Test query_prometheus returns None when Prometheus is down"""
+    assert query_prometheus("http://127.0.0.1:9", "up", client_config={"retries": 0}) is None
+
+def test_cache_hits_and_ttl():
+    """Test cached values are reused until their TTL expires"""
+    cache = ResultCache()
+    calls = []
+    fetch = lambda: calls.append(1) or len(calls)
+    assert cache.get_or_fetch("k", 60, fetch) == 1
+    assert cache.get_or_fetch("k", 60, fetch) == 1
+    assert cache.get_or_fetch("k", 0, fetch) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+def test_cache_lru_eviction():
+    """Test the least recently used entry is evicted at the size bound"""
+    cache = ResultCache(max_entries=2)
+    cache.get_or_fetch("a", 60, lambda: "a")
+    cache.get_or_fetch("b", 60, lambda: "b")
+    cache.get_or_fetch("a", 60, lambda: "stale")
+    cache.get_or_fetch("c", 60, lambda: "c")
+    assert cache.get_or_fetch("a", 60, lambda: "refetched") == "a"
+    assert cache.get_or_fetch("b", 60, lambda: "refetched") == "refetched"
+    assert cache.stats()["evictions"] == 2
+
+def test_cache_single_flight(fake_prometheus):
+    """Test concurrent identical queries hit Prometheus only once"""
+    release = threading.Event()
+
+    def slow(endpoint, params):
+        release.wait(5)
+        return 200, {"status": "success", "data": {"result": []}}
+
+    fake_prometheus.respond = slow
+    prometheus.query_cache.clear()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(prometheus.cached_instant_query, fake_prometheus.url, "up", 60) for _ in range(8)]
+        while prometheus.query_cache.stats()["coalesced"] < 7:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+    assert all(result is results[0] for result in results)
+    assert len(fake_prometheus.requests) == 1
+    prometheus.query_cache.clear()
+
+def test_cache_errors_not_cached():
+    """Test failed fetches propagate and are retried on the next call"""
+    cache = ResultCache()
+
+    def fail():
+        raise prometheus.PrometheusError("down")
+
+    with pytest.raises(prometheus.PrometheusError):
+        cache.get_or_fetch("k", 60, fail)
+    assert cache.get_or_fetch("k", 60, lambda: "ok") == "ok"
+
+def test_range_shards_respect_point_limit():
+    """Test shards are contiguous, non-overlapping and under the points limit"""
+    shards = prometheus.range_shards(0, 7 * 86400, 15, 11000)
+    assert shards[0][0] == 0 and shards[-1][1] == 7 * 86400
+    assert all((end - start) // 15 + 1 <= 11000 for start, end in shards)
+    assert all(nxt[0] == prev[1] + 15 for prev, nxt in zip(shards, shards[1:]))
+
+def test_sharded_range_query_stitches_series(fake_prometheus):
+    """Test shards are fetched separately and merged in order without duplicates"""
+    def respond(endpoint, params):
+        start, end, step = int(params["start"]), int(params["end"]), int(params["step"])
+        # Repeat the previous shard's last sample to exercise boundary de-duplication
+        values = [[t, "1"] for t in range(max(0, start - step), end + 1, step)]
+        return 200, {"status": "success", "data": {"resultType": "matrix", "result": [{"metric": {"m": "a"}, "values": values}]}}
+
+    fake_prometheus.respond = respond
+    result = prometheus.sharded_range_query(fake_prometheus.url, "up", 0, 999, 1, {"max_points": 100})
+    timestamps = [point[0] for point in result["data"]["result"][0]["values"]]
+    assert len(fake_prometheus.requests) == 10
+    assert timestamps == list(range(0, 1000))
+
+def _vector_body(count):
+    return json.dumps({"status": "success", "data": {"resultType": "vector", "result": [
+        {"metric": {"source_node": "s", "target_node": f"ñode{i}", "mount_path": "data"}, "value": [0, str(i % 2)]}
+        for i in range(count)
+    ]}})
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_iter_result_series_any_chunking(chunk_size):
+    """Test series decode identically however the body is split"""
+    body = _vector_body(50)
+    chunks = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    assert list(prometheus.iter_result_series(chunks)) == json.loads(body)["data"]["result"]
+
+def test_iter_result_series_errors():
+    """Test error bodies and truncated bodies raise PrometheusError"""
+    error = json.dumps({"status": "error", "errorType": "bad_data", "error": "parse error"})
+    with pytest.raises(prometheus.PrometheusError, match="parse error"):
+        list(prometheus.iter_result_series([error]))
+    body = _vector_body(3)
+    with pytest.raises(prometheus.PrometheusError, match="Truncated"):
+        list(prometheus.iter_result_series([body[:-40]]))
+
+def test_stream_instant_query(fake_prometheus):
+    """Test a streamed instant query yields every series and surfaces HTTP errors"""
+    fake_prometheus.respond = lambda endpoint, params: (200, _vector_body(2000).encode("utf-8"))
+    series = list(prometheus.stream_instant_query(fake_prometheus.url, "up"))
+    assert len(series) == 2000 and series[-1]["metric"]["target_node"] == "ñode1999"
+    with pytest.raises(prometheus.PrometheusError):
+        fake_prometheus.respond = lambda endpoint, params: (400, {"status": "error", "error": "bad"})
+        list(prometheus.stream_instant_query(fake_prometheus.url, "up"))
+
+def test_stream_range_query_shards(fake_prometheus):
+    """Test a streamed range query yields each series once per shard in time order"""
+    def respond(endpoint, params):
+        start, end = int(params["start"]), int(params["end"])
+        values = [[t, "1"] for t in range(start, end + 1)]
+        return 200, {"status": "success", "data": {"resultType": "matrix", "result": [{"metric": {"m": "a"}, "values": values}]}}
+
+    fake_prometheus.respond = respond
+    series = list(prometheus.stream_range_query(fake_prometheus.url, "up", 0, 249, 1, {"max_points": 100}))
+    assert len(series) == 3
+    assert [point[0] for item in series for point in item["values"]] == list(range(250))
+
+def test_label_selector_escapes_values():
+    """Test label matchers escape quotes, backslashes and regex metacharacters"""
+    assert prometheus.label_selector("m", {}) == "m"
+    assert prometheus.label_selector("m", {"server": ["st\"or\\1"]}) == 'm{server="st\\"or\\\\1"}'
+    # Regex metacharacters are escaped, then the pattern is quoted as a PromQL string
+    selector = prometheus.label_selector("m", {"server": ["b.x", "a+1", "a+1"], "path": ["/data"]})
+    assert selector == 'm{server=~"a\\\\+1|b\\\\.x", path="/data"}'
+    assert prometheus.regex_alternation(["(x)|y*"]) == "\\(x\\)\\|y\\*"
+
+def test_instances_and_merged_sources():
+    """Test instance settings are resolved per instance and merged series are tagged by source"""
+    targets = prometheus.instances(["http://prom-a:9090", {"url": "http://prom-b:9090", "label": "b", "timeout": 2}],
+                                   {"timeout": 7})
+    assert [(t["label"], t["url"], t["settings"]["timeout"]) for t in targets] == [
+        ("prom-a:9090", "http://prom-a:9090", 7), ("b", "http://prom-b:9090", 2)
+    ]
+    assert prometheus.source_key("http://prom-a:9090") == "http://prom-a:9090"
+    hash(prometheus.source_key(["http://prom-a:9090", {"url": "http://prom-b:9090"}]))
+
+    series = {"metric": {"m": "1"}, "value": [0, "1"]}
+    merged = prometheus.merge_source_results({
+        "a": {"status": "success", "data": {"resultType": "vector", "result": [series]}},
+        "b": {"status": "success", "data": {"resultType": "vector", "result": [series]}},
+    })
+    assert [s["metric"] for s in merged["data"]["result"]] == [{"m": "1", "source": "a"}, {"m": "1", "source": "b"}]
+    assert series["metric"] == {"m": "1"}
+
+def test_fan_out_raises_when_no_instance_answers():
+    """Test the fan-out raises with every instance error when none answers"""
+    with pytest.raises(prometheus.PrometheusError, match="b:"):
+        prometheus.fan_out([{"url": "http://127.0.0.1:1", "label": "a"}, {"url": "http://127.0.0.1:1", "label": "b"}],
+                           lambda url, settings: prometheus.instant_query(url, "up", settings), {"retries": 0})
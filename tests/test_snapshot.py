@@ -0,0 +1,198 @@
+"""
+Tests for the indexed mount snapshot
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from nfs_mount_visualizer.snapshot import COLUMNS, MountSnapshot, compact_mounts, mounts_from_result
+
+@pytest.fixture
+def mounts():
+    return pd.DataFrame([
+        {"nfs_server": "storage1", "nfs_client": "node1", "mount_path": "data", "accessible": True},
+        {"nfs_server": "storage1", "nfs_client": "node2", "mount_path": "data", "accessible": False},
+        {"nfs_server": "storage1", "nfs_client": "node2", "mount_path": "home", "accessible": True},
+        {"nfs_server": "node1", "nfs_client": "node3", "mount_path": "tmp", "accessible": True},
+    ])
+
+def _reference(df, servers=None, clients=None, paths=None, status=None, touching=None):
+    """The boolean-mask filtering the tabs used to do"""
+    if servers:
+        df = df[df['nfs_server'].isin(servers)]
+        if paths:
+            df = df[df['mount_path'].isin(paths)]
+    if clients:
+        df = df[df['nfs_client'].isin(clients)]
+    if touching:
+        df = df[df['nfs_server'].isin(touching) | df['nfs_client'].isin(touching)]
+    if status is not None:
+        df = df[df['accessible'] == (status == "accessible")]
+    return df
+
+def test_indexes(mounts):
+    """Test the snapshot builds server, client, path and neighbor indexes"""
+    snapshot = MountSnapshot(mounts)
+    assert snapshot.servers == ["node1", "storage1"]
+    assert snapshot.clients == ["node1", "node2", "node3"]
+    assert snapshot.server_clients["storage1"] == ["node1", "node2"]
+    assert snapshot.client_servers["node2"] == ["storage1"]
+    assert snapshot.paths_for(["storage1"]) == ["data", "home"]
+    assert snapshot.neighbors(["node1"]) == ["node1", "node3", "storage1"]
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"servers": ["storage1"]},
+    {"servers": ["storage1"], "paths": ["home"]},
+    {"clients": ["node2"], "status": "inaccessible"},
+    {"status": "accessible"},
+    {"touching": ["node1"]},
+    {"touching": ["node1"], "status": "accessible", "clients": ["node3"]},
+    {"servers": ["missing"]},
+])
+def test_select_matches_mask_filtering(mounts, filters):
+    """Test indexed selection matches filtering with boolean masks"""
+    selected = MountSnapshot(mounts).select(**filters)
+    pd.testing.assert_frame_equal(selected, _reference(mounts, **filters))
+
+def test_unfiltered_select_does_not_copy(mounts):
+    """Test selecting without filters returns the snapshot frame itself"""
+    snapshot = MountSnapshot(mounts)
+    assert snapshot.select() is snapshot.df
+
+def test_empty_snapshot():
+    """Test an empty snapshot has empty indexes and selections"""
+    snapshot = MountSnapshot(pd.DataFrame())
+    assert snapshot.empty
+    assert snapshot.servers == [] and snapshot.neighbors(["a"]) == ["a"]
+    assert snapshot.select(servers=["a"]).empty
+
+def test_mounts_from_result_is_compact(mounts):
+    """Test the mount table built from a query result uses the compact layout"""
+    mapping = {"server_label": "nfs_server", "client_label": "nfs_client", "path_label": "mount_path"}
+    result = {"status": "success", "data": {"result": [
+        {"metric": {"nfs_server": row.nfs_server, "nfs_client": row.nfs_client, "mount_path": row.mount_path},
+         "value": [1700000000, "1" if row.accessible else "0"]}
+        for row in mounts.itertuples()
+    ]}}
+    df = mounts_from_result(result, mapping)
+
+    # Servers and clients share one node dictionary
+    assert df["nfs_server"].dtype == df["nfs_client"].dtype
+    assert list(df["nfs_server"].cat.categories) == ["node1", "node2", "node3", "storage1"]
+    assert df["accessible"].dtype == bool
+    pd.testing.assert_frame_equal(df.astype({c: object for c in COLUMNS[:3]}), mounts.astype({c: object for c in COLUMNS[:3]}))
+
+    snapshot = MountSnapshot(df)
+    assert snapshot.servers == ["node1", "storage1"]
+    assert snapshot.paths_for(["storage1"]) == ["data", "home"]
+    pd.testing.assert_frame_equal(snapshot.select(touching=["node1"]),
+                                  _reference(df, touching=["node1"]))
+
+def test_snapshots_are_versioned_and_read_only(mounts):
+    """Test every snapshot gets a newer version and read-only status masks"""
+    first, second = MountSnapshot(mounts), MountSnapshot(mounts)
+    assert second.version > first.version
+    with pytest.raises(ValueError):
+        first.status_masks["accessible"][0] = False
+
+def test_snapshot_shared_until_refresh(monkeypatch):
+    """Test sessions share one snapshot until a forced refresh rebuilds it"""
+    from nfs_mount_visualizer import app
+    config = app.load_config()
+    builds = []
+    monkeypatch.setattr(app, "snapshot_cache", app.ResultCache(max_entries=4))
+    monkeypatch.setattr(app, "get_mount_accessibility",
+                        lambda config, demo_mode=False, force_refresh=False: builds.append(1) or pd.DataFrame())
+
+    first = app.get_snapshot(config, demo_mode=True)
+    assert app.get_snapshot(config, demo_mode=True) is first
+    assert len(builds) == 1
+
+    refreshed = app.get_snapshot(config, demo_mode=True, force_refresh=True)
+    assert refreshed.version > first.version and len(builds) == 2
+
+def test_failed_refresh_keeps_previous_snapshot(monkeypatch):
+    """Test a failed Prometheus refresh serves the last good snapshot and caches nothing"""
+    from nfs_mount_visualizer import app, prometheus
+    config = app.load_config()
+    cache = app.ResultCache(max_entries=4)
+    monkeypatch.setattr(app, "snapshot_cache", cache)
+    monkeypatch.setattr(app, "snapshot_errors", {})
+    monkeypatch.setattr(app, "get_mount_accessibility",
+                        lambda config, demo_mode=False: app.compact_mounts(app.generate_sample_data(config)))
+    good = app.get_snapshot(config, demo_mode=True)
+
+    def fail(config, demo_mode=False):
+        raise prometheus.PrometheusError("connection refused")
+    monkeypatch.setattr(app, "get_mount_accessibility", fail)
+    key = app.snapshot_key(config, demo_mode=True)
+    cache.clear()
+
+    assert app.get_snapshot(config, demo_mode=True, force_refresh=True) is good
+    assert app.snapshot_errors[key][1] == "connection refused"
+    assert cache.stats()["entries"] == 0
+    # The failure is not retried until the refresh interval has passed
+    assert app.get_snapshot(config, demo_mode=True) is good
+
+def test_pushdown_query():
+    """Test filters become label matchers only when pushdown is enabled and the list is short"""
+    from nfs_mount_visualizer import app
+    config = app.load_config()
+    assert app.pushdown_query(config) is None
+    assert app.pushdown_query(config, paths=["data"]) is None
+    assert app.pushdown_query(config, servers=["storage1"], paths=["data", "home"], clients=["node1"]) == \
+        'nfs_mount_accessible{source_node="storage1", mount_path=~"data|home", target_node="node1"}'
+    assert app.pushdown_query(config, touching=["node1"]) == \
+        'nfs_mount_accessible{source_node="node1"} or nfs_mount_accessible{target_node="node1"}'
+    assert app.pushdown_query(config, clients=[f"node{i}" for i in range(101)]) is None
+    config["query_pushdown"]["enabled"] = False
+    assert app.pushdown_query(config, servers=["storage1"]) is None
+
+def test_view_snapshot_pushdown_and_fallback(monkeypatch, mounts):
+    """Test filtered views query Prometheus once and fall back to a newer full snapshot"""
+    from nfs_mount_visualizer import app
+    config = app.load_config()
+    queries = []
+
+    def stream(url, query, settings=None):
+        queries.append(query)
+        return [{"metric": {"source_node": "storage1", "target_node": "node2", "mount_path": "data"},
+                 "value": [0, "0"]}]
+
+    monkeypatch.setattr(app, "view_snapshot_cache", app.ResultCache(max_entries=4))
+    monkeypatch.setattr(app.prometheus, "stream_instant_query", stream)
+    full = MountSnapshot(mounts, created_at=time.time() - 60)
+
+    assert app.get_view_snapshot(config, full) is full
+    assert app.get_view_snapshot(config, full, demo_mode=True, clients=["node2"]) is full
+    view = app.get_view_snapshot(config, full, clients=["node2"])
+    assert queries == ['nfs_mount_accessible{target_node="node2"}']
+    assert view.select(clients=["node2"]).values.tolist() == [["storage1", "node2", "data", False]]
+    assert app.get_view_snapshot(config, full, clients=["node2"]) is view and len(queries) == 1
+
+    # A full snapshot refreshed after the filtered query wins
+    refreshed = MountSnapshot(mounts)
+    assert app.get_view_snapshot(config, refreshed, clients=["node2"]) is refreshed
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_search_and_sort(mounts, compact):
+    """Test search matches every term and sorting keeps server, client, path order on ties"""
+    snapshot = MountSnapshot(compact_mounts(mounts) if compact else mounts)
+    assert snapshot.search("NODE1").tolist() == [0, 3]
+    assert snapshot.search("storage1 home").tolist() == [2]
+    assert snapshot.rows(search="node2", status="accessible").tolist() == [2]
+    assert snapshot.rows(search="  ") is None
+
+    assert snapshot.sorted_rows(None, "nfs_server").tolist() == [3, 0, 1, 2]
+    # Ties keep server, client, path order in either direction
+    assert snapshot.sorted_rows(None, "accessible", descending=True).tolist() == [3, 0, 2, 1]
+    assert snapshot.sorted_rows(np.array([0, 2, 3]), "mount_path", descending=True).tolist() == [3, 2, 0]
+
+def test_format_mount_table(mounts):
+    """Test the visible page is formatted with display labels and status icons"""
+    from nfs_mount_visualizer.app import format_mount_table
+    page = format_mount_table(mounts.iloc[1:3])
+    assert page.columns.tolist() == ["NFS Server", "NFS Client", "Mount Path", "Status"]
+    assert page["Status"].tolist() == ["❌ Inaccessible", "✅ Accessible"]
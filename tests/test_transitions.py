@@ -0,0 +1,92 @@
+"""
+Tests for snapshot diffing and the transition log
+"""
+import pandas as pd
+import pytest
+from nfs_mount_visualizer.snapshot import compact_mounts
+from nfs_mount_visualizer.transitions import TransitionLog, diff_mounts
+
+def _mounts(rows):
+    return pd.DataFrame(rows, columns=["nfs_server", "nfs_client", "mount_path", "accessible"])
+
+OLD = _mounts([
+    ("storage1", "node1", "data", True),
+    ("storage1", "node2", "data", False),
+    ("storage1", "node3", "data", True),
+    ("storage1", "node4", "home", True),
+])
+NEW = _mounts([
+    ("storage1", "node1", "data", False),
+    ("storage1", "node2", "data", True),
+    ("storage1", "node4", "home", True),
+    ("storage2", "node5", "scratch", True),
+])
+
+def _events(changes):
+    return sorted(changes.astype(object).itertuples(index=False, name=None))
+
+@pytest.mark.parametrize("layout", ["strings", "compact"])
+def test_diff_mounts(layout):
+    """Test the diff reports failed, recovered, appeared and disappeared mounts"""
+    old, new = (OLD, NEW) if layout == "strings" else (compact_mounts(OLD), compact_mounts(NEW))
+    assert _events(diff_mounts(old, new)) == [
+        ("storage1", "node1", "data", "failed"),
+        ("storage1", "node2", "data", "recovered"),
+        ("storage1", "node3", "data", "disappeared"),
+        ("storage2", "node5", "scratch", "appeared"),
+    ]
+    assert diff_mounts(new, new).empty
+
+def test_diff_keys_on_source():
+    """Test the same mount from another source is a different mount"""
+    old = OLD.assign(source="site-a")
+    new = pd.concat([OLD.assign(source="site-b"), OLD.assign(source="site-a")], ignore_index=True)
+    assert [event[0] for event in _events(diff_mounts(old, new))] == ["site-b"] * 4
+
+def test_log_is_bounded_and_persisted(tmp_path):
+    """Test the log keeps at most max_events and reloads them from disk"""
+    path = str(tmp_path / "transitions" / "log.json")
+    log = TransitionLog(path, max_events=3)
+    assert log.update(OLD, 100.0).empty  # the first table only sets the baseline
+    assert len(log.update(NEW, 200.0)) == 4
+    assert len(log.update(OLD, 300.0)) == 4
+
+    recent = log.recent()
+    assert len(recent) == 3 and recent["time"].tolist() == [300.0] * 3
+    reloaded = TransitionLog(path, max_events=3).recent()
+    pd.testing.assert_frame_equal(reloaded, recent)
+
+def test_unreachable_source_is_not_logged_as_disappeared(tmp_path):
+    """Test mounts of an unreachable source are not logged as disappeared"""
+    log = TransitionLog(str(tmp_path / "log.json"))
+    both = pd.concat([OLD.assign(source="a"), OLD.assign(source="b")], ignore_index=True)
+    log.update(both, 100.0)
+    assert log.update(OLD.assign(source="a"), 200.0, skip_sources={"b": "timeout"}).empty
+    assert log.recent().empty
+
+def test_recovered_source_is_not_logged_as_appeared(tmp_path):
+    """Test a source that comes back after a failed refresh is diffed against its last known mounts"""
+    log = TransitionLog(str(tmp_path / "log.json"))
+    both = pd.concat([OLD.assign(source="a"), OLD.assign(source="b")], ignore_index=True)
+    log.update(both, 100.0)
+    assert log.update(OLD.assign(source="a"), 200.0, skip_sources={"b": "timeout"}).empty
+    assert log.update(both, 300.0).empty
+    changed = pd.concat([OLD.assign(source="a"), NEW.assign(source="b")], ignore_index=True)
+    assert [event[0] for event in _events(log.update(changed, 400.0))] == ["b"] * 4
+
+def test_unchanged_refresh_reuses_snapshot(monkeypatch, tmp_path):
+    """Test an unchanged refresh re-stamps the previous snapshot and a changed one logs transitions"""
+    from nfs_mount_visualizer import app
+    config = app.load_config()
+    config["cache_dir"] = str(tmp_path)
+    monkeypatch.setattr(app, "latest_snapshots", {})
+    monkeypatch.setattr(app.transitions, "_logs", {})
+
+    first = app.next_snapshot(config, "key", compact_mounts(OLD))
+    same = app.next_snapshot(config, "key", compact_mounts(OLD))
+    assert same.version == first.version and same.created_at >= first.created_at
+    assert same.server_rows is first.server_rows
+
+    changed = app.next_snapshot(config, "key", compact_mounts(NEW))
+    assert changed.version > first.version
+    assert len(app.transitions.transition_log(config).recent()) == 4
@@ -0,0 +1,41 @@
+"""
+Tests for the server-side cluster uptime aggregation
+"""
+from nfs_mount_visualizer import prometheus
+from nfs_mount_visualizer.app import load_config, build_uptime_query, get_cluster_uptime
+
+def _sample(server, client, path, stat, value):
+    labels = {"source_node": server, "target_node": client, "mount_path": path, "stat": stat}
+    return {"metric": labels, "value": [1700000000, str(value)]}
+
+def test_uptime_query_single_instant_query():
+    """Test all aggregations are unioned into one PromQL expression"""
+    query = build_uptime_query(load_config(), 6)
+    assert "avg_over_time(nfs_mount_accessible[6h])" in query
+    assert "changes(nfs_mount_accessible[6h])" in query
+    assert "count_over_time(nfs_mount_accessible[6h])" in query
+    assert query.count(" or ") == 2
+
+def test_cluster_uptime_worst_first(fake_prometheus):
+    """Test results are pivoted to one row per mount, worst uptime first"""
+    result = [
+        _sample("storage1", "node1", "data", "uptime", 1.0),
+        _sample("storage1", "node1", "data", "state_changes", 0),
+        _sample("storage1", "node1", "data", "samples", 360),
+        _sample("storage1", "node2", "data", "uptime", 0.75),
+        _sample("storage1", "node2", "data", "state_changes", 4),
+        _sample("storage1", "node2", "data", "samples", 360),
+    ]
+    fake_prometheus.respond = lambda endpoint, params: (200, {"status": "success", "data": {"resultType": "vector", "result": result}})
+    prometheus.query_cache.clear()
+    config = load_config()
+    config["prometheus_url"] = fake_prometheus.url
+
+    uptime_df = get_cluster_uptime(config, 6)
+
+    assert len(fake_prometheus.requests) == 1
+    assert fake_prometheus.requests[0]["endpoint"] == "query"
+    assert list(uptime_df["nfs_client"]) == ["node2", "node1"]
+    assert uptime_df.loc[0, "uptime"] == 75.0
+    assert uptime_df.loc[0, "state_changes"] == 4
+    prometheus.query_cache.clear()